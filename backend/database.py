@@ -1,9 +1,73 @@
+import threading
+import time
+from contextlib import contextmanager
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from config import settings
 
-engine = create_engine(settings.database_url)
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool, который считает время ожидания свободного соединения
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+    
+    def stats(self) -> dict:
+        with self._stats_lock:
+            checkouts = self.checkouts
+            return {
+                "pool_size": self.size(),
+                "checked_in": self.checkedin(),
+                "checked_out": self.checkedout(),
+                "overflow": max(0, self.overflow()),
+                "max_overflow": self._max_overflow,
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+            }
+
+
+engine = create_engine(
+    settings.database_url,
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    pool_recycle=settings.db_pool_recycle,
+    connect_args={
+        "application_name": settings.db_application_name,
+        # statement_timeout в миллисекундах, 0 = без ограничения
+        "options": f"-c statement_timeout={settings.db_statement_timeout_ms}",
+    },
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -15,3 +79,26 @@ def get_db():
     finally:
         db.close()
 
+
+def get_pool_stats() -> dict:
+    """
+    Статистика пула соединений текущего процесса
+    """
+    return engine.pool.stats()
+
+
+@contextmanager
+def session_scope():
+    """
+    Короткая сессия для фоновых задач (unit of work): коммит при успехе, откат при ошибке,
+    соединение сразу возвращается в пул. Не держите её открытой во время вызовов LLM или рендера.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,297 @@
+from datetime import timedelta
+from typing import Optional, Dict, Any
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import Job, Parable, EnglishParable
+from services.render_profiles import render_host_concurrency_limit
+
+
+# Тип задачи -> очередь. У каждой очереди свой лимит параллелизма в воркере:
+# llm — долгие, но лёгкие по CPU вызовы Gemini; render — тяжёлая сборка видео;
+# ingest — нормализация загруженных видеофрагментов
+JOB_TYPE_QUEUES = {
+    "process_parable": "llm",
+    "regenerate_images": "llm",
+    "process_english": "llm",
+    "generate_final": "render",
+    "generate_english_final": "render",
+    "normalize_fragment": "ingest",
+    "normalize_english_fragment": "ingest",
+}
+
+# Тип задачи -> (модель, статус, в котором сущность ждёт завершения задачи)
+JOB_TYPE_TARGETS = {
+    "process_parable": (Parable, "processing"),
+    "process_english": (EnglishParable, "processing"),
+    "generate_final": (Parable, "generating_final"),
+    "generate_english_final": (EnglishParable, "generating_final"),
+}
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Ключ advisory lock, чтобы восстановление выполнял только один воркер одновременно
+RECOVERY_LOCK_KEY = 72_410_001
+# Ключ advisory lock для выдачи задач рендера: проверка лимитов и захват — атомарно
+RENDER_CLAIM_LOCK_KEY = 72_410_002
+
+
+def enqueue_job(db: Session, job_type: str, target_id: int, payload: Optional[Dict[str, Any]] = None) -> Job:
+    """
+    Ставит задачу в очередь и коммитит транзакцию вместе с остальными изменениями сессии
+    Если для сущности уже есть активная задача того же типа, возвращает её
+
+    Проверка и вставка не атомарны: при гонке двух запросов вставку отклоняет уникальный
+    индекс idx_jobs_active_target, и возвращается задача, поставленная соседом.
+    """
+    if job_type not in JOB_TYPE_QUEUES:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    existing = active_job(db, job_type, target_id)
+    if existing:
+        db.commit()
+        return existing
+
+    job = Job(
+        job_type=job_type,
+        queue=JOB_TYPE_QUEUES[job_type],
+        target_id=target_id,
+        payload=payload or {},
+        status="queued",
+        max_attempts=settings.job_max_attempts
+    )
+    db.flush()
+    try:
+        # Точка сохранения: при конфликте откатывается только вставка, а не изменения вызывающего
+        with db.begin_nested():
+            db.add(job)
+    except IntegrityError:
+        existing = active_job(db, job_type, target_id)
+        db.commit()
+        print(f"[Job Queue] Job {job_type} (target {target_id}) is already active: {existing.id}")
+        return existing
+    db.commit()
+    db.refresh(job)
+
+    print(f"[Job Queue] Enqueued job {job.id}: {job_type} (target {target_id})")
+    return job
+
+
+def active_job(db: Session, job_type: str, target_id: int) -> Optional[Job]:
+    """
+    Задача этого типа для сущности, которая ждёт выполнения или выполняется
+    """
+    return db.query(Job).filter(
+        Job.job_type == job_type,
+        Job.target_id == target_id,
+        Job.status.in_(ACTIVE_STATUSES)
+    ).first()
+
+
+def claim_job(db: Session, queue: str, worker_id: str) -> Optional[Job]:
+    """
+    Атомарно забирает следующую задачу из очереди (FOR UPDATE SKIP LOCKED)
+
+    Рендеры дополнительно ограничены лимитом на машину воркера (render_host_concurrency_limit —
+    по её ядрам): при пакетном рендере задачи не конкурируют за ядра сверх него. Машина задачи —
+    префикс worker_id до первого «:» (см. Worker.worker_id). RENDER_CLUSTER_CONCURRENCY
+    дополнительно ограничивает рендеры всего кластера.
+    """
+    if queue == "render":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": RENDER_CLAIM_LOCK_KEY})
+        host = worker_id.split(":", 1)[0]
+        running, running_on_host = db.query(
+            func.count(Job.id),
+            func.count(Job.id).filter(func.split_part(Job.worker_id, ":", 1) == host)
+        ).filter(
+            Job.queue == "render",
+            Job.status == "running"
+        ).one()
+        cluster_limit = settings.render_cluster_concurrency
+        if running_on_host >= render_host_concurrency_limit() or (cluster_limit and running >= cluster_limit):
+            db.rollback()
+            return None
+
+    job = db.query(Job).filter(
+        Job.queue == queue,
+        Job.status == "queued",
+        Job.run_after <= func.now()
+    ).order_by(Job.id).with_for_update(skip_locked=True).first()
+
+    if not job:
+        db.rollback()
+        return None
+
+    job.status = "running"
+    job.worker_id = worker_id
+    job.attempts += 1
+    job.started_at = func.now()
+    job.heartbeat_at = func.now()
+    job.error_message = None
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def heartbeat(job_id: int, worker_id: str) -> bool:
+    """
+    Обновляет heartbeat задачи. Возвращает False, если задача больше не принадлежит воркеру
+    """
+    db = SessionLocal()
+    try:
+        updated = db.query(Job).filter(
+            Job.id == job_id,
+            Job.worker_id == worker_id,
+            Job.status == "running"
+        ).update({"heartbeat_at": func.now()}, synchronize_session=False)
+        db.commit()
+        return updated > 0
+    finally:
+        db.close()
+
+
+def finish_job(job_id: int, worker_id: str, error: Optional[str] = None, retry: bool = True):
+    """
+    Отмечает задачу выполненной; при ошибке возвращает её в очередь, пока не исчерпаны попытки
+    retry=False — ошибка, которую повтор не исправит (таймаут, превышение памяти): задача сразу failed
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(
+            Job.id == job_id,
+            Job.worker_id == worker_id
+        ).with_for_update().first()
+        if not job or job.status != "running":
+            db.rollback()
+            return
+
+        if error is None:
+            job.status = "done"
+            job.finished_at = func.now()
+        else:
+            _retry_or_fail(db, job, error, retry)
+        db.commit()
+    finally:
+        db.close()
+
+
+def cancel_job(db: Session, job: Job) -> Job:
+    """
+    Отменяет задачу в очереди или выполняющуюся
+
+    Воркер узнаёт об отмене при следующем heartbeat: процесс рендера вместе с ffmpeg
+    завершается; другие выполняющиеся задачи доработают, но результат не будет отмечен в очереди.
+    Сущность, ждущая задачу, переводится в error, чтобы восстановление не поставило задачу заново.
+    """
+    job.status = "cancelled"
+    job.worker_id = None
+    job.error_message = "Cancelled"
+    job.finished_at = func.now()
+
+    target = JOB_TYPE_TARGETS.get(job.job_type)
+    if target:
+        model, waiting_status = target
+        entity = db.query(model).filter(model.id == job.target_id).first()
+        if entity and entity.status == waiting_status:
+            entity.status = "error"
+            entity.error_message = f"Job {job.job_type} cancelled"
+
+    db.commit()
+    db.refresh(job)
+    print(f"[Job Queue] Job {job.id} cancelled")
+    return job
+
+
+def _retry_or_fail(db: Session, job: Job, error: str, retry: bool = True):
+    job.error_message = error
+    job.worker_id = None
+
+    target = JOB_TYPE_TARGETS.get(job.job_type)
+    entity, waiting_status = None, None
+    if target:
+        model, waiting_status = target
+        entity = db.query(model).filter(model.id == job.target_id).first()
+
+    if retry and job.attempts < job.max_attempts:
+        job.status = "queued"
+        job.run_after = func.now() + timedelta(seconds=settings.job_retry_delay_seconds)
+        # Задача могла отметить сущность ошибкой перед падением — она снова ждёт задачу
+        if entity and entity.status == "error":
+            entity.status = waiting_status
+        print(f"[Job Queue] Job {job.id} requeued (attempt {job.attempts}/{job.max_attempts}): {error}")
+        return
+
+    job.status = "failed"
+    job.finished_at = func.now()
+    print(f"[Job Queue] ❌ Job {job.id} failed after {job.attempts} attempts: {error}")
+
+    if entity and entity.status == waiting_status:
+        entity.status = "error"
+        entity.error_message = f"Job {job.job_type} failed: {error}"
+
+
+def recover(worker_id: str) -> Dict[str, int]:
+    """
+    Возвращает в очередь задачи с просроченным heartbeat (упавший воркер)
+    и заново ставит задачи для сущностей, зависших в processing/generating_final без активной задачи
+    """
+    stats = {"requeued": 0, "orphans": 0}
+    db = SessionLocal()
+    try:
+        locked = db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"),
+            {"key": RECOVERY_LOCK_KEY}
+        ).scalar()
+        if not locked:
+            db.rollback()
+            return stats
+
+        stale_jobs = db.query(Job).filter(
+            Job.status == "running",
+            Job.heartbeat_at < func.now() - timedelta(seconds=settings.job_stale_seconds)
+        ).with_for_update(skip_locked=True).all()
+
+        for job in stale_jobs:
+            print(f"[Job Queue] ⚠️  Job {job.id} lost its worker {job.worker_id}")
+            _retry_or_fail(db, job, f"Worker {job.worker_id} stopped sending heartbeats")
+            stats["requeued"] += 1
+
+        for job_type, (model, waiting_status) in JOB_TYPE_TARGETS.items():
+            active_targets = db.query(Job.target_id).filter(
+                Job.job_type == job_type,
+                Job.status.in_(ACTIVE_STATUSES)
+            )
+            orphans = db.query(model).filter(
+                model.status == waiting_status,
+                model.id.notin_(active_targets)
+            ).all()
+
+            for entity in orphans:
+                print(f"[Job Queue] ⚠️  {model.__name__} {entity.id} stuck in '{waiting_status}', re-enqueueing {job_type}")
+                db.add(Job(
+                    job_type=job_type,
+                    queue=JOB_TYPE_QUEUES[job_type],
+                    target_id=entity.id,
+                    payload=_orphan_payload(job_type, entity),
+                    status="queued",
+                    max_attempts=settings.job_max_attempts
+                ))
+                stats["orphans"] += 1
+
+        db.commit()
+    finally:
+        db.close()
+
+    return stats
+
+
+def _orphan_payload(job_type: str, entity) -> Dict[str, Any]:
+    if job_type == "process_english":
+        return {"original_parable_id": entity.parable_id}
+    if job_type in ("generate_final", "generate_english_final"):
+        return {"render_mode": entity.render_mode or "final"}
+    return {}
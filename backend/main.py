@@ -1,25 +1,40 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, load_only, selectinload
+from typing import List, Optional
+from datetime import datetime
+import asyncio
+import base64
 import shutil
 from pathlib import Path
 
-from database import get_db, engine
+from database import get_db, engine, session_scope, get_pool_stats
 from models import (
     Base, Parable, ImagePrompt, GeneratedImage, AudioFile, VideoFragment,
-    EnglishParable, EnglishImagePrompt, EnglishGeneratedImage, EnglishAudioFile, EnglishVideoFragment
+    EnglishParable, EnglishImagePrompt, EnglishGeneratedImage, EnglishAudioFile, EnglishVideoFragment,
+    Job, RenderMetric, RenderBatch
 )
 from schemas import (
-    ParableCreate, ParableResponse, ParableDetailResponse,
+    ParableCreate, ParableResponse, ParableDetailResponse, ParableSummary, ParablePage,
     ProcessingStatus, VideoFragmentResponse,
     EnglishParableResponse, EnglishParableDetailResponse, EnglishVideoFragmentResponse,
-    UpdateVideoDurationRequest
+    UpdateVideoDurationRequest, JobResponse, RenderBatchCreate
 )
 from services.gemini_service import GeminiService
 from services.elevenlabs_service import ElevenLabsService
 from services.video_service import VideoService
+from services.llm_cache import llm_cache, llm_cache_bypass
+from services.render_cache import render_cache
+from services.pipeline_dag import run_dag
+from services.render_profiles import RENDER_MODES, get_encoder_profile, scaled_size, render_host_concurrency_limit
+from services.render_metrics import render_features, estimate_render
+from services.subtitles import build_subtitle_cues
+from services.timeline import plan_timeline
+from services.fragment_normalizer import normalize_fragment, normalized_path_for
+from services.media_probe import aprobe_media
+from job_queue import enqueue_job, active_job, cancel_job, ACTIVE_STATUSES
 from config import settings
 
 # Создаём таблицы
@@ -67,21 +82,68 @@ async def create_parable(parable: ParableCreate, db: Session = Depends(get_db)):
     return db_parable
 
 
-@app.get("/parables", response_model=List[ParableResponse])
-async def get_parables(db: Session = Depends(get_db)):
+def _encode_cursor(parable: Parable) -> str:
+    raw = f"{parable.created_at.isoformat()}|{parable.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, parable_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(parable_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@app.get("/parables", response_model=ParablePage)
+async def get_parables(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """
-    Получает список всех притч
+    Получает страницу притч (от новых к старым)
+    
+    Keyset-пагинация по (created_at, id): cursor из ответа передаётся в следующий запрос,
+    поэтому стоимость запроса не зависит от номера страницы (индекс idx_parables_created_id)
     """
-    parables = db.query(Parable).order_by(Parable.created_at.desc()).all()
-    return parables
+    query = db.query(Parable).options(load_only(
+        Parable.id, Parable.title_original, Parable.created_at,
+        Parable.status, Parable.current_step, Parable.final_video_duration
+    ))
+    if status:
+        query = query.filter(Parable.status == status)
+    if cursor:
+        created_at, parable_id = _decode_cursor(cursor)
+        query = query.filter(tuple_(Parable.created_at, Parable.id) < (created_at, parable_id))
+    
+    # Берём на одну запись больше, чтобы понять, есть ли следующая страница
+    parables = query.order_by(Parable.created_at.desc(), Parable.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(parables) > limit:
+        parables = parables[:limit]
+        next_cursor = _encode_cursor(parables[-1])
+    
+    return ParablePage(
+        items=[ParableSummary.model_validate(p) for p in parables],
+        next_cursor=next_cursor
+    )
 
 
 @app.get("/parables/{parable_id}", response_model=ParableDetailResponse)
 async def get_parable(parable_id: int, db: Session = Depends(get_db)):
     """
     Получает детальную информацию о притче
+    Все коллекции загружаются заранее (selectinload): 1 + 4 запроса независимо от числа сцен
     """
-    parable = db.query(Parable).filter(Parable.id == parable_id).first()
+    parable = db.query(Parable).options(
+        selectinload(Parable.image_prompts),
+        selectinload(Parable.generated_images),
+        selectinload(Parable.audio_files),
+        selectinload(Parable.video_fragments),
+    ).filter(Parable.id == parable_id).first()
     if not parable:
         raise HTTPException(status_code=404, detail="Parable not found")
     return parable
@@ -90,12 +152,13 @@ async def get_parable(parable_id: int, db: Session = Depends(get_db)):
 @app.post("/parables/{parable_id}/process", response_model=ProcessingStatus)
 async def process_parable(
     parable_id: int,
-    background_tasks: BackgroundTasks,
+    force_regenerate: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     Запускает обработку притчи (пайплайн)
     Если статус 'error', возобновляет с места остановки
+    force_regenerate=true — игнорировать кеш ответов LLM
     """
     parable = db.query(Parable).filter(Parable.id == parable_id).first()
     if not parable:
@@ -114,149 +177,166 @@ async def process_parable(
         parable.current_step = 0
         parable.error_message = None
     
-    db.commit()
-    
-    # Запускаем обработку в фоне
-    background_tasks.add_task(process_parable_pipeline, parable_id, db)
+    # Ставим обработку в очередь (коммитится вместе со статусом)
+    job = enqueue_job(db, "process_parable", parable_id, {"bypass_cache": force_regenerate})
     
     message = "Parable processing resumed from step {}".format(parable.current_step) if is_resume else "Parable processing started"
     
     return ProcessingStatus(
         status="processing",
         message=message,
-        parable_id=parable_id
+        parable_id=parable_id,
+        job_id=job.id
     )
 
 
-async def process_parable_pipeline(parable_id: int, db: Session):
+async def process_parable_pipeline(parable_id: int, bypass_cache: bool = False):
     """
     Основной пайплайн обработки притчи с возможностью возобновления
+    Флаг обхода кеша LLM действует только на время пайплайна
+    """
+    token = llm_cache_bypass.set(bypass_cache)
+    try:
+        await _process_parable_steps(parable_id, bypass_cache)
+    finally:
+        llm_cache_bypass.reset(token)
+
+
+async def _process_parable_steps(parable_id: int, bypass_cache: bool):
     """
+    Шаги пайплайна притчи
+    Каждый шаг работает с короткими сессиями БД — соединение не удерживается во время вызовов LLM
+    """
+    current_step = 0
     try:
-        parable = db.query(Parable).filter(Parable.id == parable_id).first()
-        start_step = parable.current_step if parable.current_step else 0
+        with session_scope() as db:
+            parable = db.query(Parable).filter(Parable.id == parable_id).first()
+            start_step = parable.current_step if parable.current_step else 0
+            text_original = parable.text_original
+            tts_text = parable.text_for_tts
         
         print(f"[Parable {parable_id}] Starting from step {start_step}")
         
         # Шаг 1: Переписываем текст для TTS
         if start_step <= 1:
-            print(f"[Parable {parable_id}] Step 1: Rewriting text for TTS...")
-            parable.current_step = 1
-            parable.error_message = None
-            db.commit()
+            print(f"[Parable {parable_id}] Step 1: Rewriting text for TTS and generating hook...")
+            current_step = 1
+            with session_scope() as db:
+                db.query(Parable).filter(Parable.id == parable_id).update(
+                    {"current_step": 1, "error_message": None}
+                )
             
-            tts_text = await gemini_service.rewrite_for_tts(parable.text_original)
+            # Оба вызова зависят только от оригинального текста — выполняем параллельно
+            step1 = await run_dag({
+                "rewrite_for_tts": ([], lambda: gemini_service.rewrite_for_tts(text_original)),
+                "generate_hook": ([], lambda: gemini_service.generate_hook(text_original, language="russian")),
+            }, log_prefix=f"[Parable {parable_id}] Step 1")
             
-            # Генерируем хук для первых 3 секунд
-            print(f"[Parable {parable_id}] Generating hook...")
-            hook_text = await gemini_service.generate_hook(parable.text_original, language="russian")
-            parable.hook_text = hook_text
+            tts_text = step1["rewrite_for_tts"]
+            hook_text = step1["generate_hook"]
             print(f"[Parable {parable_id}] Hook: {hook_text}")
             
             # Автоматически добавляем хук в начало TTS текста
             final_tts_text = f"{hook_text}\n\n{tts_text}"
-            parable.text_for_tts = final_tts_text
+            with session_scope() as db:
+                db.query(Parable).filter(Parable.id == parable_id).update(
+                    {"hook_text": hook_text, "text_for_tts": final_tts_text}
+                )
             
-            db.commit()
             print(f"[Parable {parable_id}] ✅ Step 1 completed (hook added to TTS)")
         else:
             print(f"[Parable {parable_id}] ⏭️  Step 1 already completed, skipping...")
-            tts_text = parable.text_for_tts
         
         # Шаг 2: Генерируем метаданные и промпты
         if start_step <= 2:
             print(f"[Parable {parable_id}] Step 2: Generating metadata and prompts...")
-            parable.current_step = 2
-            db.commit()
+            current_step = 2
+            from models import TitleVariant
             
-            # Проверяем, есть ли уже промпты
-            existing_prompts = db.query(ImagePrompt).filter(
-                ImagePrompt.parable_id == parable_id
-            ).count()
+            with session_scope() as db:
+                parable = db.query(Parable).filter(Parable.id == parable_id).first()
+                parable.current_step = 2
+                hook_text = parable.hook_text
+                
+                # Проверяем, есть ли уже промпты и варианты заголовков
+                existing_prompts = db.query(ImagePrompt).filter(
+                    ImagePrompt.parable_id == parable_id
+                ).count()
+                existing_variants = db.query(TitleVariant).filter(
+                    TitleVariant.parable_id == parable_id
+                ).count()
             
             if existing_prompts == 0:
-                metadata = await gemini_service.generate_metadata_and_prompts(
-                    parable.text_original,
-                    tts_text
-                )
+                async def select_best_title(title_variants):
+                    # LLM автоматически выбирает лучший заголовок
+                    if not title_variants:
+                        return None
+                    return await gemini_service.select_best_title(title_variants, text_original)
                 
-                parable.youtube_title = metadata['youtube_title']
-                parable.youtube_description = metadata['youtube_description']
-                parable.youtube_hashtags = metadata['youtube_hashtags']
-                db.commit()
+                # Метаданные, промпты хука и варианты заголовков независимы друг от друга;
+                # выбор лучшего заголовка ждёт только вариантов
+                step2_nodes = {
+                    "metadata_and_prompts": ([], lambda: gemini_service.generate_metadata_and_prompts(text_original, tts_text)),
+                    "hook_image_prompt": ([], lambda: gemini_service.generate_hook_image_prompt(hook_text, text_original, language="russian")),
+                }
+                if existing_variants == 0:
+                    print(f"[Parable {parable_id}] Generating title variants for A/B testing...")
+                    step2_nodes["title_variants"] = ([], lambda: gemini_service.generate_title_variants(text_original, language="russian"))
+                    step2_nodes["best_title"] = (["title_variants"], select_best_title)
                 
-                # Генерируем промпты для изображения хука (scene_order = -1)
-                print(f"[Parable {parable_id}] Generating hook image prompts...")
-                hook_prompts = await gemini_service.generate_hook_image_prompt(
-                    parable.hook_text,
-                    parable.text_original,
-                    language="russian"
-                )
+                step2 = await run_dag(step2_nodes, log_prefix=f"[Parable {parable_id}] Step 2")
                 
-                # Добавляем промпт для хука (scene_order = -1, будет первым)
-                hook_prompt = ImagePrompt(
-                    parable_id=parable_id,
-                    prompt_text=hook_prompts['image_prompt'],
-                    video_prompt_text=hook_prompts['video_prompt'],
-                    scene_order=-1  # Хук идёт ПЕРЕД всеми сценами
-                )
-                db.add(hook_prompt)
+                metadata = step2["metadata_and_prompts"]
+                hook_prompts = step2["hook_image_prompt"]
                 
-                # Сохраняем промпты для основных сцен
-                video_prompts = metadata.get('video_prompts', [])
-                for idx, prompt_text in enumerate(metadata['image_prompts']):
-                    # Получаем соответствующий video_prompt или используем пустую строку
-                    video_prompt = video_prompts[idx] if idx < len(video_prompts) else ""
+                with session_scope() as db:
+                    parable = db.query(Parable).filter(Parable.id == parable_id).first()
+                    parable.youtube_title = metadata['youtube_title']
+                    parable.youtube_description = metadata['youtube_description']
+                    parable.youtube_hashtags = metadata['youtube_hashtags']
                     
-                    prompt = ImagePrompt(
+                    # Добавляем промпт для хука (scene_order = -1, будет первым)
+                    hook_prompt = ImagePrompt(
                         parable_id=parable_id,
-                        prompt_text=prompt_text,
-                        video_prompt_text=video_prompt,
-                        scene_order=idx
-                    )
-                    db.add(prompt)
-                db.commit()
-                
-                # Генерируем варианты заголовков для A/B тестирования
-                print(f"[Parable {parable_id}] Generating title variants for A/B testing...")
-                from models import TitleVariant
-                
-                # Проверяем есть ли уже варианты
-                existing_variants = db.query(TitleVariant).filter(
-                    TitleVariant.parable_id == parable_id
-                ).count()
-                
-                if existing_variants == 0:
-                    title_variants = await gemini_service.generate_title_variants(
-                        parable.text_original,
-                        language="russian"
+                        prompt_text=hook_prompts['image_prompt'],
+                        video_prompt_text=hook_prompts['video_prompt'],
+                        scene_order=-1  # Хук идёт ПЕРЕД всеми сценами
                     )
+                    db.add(hook_prompt)
                     
-                    for variant_data in title_variants:
-                        variant = TitleVariant(
+                    # Сохраняем промпты для основных сцен
+                    video_prompts = metadata.get('video_prompts', [])
+                    for idx, prompt_text in enumerate(metadata['image_prompts']):
+                        # Получаем соответствующий video_prompt или используем пустую строку
+                        video_prompt = video_prompts[idx] if idx < len(video_prompts) else ""
+                        
+                        prompt = ImagePrompt(
                             parable_id=parable_id,
-                            variant_text=variant_data.get('text', ''),
-                            variant_type=variant_data.get('type', 'unknown'),
-                            is_selected=False
+                            prompt_text=prompt_text,
+                            video_prompt_text=video_prompt,
+                            scene_order=idx
                         )
-                        db.add(variant)
-                    db.commit()
-                    print(f"[Parable {parable_id}] Generated {len(title_variants)} title variants")
+                        db.add(prompt)
                     
-                    # LLM автоматически выбирает лучший заголовок
-                    if title_variants:
-                        print(f"[Parable {parable_id}] LLM selecting best title...")
-                        best_index = await gemini_service.select_best_title(title_variants, parable.text_original)
+                    if existing_variants == 0:
+                        title_variants = step2["title_variants"]
                         
-                        # Получаем все варианты из БД
-                        all_variants = db.query(TitleVariant).filter(
-                            TitleVariant.parable_id == parable_id
-                        ).order_by(TitleVariant.id).all()
+                        variants = []
+                        for variant_data in title_variants:
+                            variant = TitleVariant(
+                                parable_id=parable_id,
+                                variant_text=variant_data.get('text', ''),
+                                variant_type=variant_data.get('type', 'unknown'),
+                                is_selected=False
+                            )
+                            db.add(variant)
+                            variants.append(variant)
+                        print(f"[Parable {parable_id}] Generated {len(title_variants)} title variants")
                         
-                        if best_index < len(all_variants):
-                            all_variants[best_index].is_selected = True
-                            db.commit()
-                            print(f"[Parable {parable_id}] ✅ Best title selected: {all_variants[best_index].variant_text}")
+                        best_index = step2["best_title"]
+                        if best_index is not None and best_index < len(variants):
+                            variants[best_index].is_selected = True
+                            print(f"[Parable {parable_id}] ✅ Best title selected: {variants[best_index].variant_text}")
             else:
                 print(f"[Parable {parable_id}] Prompts already exist, using existing...")
             
@@ -267,53 +347,57 @@ async def process_parable_pipeline(parable_id: int, db: Session):
         # Шаг 3: Генерируем изображения
         if start_step <= 3:
             print(f"[Parable {parable_id}] Step 3: Generating images...")
-            parable.current_step = 3
-            db.commit()
+            current_step = 3
             
-            # Получаем все промпты
-            prompts = db.query(ImagePrompt).filter(
-                ImagePrompt.parable_id == parable_id
-            ).order_by(ImagePrompt.scene_order).all()
+            with session_scope() as db:
+                db.query(Parable).filter(Parable.id == parable_id).update({"current_step": 3})
+                
+                # Получаем все промпты
+                prompts = [
+                    (p.id, p.scene_order, p.prompt_text)
+                    for p in db.query(ImagePrompt).filter(
+                        ImagePrompt.parable_id == parable_id
+                    ).order_by(ImagePrompt.scene_order).all()
+                ]
+                
+                # Проверяем, сколько изображений уже есть
+                existing_images_count = db.query(GeneratedImage).filter(
+                    GeneratedImage.parable_id == parable_id
+                ).count()
             
             if not prompts:
                 raise Exception("No image prompts found. Please run step 2 first.")
             
-            # Проверяем, сколько изображений уже есть
-            existing_images_count = db.query(GeneratedImage).filter(
-                GeneratedImage.parable_id == parable_id
-            ).count()
-            
             print(f"[Parable {parable_id}] Found {existing_images_count}/{len(prompts)} existing images")
             
             # Генерируем только если не все изображения готовы
             if existing_images_count < len(prompts):
-                image_prompts = [p.prompt_text for p in prompts]
+                image_prompts = [prompt_text for _, _, prompt_text in prompts]
                 image_paths = await gemini_service.generate_images_with_context(
                     image_prompts,
                     parable_id
                 )
                 
-                # Удаляем старые записи из БД (если были частично сгенерированы)
-                db.query(GeneratedImage).filter(
-                    GeneratedImage.parable_id == parable_id
-                ).delete()
-                db.commit()
-                
-                # Сохраняем ВСЕ изображения в БД заново
-                saved_count = 0
-                for idx, image_path in enumerate(image_paths):
-                    if image_path:  # Проверяем что изображение действительно есть
-                        # Используем scene_order из промпта, а не idx
-                        prompt = prompts[idx]
-                        image = GeneratedImage(
-                            parable_id=parable_id,
-                            prompt_id=prompt.id,
-                            image_path=image_path,
-                            scene_order=prompt.scene_order  # -1 для хука, 0,1,2... для остальных
-                        )
-                        db.add(image)
-                        saved_count += 1
-                db.commit()
+                with session_scope() as db:
+                    # Удаляем старые записи из БД (если были частично сгенерированы)
+                    db.query(GeneratedImage).filter(
+                        GeneratedImage.parable_id == parable_id
+                    ).delete()
+                    
+                    # Сохраняем ВСЕ изображения в БД заново
+                    saved_count = 0
+                    for idx, image_path in enumerate(image_paths):
+                        if image_path:  # Проверяем что изображение действительно есть
+                            # Используем scene_order из промпта, а не idx
+                            prompt_id, scene_order, _ = prompts[idx]
+                            image = GeneratedImage(
+                                parable_id=parable_id,
+                                prompt_id=prompt_id,
+                                image_path=image_path,
+                                scene_order=scene_order  # -1 для хука, 0,1,2... для остальных
+                            )
+                            db.add(image)
+                            saved_count += 1
                 
                 print(f"[Parable {parable_id}] Saved {saved_count}/{len(prompts)} images to database")
                 
@@ -324,9 +408,10 @@ async def process_parable_pipeline(parable_id: int, db: Session):
                 print(f"[Parable {parable_id}] All images already exist, using existing...")
             
             # Финальная проверка
-            final_count = db.query(GeneratedImage).filter(
-                GeneratedImage.parable_id == parable_id
-            ).count()
+            with session_scope() as db:
+                final_count = db.query(GeneratedImage).filter(
+                    GeneratedImage.parable_id == parable_id
+                ).count()
             
             if final_count < len(prompts):
                 raise Exception(f"Image generation incomplete: {final_count}/{len(prompts)} images. Please retry step 3.")
@@ -336,31 +421,35 @@ async def process_parable_pipeline(parable_id: int, db: Session):
             print(f"[Parable {parable_id}] ⏭️  Step 3 already completed, skipping...")
             
             # Даже если пропускаем, проверяем что изображения есть
-            prompts_count = db.query(ImagePrompt).filter(
-                ImagePrompt.parable_id == parable_id
-            ).count()
-            images_count = db.query(GeneratedImage).filter(
-                GeneratedImage.parable_id == parable_id
-            ).count()
+            with session_scope() as db:
+                prompts_count = db.query(ImagePrompt).filter(
+                    ImagePrompt.parable_id == parable_id
+                ).count()
+                images_count = db.query(GeneratedImage).filter(
+                    GeneratedImage.parable_id == parable_id
+                ).count()
+                
+                if images_count < prompts_count:
+                    db.query(Parable).filter(Parable.id == parable_id).update({"current_step": 3})
             
             if images_count < prompts_count:
                 print(f"[Parable {parable_id}] ⚠️  Warning: Only {images_count}/{prompts_count} images found!")
                 print(f"[Parable {parable_id}] Re-running step 3...")
-                parable.current_step = 3
-                db.commit()
                 # Рекурсивно вызываем этот же блок
-                return await process_parable_pipeline(parable_id, db)
+                return await process_parable_pipeline(parable_id, bypass_cache)
         
         # Шаг 4: Аудио (пользователь загружает вручную)
         if start_step <= 4:
             print(f"[Parable {parable_id}] Step 4: Audio (manual upload)...")
-            parable.current_step = 4
-            db.commit()
+            current_step = 4
             
-            # Проверяем, есть ли уже аудио
-            existing_audio = db.query(AudioFile).filter(
-                AudioFile.parable_id == parable_id
-            ).first()
+            with session_scope() as db:
+                db.query(Parable).filter(Parable.id == parable_id).update({"current_step": 4})
+                
+                # Проверяем, есть ли уже аудио
+                existing_audio = db.query(AudioFile).filter(
+                    AudioFile.parable_id == parable_id
+                ).first() is not None
             
             if existing_audio:
                 print(f"[Parable {parable_id}] ✅ Audio already uploaded")
@@ -374,37 +463,39 @@ async def process_parable_pipeline(parable_id: int, db: Session):
         # Финальная проверка перед завершением
         print(f"[Parable {parable_id}] Running final checks...")
         
-        # Проверяем что все данные на месте
-        prompts_count = db.query(ImagePrompt).filter(
-            ImagePrompt.parable_id == parable_id
-        ).count()
-        images_count = db.query(GeneratedImage).filter(
-            GeneratedImage.parable_id == parable_id
-        ).count()
-        audio_count = db.query(AudioFile).filter(
-            AudioFile.parable_id == parable_id
-        ).count()
-        
-        print(f"[Parable {parable_id}] Final check results:")
-        print(f"  - TTS text: {'✅' if parable.text_for_tts else '❌'}")
-        print(f"  - Prompts: {prompts_count} {'✅' if prompts_count > 0 else '❌'}")
-        print(f"  - Images: {images_count}/{prompts_count} {'✅' if images_count == prompts_count else '❌'}")
-        print(f"  - Audio: {audio_count} {'⏸️  Manual upload required' if audio_count == 0 else '✅'}")
-        
-        # Проверяем критичные данные
-        if not parable.text_for_tts:
-            raise Exception("TTS text is missing!")
-        if prompts_count == 0:
-            raise Exception("No image prompts found!")
-        if images_count < prompts_count:
-            raise Exception(f"Images incomplete: {images_count}/{prompts_count}. Please retry step 3.")
-        
-        # Аудио теперь загружается вручную, не требуем его сразу
-        # Обновляем статус
-        parable.status = "awaiting_audio"
-        parable.current_step = 5
-        parable.error_message = None
-        db.commit()
+        with session_scope() as db:
+            parable = db.query(Parable).filter(Parable.id == parable_id).first()
+            
+            # Проверяем что все данные на месте
+            prompts_count = db.query(ImagePrompt).filter(
+                ImagePrompt.parable_id == parable_id
+            ).count()
+            images_count = db.query(GeneratedImage).filter(
+                GeneratedImage.parable_id == parable_id
+            ).count()
+            audio_count = db.query(AudioFile).filter(
+                AudioFile.parable_id == parable_id
+            ).count()
+            
+            print(f"[Parable {parable_id}] Final check results:")
+            print(f"  - TTS text: {'✅' if parable.text_for_tts else '❌'}")
+            print(f"  - Prompts: {prompts_count} {'✅' if prompts_count > 0 else '❌'}")
+            print(f"  - Images: {images_count}/{prompts_count} {'✅' if images_count == prompts_count else '❌'}")
+            print(f"  - Audio: {audio_count} {'⏸️  Manual upload required' if audio_count == 0 else '✅'}")
+            
+            # Проверяем критичные данные
+            if not parable.text_for_tts:
+                raise Exception("TTS text is missing!")
+            if prompts_count == 0:
+                raise Exception("No image prompts found!")
+            if images_count < prompts_count:
+                raise Exception(f"Images incomplete: {images_count}/{prompts_count}. Please retry step 3.")
+            
+            # Аудио теперь загружается вручную, не требуем его сразу
+            # Обновляем статус
+            parable.status = "awaiting_audio"
+            parable.current_step = 5
+            parable.error_message = None
         
         print(f"[Parable {parable_id}] ✅ Processing completed!")
         print(f"[Parable {parable_id}] ⏸️  Please upload audio file manually.")
@@ -413,13 +504,25 @@ async def process_parable_pipeline(parable_id: int, db: Session):
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"[Parable {parable_id}] ❌ Error at step {parable.current_step}: {str(e)}")
+        print(f"[Parable {parable_id}] ❌ Error at step {current_step}: {str(e)}")
         print(error_details)
         
-        parable = db.query(Parable).filter(Parable.id == parable_id).first()
-        parable.status = "error"
-        parable.error_message = f"Step {parable.current_step}: {str(e)}"
-        db.commit()
+        with session_scope() as db:
+            parable = db.query(Parable).filter(Parable.id == parable_id).first()
+            if parable:
+                parable.status = "error"
+                parable.error_message = f"Step {parable.current_step}: {str(e)}"
+
+
+async def probe_upload_duration(path: Path) -> float:
+    """
+    Длительность загруженного файла по заголовкам контейнера (ffprobe)
+    Нечитаемый файл — ошибка клиента, а не сервера
+    """
+    try:
+        return (await aprobe_media(str(path)))["duration"]
+    except (RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read media file: {e}")
 
 
 @app.post("/parables/{parable_id}/audio/upload")
@@ -447,10 +550,8 @@ async def upload_audio(
     with open(audio_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
     
-    # Получаем длительность аудио
-    from pydub import AudioSegment
-    audio_segment = AudioSegment.from_file(str(audio_path))
-    duration = len(audio_segment) / 1000.0  # в секундах
+    # Получаем длительность аудио из заголовков файла (без декодирования)
+    duration = await probe_upload_duration(audio_path)
     
     # Удаляем старое аудио если есть
     existing_audio = db.query(AudioFile).filter(
@@ -509,7 +610,7 @@ async def upload_video_fragment(
         shutil.copyfileobj(file.file, buffer)
     
     # Получаем длительность видео
-    duration = await video_service.get_video_duration(str(video_path))
+    duration = await probe_upload_duration(video_path)
     
     # Получаем соответствующее изображение
     image = db.query(GeneratedImage).filter(
@@ -527,6 +628,12 @@ async def upload_video_fragment(
     )
     db.add(video_fragment)
     db.commit()
+    
+    # Нормализуем фрагмент в фоне, чтобы рендеры не перекодировали его каждый раз
+    if settings.fragment_normalize_enabled:
+        video_fragment.normalize_status = "pending"
+        enqueue_job(db, "normalize_fragment", video_fragment.id)
+    
     db.refresh(video_fragment)
     
     return video_fragment
@@ -560,7 +667,6 @@ async def update_video_duration(
 @app.post("/parables/{parable_id}/regenerate-images", response_model=ProcessingStatus)
 async def regenerate_images(
     parable_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -578,70 +684,72 @@ async def regenerate_images(
     if prompts_count == 0:
         raise HTTPException(status_code=400, detail="No image prompts found. Please run processing first.")
     
-    # Запускаем генерацию в фоне
-    background_tasks.add_task(regenerate_images_task, parable_id, db)
+    # Ставим генерацию в очередь
+    job = enqueue_job(db, "regenerate_images", parable_id)
     
     return ProcessingStatus(
         status="processing",
         message=f"Image regeneration started for {prompts_count} scenes",
-        parable_id=parable_id
+        parable_id=parable_id,
+        job_id=job.id
     )
 
 
-async def regenerate_images_task(parable_id: int, db: Session):
+async def regenerate_images_task(parable_id: int):
     """
     Задача перегенерации изображений
     """
     try:
-        parable = db.query(Parable).filter(Parable.id == parable_id).first()
-        
         print(f"[Parable {parable_id}] Starting image regeneration...")
         
         # Получаем промпты
-        prompts = db.query(ImagePrompt).filter(
-            ImagePrompt.parable_id == parable_id
-        ).order_by(ImagePrompt.scene_order).all()
+        with session_scope() as db:
+            prompts = [
+                (p.id, p.scene_order, p.prompt_text)
+                for p in db.query(ImagePrompt).filter(
+                    ImagePrompt.parable_id == parable_id
+                ).order_by(ImagePrompt.scene_order).all()
+            ]
         
         if not prompts:
             print(f"[Parable {parable_id}] ❌ No prompts found")
             return
         
         # Генерируем изображения
-        image_prompts = [p.prompt_text for p in prompts]
+        image_prompts = [prompt_text for _, _, prompt_text in prompts]
         image_paths = await gemini_service.generate_images_with_context(
             image_prompts,
             parable_id
         )
         
-        # Удаляем старые записи из БД
-        db.query(GeneratedImage).filter(
-            GeneratedImage.parable_id == parable_id
-        ).delete()
-        db.commit()
-        
-        # Сохраняем новые изображения
-        saved_count = 0
-        for idx, image_path in enumerate(image_paths):
-            if image_path:
-                # Используем scene_order из промпта, а не idx
-                prompt = prompts[idx]
-                image = GeneratedImage(
-                    parable_id=parable_id,
-                    prompt_id=prompt.id,
-                    image_path=image_path,
-                    scene_order=prompt.scene_order  # -1 для хука, 0,1,2... для остальных
-                )
-                db.add(image)
-                saved_count += 1
-        db.commit()
+        with session_scope() as db:
+            # Удаляем старые записи из БД
+            db.query(GeneratedImage).filter(
+                GeneratedImage.parable_id == parable_id
+            ).delete()
+            
+            # Сохраняем новые изображения
+            saved_count = 0
+            for idx, image_path in enumerate(image_paths):
+                if image_path:
+                    # Используем scene_order из промпта, а не idx
+                    prompt_id, scene_order, _ = prompts[idx]
+                    image = GeneratedImage(
+                        parable_id=parable_id,
+                        prompt_id=prompt_id,
+                        image_path=image_path,
+                        scene_order=scene_order  # -1 для хука, 0,1,2... для остальных
+                    )
+                    db.add(image)
+                    saved_count += 1
+            
+            # Обновляем current_step если нужно
+            parable = db.query(Parable).filter(Parable.id == parable_id).first()
+            if saved_count == len(prompts) and parable.current_step < 4:
+                parable.current_step = 3
         
         print(f"[Parable {parable_id}] ✅ Image regeneration completed: {saved_count}/{len(prompts)} images")
         
-        # Обновляем current_step если нужно
-        if saved_count == len(prompts) and parable.current_step < 4:
-            parable.current_step = 3
-            db.commit()
-        
     except Exception as e:
         print(f"[Parable {parable_id}] ❌ Error regenerating images: {str(e)}")
 
@@ -649,11 +757,170 @@ async def regenerate_images_task(parable_id: int, db: Session):
 @app.post("/parables/{parable_id}/generate-final", response_model=ProcessingStatus)
 async def generate_final_video(
     parable_id: int,
-    background_tasks: BackgroundTasks,
+    mode: str = "final",
     db: Session = Depends(get_db)
 ):
     """
     Генерирует финальное видео
+    mode=preview — быстрый черновой рендер (меньше разрешение, ultrafast), mode=final — итоговое качество
+    """
+    if mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown render mode: {mode}")
+    
+    job = queue_final_render(db, parable_id, mode)
+    
+    return ProcessingStatus(
+        status="generating_final",
+        message="Final video generation started",
+        parable_id=parable_id,
+        job_id=job.id
+    )
+
+
+@app.get("/parables/{parable_id}/generate-final/timeline")
+async def get_final_video_timeline(
+    parable_id: int,
+    mode: str = "final",
+    db: Session = Depends(get_db)
+):
+    """
+    Dry-run: временная карта финального видео без рендера
+    Для каждого фрагмента — итоговая скорость (target_duration × подгонка под озвучку × 60 секунд),
+    место на итоговой шкале времени и границы в кадрах
+    """
+    if mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown render mode: {mode}")
+    
+    parable = db.query(Parable).filter(Parable.id == parable_id).first()
+    if not parable:
+        raise HTTPException(status_code=404, detail="Parable not found")
+    
+    return await plan_final_video_or_400(final_video_inputs(db, parable_id), mode)
+
+
+@app.get("/parables/{parable_id}/generate-final/plan")
+async def get_final_video_render_plan(
+    parable_id: int,
+    mode: str = "final",
+    db: Session = Depends(get_db)
+):
+    """
+    Dry-run с оценкой стоимости рендера: входные файлы, временная карта, субтитры,
+    параметры кодирования, прогноз времени и пиковой памяти (по истории render_metrics)
+    """
+    if mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown render mode: {mode}")
+    
+    parable = db.query(Parable).filter(Parable.id == parable_id).first()
+    if not parable:
+        raise HTTPException(status_code=404, detail="Parable not found")
+    
+    return await estimate_final_video(db, final_video_inputs(db, parable_id), mode)
+
+
+def fragment_render_path(video_fragment) -> str:
+    """
+    Файл фрагмента для рендера: нормализованная версия, если она уже готова
+    """
+    if video_fragment.normalize_status == "done" and video_fragment.normalized_path:
+        return video_fragment.normalized_path
+    return video_fragment.video_path
+
+
+def final_video_inputs(db: Session, parable_id: int) -> dict:
+    """
+    Входные данные рендера финального видео: фрагменты, озвучка, текст субтитров, музыка
+    """
+    from models import ParableMusic
+    
+    parable = db.query(Parable).filter(Parable.id == parable_id).first()
+    video_fragments = db.query(VideoFragment).filter(
+        VideoFragment.parable_id == parable_id
+    ).order_by(VideoFragment.scene_order).all()
+    audio_file = db.query(AudioFile).filter(AudioFile.parable_id == parable_id).first()
+    parable_music = db.query(ParableMusic).filter(ParableMusic.parable_id == parable_id).first()
+    music_track = parable_music.music_track if parable_music else None
+    
+    return {
+        "text_for_subtitles": parable.text_for_tts if parable else None,
+        "video_paths": [fragment_render_path(vf) for vf in video_fragments],
+        "target_durations": [vf.target_duration for vf in video_fragments],
+        "audio_path": audio_file.audio_path if audio_file else None,
+        "music_path": music_track.file_path if music_track else None,
+        "music_name": music_track.name if music_track else None,
+        "music_volume_db": parable_music.volume_level if music_track else -18.0,
+    }
+
+
+def english_final_video_inputs(db: Session, english_parable_id: int) -> dict:
+    """
+    Входные данные рендера финального видео английской версии (см. final_video_inputs)
+    """
+    from models import EnglishParableMusic
+    
+    english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
+    video_fragments = db.query(EnglishVideoFragment).filter(
+        EnglishVideoFragment.english_parable_id == english_parable_id
+    ).order_by(EnglishVideoFragment.scene_order).all()
+    audio_file = db.query(EnglishAudioFile).filter(
+        EnglishAudioFile.english_parable_id == english_parable_id
+    ).first()
+    english_parable_music = db.query(EnglishParableMusic).filter(
+        EnglishParableMusic.english_parable_id == english_parable_id
+    ).first()
+    music_track = english_parable_music.music_track if english_parable_music else None
+    
+    return {
+        "text_for_subtitles": english_parable.text_for_tts if english_parable else None,
+        "video_paths": [fragment_render_path(vf) for vf in video_fragments],
+        "target_durations": [vf.target_duration for vf in video_fragments],
+        "audio_path": audio_file.audio_path if audio_file else None,
+        "music_path": music_track.file_path if music_track else None,
+        "music_name": music_track.name if music_track else None,
+        "music_volume_db": english_parable_music.volume_level if music_track else -18.0,
+    }
+
+
+def require_render_inputs(inputs: dict):
+    if not inputs["video_paths"]:
+        raise HTTPException(status_code=400, detail="No video fragments uploaded")
+    if not inputs["audio_path"]:
+        raise HTTPException(status_code=400, detail="No audio file found")
+
+
+async def plan_final_video_or_400(inputs: dict, mode: str) -> dict:
+    """
+    Временная карта для dry-run эндпоинтов; отсутствующие или нечитаемые файлы — ошибка клиента
+    """
+    require_render_inputs(inputs)
+    try:
+        return await video_service.plan_final_video(
+            inputs["video_paths"],
+            inputs["audio_path"],
+            inputs["target_durations"],
+            get_encoder_profile(mode)["fps"]
+        )
+    except (RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read media file: {e}")
+
+
+def check_active_render_mode(db: Session, job_type: str, target_id: int, mode: str):
+    """
+    Повторный запрос рендера возвращает уже идущую задачу; если она в другом режиме — 409,
+    иначе render_mode сущности разошёлся бы с режимом, в котором задача на самом деле рендерит
+    """
+    job = active_job(db, job_type, target_id)
+    active_mode = (job.payload or {}).get("render_mode", "final") if job else None
+    if job and active_mode != mode:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Render in {active_mode} mode is already in progress (job {job.id})"
+        )
+
+
+def queue_final_render(db: Session, parable_id: int, mode: str) -> Job:
+    """
+    Проверяет, что для рендера всё загружено, и ставит рендер финального видео в очередь
     """
     parable = db.query(Parable).filter(Parable.id == parable_id).first()
     if not parable:
@@ -674,83 +941,295 @@ async def generate_final_video(
     if not audio_file:
         raise HTTPException(status_code=400, detail="No audio file found")
     
+    check_active_render_mode(db, "generate_final", parable_id, mode)
+    
     # Обновляем статус
     parable.status = "generating_final"
-    db.commit()
+    parable.render_mode = mode
     
-    # Запускаем генерацию в фоне
-    background_tasks.add_task(generate_final_video_task, parable_id, db)
+    # Ставим рендер в очередь (коммитится вместе со статусом)
+    return enqueue_job(db, "generate_final", parable_id, {"render_mode": mode})
+
+
+def queue_english_final_render(db: Session, parable_id: int, mode: str) -> Job:
+    """
+    То же для английской версии притчи parable_id (задача ставится на EnglishParable)
+    """
+    english_parable = db.query(EnglishParable).filter(
+        EnglishParable.parable_id == parable_id
+    ).first()
     
-    return ProcessingStatus(
-        status="generating_final",
-        message="Final video generation started",
-        parable_id=parable_id
-    )
+    if not english_parable:
+        raise HTTPException(status_code=404, detail="English version not found")
+    
+    # Проверяем наличие всех необходимых данных
+    video_fragments = db.query(EnglishVideoFragment).filter(
+        EnglishVideoFragment.english_parable_id == english_parable.id
+    ).order_by(EnglishVideoFragment.scene_order).all()
+    
+    if not video_fragments:
+        raise HTTPException(status_code=400, detail="No video fragments uploaded")
+    
+    audio_file = db.query(EnglishAudioFile).filter(
+        EnglishAudioFile.english_parable_id == english_parable.id
+    ).first()
+    
+    if not audio_file:
+        raise HTTPException(status_code=400, detail="No audio file found")
+    
+    check_active_render_mode(db, "generate_english_final", english_parable.id, mode)
+    
+    # Обновляем статус
+    english_parable.status = "generating_final"
+    english_parable.render_mode = mode
+    
+    # Ставим рендер в очередь (коммитится вместе со статусом)
+    return enqueue_job(db, "generate_english_final", english_parable.id, {"render_mode": mode})
 
 
-async def generate_final_video_task(parable_id: int, db: Session):
+def render_batch_progress(db: Session, batch: RenderBatch) -> dict:
     """
-    Задача генерации финального видео
+    Прогресс пакета по задачам очереди: статусы элементов, сводка и пропускная способность
+    """
+    job_ids = [item["job_id"] for item in batch.items if item["job_id"]]
+    jobs = {job.id: job for job in db.query(Job).filter(Job.id.in_(job_ids)).all()} if job_ids else {}
+    
+    # Притчи нужны для пути к готовому видео; итог рендера — статус задачи
+    targets = {}
+    for model, job_type in ((Parable, "generate_final"), (EnglishParable, "generate_english_final")):
+        ids = [job.target_id for job in jobs.values() if job.job_type == job_type]
+        if ids:
+            for entity in db.query(model).filter(model.id.in_(ids)).all():
+                targets[(job_type, entity.id)] = entity
+    
+    counts = {status: 0 for status in ("queued", "running", "done", "failed", "cancelled", "skipped")}
+    items = []
+    render_seconds = []
+    for item in batch.items:
+        job = jobs.get(item["job_id"])
+        entity = targets.get((job.job_type, job.target_id)) if job else None
+        status = job.status if job else "skipped"
+        error = item["error"] or (job.error_message if job else None)
+        if status == "done" and job.started_at and job.finished_at:
+            render_seconds.append((job.finished_at - job.started_at).total_seconds())
+        counts[status] += 1
+        items.append({
+            "parable_id": item["parable_id"],
+            "language": item["language"],
+            "job_id": item["job_id"],
+            "status": status,
+            "error": error,
+            "final_video_path": entity.final_video_path if entity is not None and status == "done" else None,
+        })
+    
+    # Пропускная способность — по окну выполнения задач пакета (от первого старта до последнего завершения)
+    started = [job.started_at for job in jobs.values() if job.started_at]
+    finished = [job.finished_at for job in jobs.values() if job.finished_at]
+    elapsed = (max(finished) - min(started)).total_seconds() if started and finished else None
+    completed = counts["done"] + counts["failed"]
+    renders_per_hour = completed / elapsed * 3600 if elapsed and completed else None
+    remaining = counts["queued"] + counts["running"]
+    
+    return {
+        "id": batch.id,
+        "mode": batch.mode,
+        "created_at": batch.created_at,
+        "total": len(items),
+        "counts": counts,
+        "progress": round((len(jobs) - remaining) / len(jobs), 4) if jobs else 1.0,
+        "throughput": {
+            "elapsed_seconds": round(elapsed, 1) if elapsed else None,
+            "renders_per_hour": round(renders_per_hour, 2) if renders_per_hour else None,
+            "avg_render_seconds": round(sum(render_seconds) / len(render_seconds), 1) if render_seconds else None,
+            "eta_seconds": round(remaining / renders_per_hour * 3600) if renders_per_hour and remaining else None,
+        },
+        "host_concurrency_limit": render_host_concurrency_limit(),
+        "cluster_concurrency_limit": settings.render_cluster_concurrency or None,
+        "items": items,
+    }
+
+
+def record_render_metric(db: Session, target_type: str, target_id: int, stats: dict):
+    """
+    Сохраняет замеры рендера — история для оценки стоимости следующих рендеров
+    """
+    if stats.get("frames") is None:
+        return
+    db.add(RenderMetric(
+        target_type=target_type,
+        target_id=target_id,
+        backend=stats["backend"],
+        mode=stats["mode"],
+        frames=stats["frames"],
+        megapixels=stats["megapixels"],
+        fragments=stats["fragments"],
+        segments_rendered=stats.get("segment_misses"),
+        render_seconds=stats["render_seconds"],
+        peak_memory_mb=stats.get("peak_memory_mb")
+    ))
+
+
+def render_history(db: Session, backend: str, mode: str) -> List[dict]:
+    """
+    Последние замеры рендеров того же бэкенда и режима
+    """
+    metrics = db.query(RenderMetric).filter(
+        RenderMetric.backend == backend,
+        RenderMetric.mode == mode
+    ).order_by(RenderMetric.id.desc()).limit(settings.render_estimate_history).all()
+    return [
+        {
+            "frames": m.frames,
+            "megapixels": m.megapixels,
+            "fragments": m.fragments,
+            "segments_rendered": m.segments_rendered,
+            "render_seconds": m.render_seconds,
+            "peak_memory_mb": m.peak_memory_mb,
+        }
+        for m in metrics
+    ]
+
+
+async def estimate_final_video(db: Session, inputs: dict, mode: str) -> dict:
+    """
+    Dry-run рендера: метаданные входных файлов, временная карта, число фраз субтитров,
+    параметры кодирования и прогноз времени и пиковой памяти по истории рендеров
+    """
+    require_render_inputs(inputs)
+    profile = get_encoder_profile(mode)
+    has_music = bool(inputs["music_path"] and Path(inputs["music_path"]).exists())
+    
+    try:
+        fragments = await asyncio.gather(*(aprobe_media(path) for path in inputs["video_paths"]))
+        narration = await aprobe_media(inputs["audio_path"])
+        music = await aprobe_media(inputs["music_path"]) if has_music else None
+    except (RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read media file: {e}")
+    
+    try:
+        plan = plan_timeline(
+            [info["duration"] for info in fragments],
+            inputs["target_durations"],
+            narration["duration"],
+            profile["fps"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not plan timeline: {e}")
+    
+    subtitle_phrases = 0
+    if inputs["text_for_subtitles"]:
+        cues = await asyncio.to_thread(
+            build_subtitle_cues, inputs["text_for_subtitles"], narration["duration"], inputs["audio_path"]
+        )
+        subtitle_phrases = len(cues)
+    
+    # Размер кадра как у рендера: наибольший из фрагментов, для превью — уменьшенный
+    width, height = scaled_size(
+        max(info.get("width", 0) for info in fragments),
+        max(info.get("height", 0) for info in fragments),
+        profile["height"]
+    )
+    features = render_features(
+        int(round(plan["final_duration"] * profile["fps"])), width, height, len(fragments)
+    )
+    
+    backend = settings.render_backend
+    estimate = estimate_render(features, render_history(db, backend, mode), backend)
+    
+    return {
+        "backend": backend,
+        "mode": mode,
+        "inputs": {
+            "fragments": fragments,
+            "narration": narration,
+            "music": music,
+        },
+        "timeline": plan,
+        "subtitle_phrases": subtitle_phrases,
+        "encoder": {**profile, "width": width, "height": height},
+        "features": features,
+        "estimate": estimate,
+    }
+
+
+async def normalize_fragment_task(model, fragment_id: int):
+    """
+    Задача нормализации загруженного видеофрагмента (VideoFragment или EnglishVideoFragment)
     """
+    with session_scope() as db:
+        fragment = db.query(model).filter(model.id == fragment_id).first()
+        if not fragment:
+            return
+        video_path = fragment.video_path
+    
     try:
-        parable = db.query(Parable).filter(Parable.id == parable_id).first()
+        normalized_path, media_info = await normalize_fragment(video_path, fragment_id)
         
-        # Получаем все видеофрагменты
-        video_fragments = db.query(VideoFragment).filter(
-            VideoFragment.parable_id == parable_id
-        ).order_by(VideoFragment.scene_order).all()
+        with session_scope() as db:
+            fragment = db.query(model).filter(model.id == fragment_id).first()
+            # Пока шла нормализация, фрагмент могли удалить или заменить: результат принимается,
+            # только если он записан под именем именно этого фрагмента
+            if fragment and str(normalized_path_for(fragment.video_path, fragment.id)) == normalized_path:
+                fragment.normalized_path = normalized_path
+                fragment.media_info = media_info
+                fragment.normalize_status = "done"
         
-        video_paths = [vf.video_path for vf in video_fragments]
-        target_durations = [vf.target_duration for vf in video_fragments]
+    except Exception as e:
+        print(f"[{model.__name__} {fragment_id}] Error normalizing fragment: {str(e)}")
+        with session_scope() as db:
+            fragment = db.query(model).filter(model.id == fragment_id).first()
+            if fragment:
+                fragment.normalize_status = "error"
+
+
+async def generate_final_video_task(parable_id: int, render_mode: str = "final"):
+    """
+    Задача генерации финального видео
+    """
+    try:
+        with session_scope() as db:
+            inputs = final_video_inputs(db, parable_id)
         
-        # Получаем аудио
-        audio_file = db.query(AudioFile).filter(
-            AudioFile.parable_id == parable_id
-        ).first()
+        if not inputs["audio_path"]:
+            raise ValueError("No audio file found")
         
         print(f"[Parable {parable_id}] Generating final video...")
-        
-        # Получаем музыку если назначена
-        from models import ParableMusic
-        parable_music = db.query(ParableMusic).filter(
-            ParableMusic.parable_id == parable_id
-        ).first()
-        
-        music_path = None
-        music_volume = -18.0
-        
-        if parable_music and parable_music.music_track:
-            music_path = parable_music.music_track.file_path
-            music_volume = parable_music.volume_level
-            print(f"[Parable {parable_id}] Using music: {parable_music.music_track.name}")
-        
-        # Создаём финальное видео
-        final_path, duration = await video_service.create_final_video(
-            video_paths=video_paths,
-            audio_path=audio_file.audio_path,
-            text_for_subtitles=parable.text_for_tts,
+        if inputs["music_path"]:
+            print(f"[Parable {parable_id}] Using music: {inputs['music_name']}")
+        
+        # Создаём финальное видео (без открытой сессии БД)
+        final_path, duration, render_stats = await video_service.create_final_video(
+            video_paths=inputs["video_paths"],
+            audio_path=inputs["audio_path"],
+            text_for_subtitles=inputs["text_for_subtitles"],
             parable_id=parable_id,
-            music_path=music_path,
-            music_volume_db=music_volume,
-            target_durations=target_durations
+            music_path=inputs["music_path"],
+            music_volume_db=inputs["music_volume_db"],
+            target_durations=inputs["target_durations"],
+            render_mode=render_mode
         )
         
         # Обновляем притчу
-        parable.final_video_path = final_path
-        parable.final_video_duration = float(duration)  # Конвертируем numpy.float64 в Python float
-        parable.status = "completed"
-        db.commit()
+        with session_scope() as db:
+            parable = db.query(Parable).filter(Parable.id == parable_id).first()
+            parable.final_video_path = final_path
+            parable.final_video_duration = float(duration)  # Конвертируем numpy.float64 в Python float
+            parable.render_mode = render_mode
+            parable.render_stats = render_stats
+            parable.status = "completed"
+            record_render_metric(db, "parable", parable_id, render_stats)
         
         print(f"[Parable {parable_id}] Final video generated: {final_path}")
         
     except Exception as e:
         print(f"[Parable {parable_id}] Error generating final video: {str(e)}")
-        db.rollback()  # Откатываем неудачную транзакцию
-        parable = db.query(Parable).filter(Parable.id == parable_id).first()
-        if parable:
-            parable.status = "error"
-            parable.error_message = str(e)
-            db.commit()
+        with session_scope() as db:
+            parable = db.query(Parable).filter(Parable.id == parable_id).first()
+            if parable:
+                parable.status = "error"
+                parable.error_message = str(e)
+        # Ошибка рендера — ошибка задачи: очередь повторит её или отметит failed
+        raise
 
 
 @app.delete("/parables/{parable_id}")
@@ -778,6 +1257,152 @@ async def delete_parable(parable_id: int, db: Session = Depends(get_db)):
     return {"message": "Parable deleted successfully"}
 
 
+# ═══════════════════════════════════════════════════════════════
+# JOB QUEUE ENDPOINTS
+# ═══════════════════════════════════════════════════════════════
+
+@app.get("/jobs", response_model=List[JobResponse])
+async def get_jobs(status: Optional[str] = None, limit: int = 50, db: Session = Depends(get_db)):
+    """
+    Получает последние задачи очереди (опционально с фильтром по статусу)
+    """
+    query = db.query(Job)
+    if status:
+        query = query.filter(Job.status == status)
+    return query.order_by(Job.id.desc()).limit(min(limit, 500)).all()
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Получает состояние задачи
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job_endpoint(job_id: int, db: Session = Depends(get_db)):
+    """
+    Отменяет задачу; выполняющийся рендер останавливается воркером (в пределах JOB_HEARTBEAT_SECONDS)
+    """
+    job = db.query(Job).filter(Job.id == job_id).with_for_update().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status not in ACTIVE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Job is already {job.status}")
+    return cancel_job(db, job)
+
+
+# ═══════════════════════════════════════════════════════════════
+# SYSTEM ENDPOINTS
+# ═══════════════════════════════════════════════════════════════
+
+@app.get("/system/db-pool")
+async def get_db_pool_stats():
+    """
+    Состояние пула соединений БД (занятые, overflow, время ожидания)
+    """
+    return get_pool_stats()
+
+
+# ═══════════════════════════════════════════════════════════════
+# LLM CACHE ENDPOINTS
+# ═══════════════════════════════════════════════════════════════
+
+@app.get("/llm-cache/stats")
+async def get_llm_cache_stats():
+    """
+    Статистика кеша ответов LLM (попадания, промахи, размер)
+    """
+    return llm_cache.stats()
+
+
+@app.delete("/llm-cache")
+async def clear_llm_cache():
+    """
+    Очищает кеш ответов LLM
+    """
+    llm_cache.clear()
+    return {"message": "LLM cache cleared"}
+
+
+# ═══════════════════════════════════════════════════════════════
+# RENDER CACHE ENDPOINTS
+# ═══════════════════════════════════════════════════════════════
+
+@app.get("/render-cache/stats")
+async def get_render_cache_stats():
+    """
+    Статистика кеша сегментов рендера (попадания, промахи, размер на диске)
+    """
+    return render_cache.stats()
+
+
+@app.delete("/render-cache")
+async def clear_render_cache():
+    """
+    Очищает кеш сегментов рендера
+    """
+    render_cache.clear()
+    return {"message": "Render cache cleared"}
+
+
+# ═══════════════════════════════════════════════════════════════
+# RENDER BATCH ENDPOINTS
+# ═══════════════════════════════════════════════════════════════
+
+@app.post("/render-batches")
+async def create_render_batch(request: RenderBatchCreate, db: Session = Depends(get_db)):
+    """
+    Пакетный рендер финальных видео многих притч (русских и/или английских версий)
+    
+    Все рендеры ставятся в очередь сразу; на каждой машине одновременно выполняется не больше
+    render_host_concurrency_limit() рендеров (ядра машины делятся между ними).
+    Притча без фрагментов или озвучки не прерывает пакет — ошибка записывается в её элемент.
+    """
+    if request.mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown render mode: {request.mode}")
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No parables in batch")
+    for item in request.items:
+        if item.language not in ("ru", "en"):
+            raise HTTPException(status_code=400, detail=f"Unknown language: {item.language}")
+    
+    items = []
+    for item in request.items:
+        queue_render = queue_english_final_render if item.language == "en" else queue_final_render
+        entry = {"parable_id": item.parable_id, "language": item.language, "job_id": None, "error": None}
+        try:
+            entry["job_id"] = queue_render(db, item.parable_id, request.mode).id
+        except HTTPException as e:
+            db.rollback()
+            entry["error"] = e.detail
+        items.append(entry)
+    
+    batch = RenderBatch(mode=request.mode, items=items)
+    db.add(batch)
+    db.commit()
+    db.refresh(batch)
+    
+    skipped = sum(1 for entry in items if entry["error"])
+    print(f"[Render Batch {batch.id}] {len(items) - skipped} renders queued, {skipped} skipped")
+    return render_batch_progress(db, batch)
+
+
+@app.get("/render-batches/{batch_id}")
+async def get_render_batch(batch_id: int, db: Session = Depends(get_db)):
+    """
+    Прогресс пакетного рендера: статусы элементов, сводка, пропускная способность и оценка времени
+    """
+    batch = db.query(RenderBatch).filter(RenderBatch.id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Render batch not found")
+    return render_batch_progress(db, batch)
+
+
 # ═══════════════════════════════════════════════════════════════
 # TITLE VARIANTS (A/B TESTING) ENDPOINTS
 # ═══════════════════════════════════════════════════════════════
@@ -887,10 +1512,12 @@ async def select_english_title_variant(parable_id: int, variant_id: int, db: Ses
 @app.post("/parables/{parable_id}/english/create", response_model=EnglishParableResponse)
 async def create_english_version(
     parable_id: int,
+    force_regenerate: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     Создаёт английскую версию притчи
+    force_regenerate=true — игнорировать кеш ответов LLM при переводе
     """
     # Проверяем существование оригинальной притчи
     parable = db.query(Parable).filter(Parable.id == parable_id).first()
@@ -912,6 +1539,7 @@ async def create_english_version(
     db.refresh(english_parable)
     
     # СРАЗУ переводим заголовок и текст притчи
+    token = llm_cache_bypass.set(force_regenerate)
     try:
         print(f"[English Parable {english_parable.id}] Translating title and text...")
         
@@ -937,10 +1565,10 @@ TEXT: [translated text]
             ),
         ]
         
-        response = gemini_service.client.models.generate_content(
-            model=gemini_service.text_model_name,
-            contents=contents,
-        )
+        # Завершаем транзакцию, чтобы не держать соединение из пула во время вызова LLM
+        db.commit()
+        
+        response = await gemini_service.generate_content(contents)
         
         translation = response.text.strip()
         
@@ -972,6 +1600,8 @@ TEXT: [translated text]
         english_parable.status = "error"
         english_parable.error_message = str(e)
         db.commit()
+    finally:
+        llm_cache_bypass.reset(token)
     
     return english_parable
 
@@ -983,8 +1613,14 @@ async def get_english_version(
 ):
     """
     Получает английскую версию притчи
+    Коллекции загружаются заранее (selectinload), как и в get_parable
     """
-    english_parable = db.query(EnglishParable).filter(
+    english_parable = db.query(EnglishParable).options(
+        selectinload(EnglishParable.image_prompts),
+        selectinload(EnglishParable.generated_images),
+        selectinload(EnglishParable.audio_files),
+        selectinload(EnglishParable.video_fragments),
+    ).filter(
         EnglishParable.parable_id == parable_id
     ).first()
     
@@ -997,11 +1633,12 @@ async def get_english_version(
 @app.post("/parables/{parable_id}/english/process", response_model=ProcessingStatus)
 async def process_english_version(
     parable_id: int,
-    background_tasks: BackgroundTasks,
+    force_regenerate: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     Запускает обработку английской версии
+    force_regenerate=true — игнорировать кеш ответов LLM
     """
     # Проверяем существование оригинальной притчи
     parable = db.query(Parable).filter(Parable.id == parable_id).first()
@@ -1016,37 +1653,56 @@ async def process_english_version(
     if not english_parable:
         raise HTTPException(status_code=404, detail="English version not found. Create it first.")
     
-    # Запускаем обработку в фоне
-    background_tasks.add_task(process_english_parable_pipeline, english_parable.id, parable_id, db)
+    if english_parable.status == "processing":
+        raise HTTPException(status_code=400, detail="English version is already being processed")
+    
+    # Ставим обработку в очередь (коммитится вместе со статусом)
+    english_parable.status = "processing"
+    job = enqueue_job(
+        db, "process_english", english_parable.id,
+        {"original_parable_id": parable_id, "bypass_cache": force_regenerate}
+    )
     
     return ProcessingStatus(
         status="processing",
         message="English version processing started",
-        parable_id=english_parable.id
+        parable_id=english_parable.id,
+        job_id=job.id
     )
 
 
-async def process_english_parable_pipeline(english_parable_id: int, original_parable_id: int, db: Session):
+async def process_english_parable_pipeline(english_parable_id: int, original_parable_id: int, bypass_cache: bool = False):
     """
     Пайплайн обработки английской версии притчи
+    Флаг обхода кеша LLM действует только на время пайплайна
     """
+    token = llm_cache_bypass.set(bypass_cache)
     try:
-        english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
-        parable = db.query(Parable).filter(Parable.id == original_parable_id).first()
-        
-        english_parable.status = "processing"
-        db.commit()
-        
-        start_step = english_parable.current_step
+        await _process_english_parable_steps(english_parable_id, original_parable_id)
+    finally:
+        llm_cache_bypass.reset(token)
+
+
+async def _process_english_parable_steps(english_parable_id: int, original_parable_id: int):
+    """
+    Шаги пайплайна английской версии
+    Каждый шаг работает с короткими сессиями БД — соединение не удерживается во время вызовов LLM
+    """
+    try:
+        with session_scope() as db:
+            english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
+            english_parable.status = "processing"
+            start_step = english_parable.current_step
+            text_translated = english_parable.text_translated
         
         # Шаг 1: Переписываем переведённый текст для TTS
         if start_step <= 1:
             print(f"[English Parable {english_parable_id}] Step 1: Rewriting English text for TTS...")
-            english_parable.current_step = 1
-            db.commit()
+            with session_scope() as db:
+                db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).update({"current_step": 1})
             
             # Используем ПЕРЕВЕДЁННЫЙ текст
-            source_text = english_parable.text_translated if english_parable.text_translated else "No translated text available"
+            source_text = text_translated if text_translated else "No translated text available"
             
             print(f"[English Parable {english_parable_id}] Source text: {source_text[:100]}...")
             
@@ -1103,24 +1759,27 @@ ENGLISH TEXT:
                 ),
             ]
             
-            response = gemini_service.client.models.generate_content(
-                model=gemini_service.text_model_name,
-                contents=contents,
-            )
+            async def rewrite_for_tts():
+                response = await gemini_service.generate_content(contents)
+                return response.text.strip()
             
-            english_tts_text = response.text.strip()
+            # Переписывание и хук зависят только от переведённого текста — выполняем параллельно
+            print(f"[English Parable {english_parable_id}] Rewriting for TTS and generating hook...")
+            step1 = await run_dag({
+                "rewrite_for_tts": ([], rewrite_for_tts),
+                "generate_hook": ([], lambda: gemini_service.generate_hook(source_text, language="english")),
+            }, log_prefix=f"[English Parable {english_parable_id}] Step 1")
             
-            # Генерируем хук для первых 3 секунд
-            print(f"[English Parable {english_parable_id}] Generating hook...")
-            hook_text = await gemini_service.generate_hook(source_text, language="english")
-            english_parable.hook_text = hook_text
+            english_tts_text = step1["rewrite_for_tts"]
+            hook_text = step1["generate_hook"]
             print(f"[English Parable {english_parable_id}] Hook: {hook_text}")
             
             # Автоматически добавляем хук в начало TTS текста
             final_english_tts_text = f"{hook_text}\n\n{english_tts_text}"
-            english_parable.text_for_tts = final_english_tts_text
-            
-            db.commit()
+            with session_scope() as db:
+                db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).update(
+                    {"hook_text": hook_text, "text_for_tts": final_english_tts_text}
+                )
             
             print(f"[English Parable {english_parable_id}] ✅ Step 1 completed (hook added to TTS)")
             print(f"[English Parable {english_parable_id}] TTS text: {english_tts_text[:100]}...")
@@ -1130,93 +1789,93 @@ ENGLISH TEXT:
         # Шаг 2: Генерируем метаданные и промпты
         if start_step <= 2:
             print(f"[English Parable {english_parable_id}] Step 2: Generating metadata and prompts...")
-            english_parable.current_step = 2
-            db.commit()
+            from models import EnglishTitleVariant
             
-            metadata = await gemini_service.generate_english_metadata_and_prompts(
-                parable.text_for_tts,
-                english_parable.text_for_tts
-            )
+            with session_scope() as db:
+                english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
+                parable = db.query(Parable).filter(Parable.id == original_parable_id).first()
+                english_parable.current_step = 2
+                
+                # Проверяем есть ли уже варианты заголовков
+                existing_variants = db.query(EnglishTitleVariant).filter(
+                    EnglishTitleVariant.english_parable_id == english_parable_id
+                ).count()
+                
+                russian_tts_text = parable.text_for_tts
+                english_tts_text = english_parable.text_for_tts
+                hook_text = english_parable.hook_text
+                source_text = english_parable.text_translated if english_parable.text_translated else english_parable.text_for_tts
             
-            english_parable.youtube_title = metadata.get("youtube_title")
-            english_parable.youtube_description = metadata.get("youtube_description")
-            english_parable.youtube_hashtags = metadata.get("youtube_hashtags")
-            db.commit()
+            async def select_best_title(title_variants):
+                # LLM автоматически выбирает лучший заголовок
+                if not title_variants:
+                    return None
+                return await gemini_service.select_best_title(title_variants, source_text)
             
-            # Генерируем промпты для изображения хука (scene_order = -1)
-            print(f"[English Parable {english_parable_id}] Generating hook image prompts...")
-            source_text_for_hook = english_parable.text_translated if english_parable.text_translated else english_parable.text_for_tts
-            hook_prompts = await gemini_service.generate_hook_image_prompt(
-                english_parable.hook_text,
-                source_text_for_hook,
-                language="english"
-            )
+            # Метаданные, промпты хука и варианты заголовков независимы друг от друга;
+            # выбор лучшего заголовка ждёт только вариантов
+            step2_nodes = {
+                "metadata_and_prompts": ([], lambda: gemini_service.generate_english_metadata_and_prompts(russian_tts_text, english_tts_text)),
+                "hook_image_prompt": ([], lambda: gemini_service.generate_hook_image_prompt(hook_text, source_text, language="english")),
+            }
+            if existing_variants == 0:
+                print(f"[English Parable {english_parable_id}] Generating title variants for A/B testing...")
+                step2_nodes["title_variants"] = ([], lambda: gemini_service.generate_title_variants(source_text, language="english"))
+                step2_nodes["best_title"] = (["title_variants"], select_best_title)
+            
+            step2 = await run_dag(step2_nodes, log_prefix=f"[English Parable {english_parable_id}] Step 2")
             
-            # Добавляем промпт для хука (scene_order = -1)
-            hook_prompt = EnglishImagePrompt(
-                english_parable_id=english_parable_id,
-                prompt_text=hook_prompts['image_prompt'],
-                video_prompt_text=hook_prompts['video_prompt'],
-                scene_order=-1  # Хук идёт ПЕРЕД всеми сценами
-            )
-            db.add(hook_prompt)
+            metadata = step2["metadata_and_prompts"]
+            hook_prompts = step2["hook_image_prompt"]
             
-            # Сохраняем промпты для основных сцен
-            video_prompts = metadata.get('video_prompts', [])
-            for idx, prompt_text in enumerate(metadata.get("image_prompts", [])):
-                # Получаем соответствующий video_prompt или используем пустую строку
-                video_prompt = video_prompts[idx] if idx < len(video_prompts) else ""
+            with session_scope() as db:
+                english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
+                english_parable.youtube_title = metadata.get("youtube_title")
+                english_parable.youtube_description = metadata.get("youtube_description")
+                english_parable.youtube_hashtags = metadata.get("youtube_hashtags")
                 
-                prompt = EnglishImagePrompt(
+                # Добавляем промпт для хука (scene_order = -1)
+                hook_prompt = EnglishImagePrompt(
                     english_parable_id=english_parable_id,
-                    prompt_text=prompt_text,
-                    video_prompt_text=video_prompt,
-                    scene_order=idx
-                )
-                db.add(prompt)
-            db.commit()
-            
-            # Генерируем варианты заголовков для A/B тестирования
-            print(f"[English Parable {english_parable_id}] Generating title variants for A/B testing...")
-            from models import EnglishTitleVariant
-            
-            # Проверяем есть ли уже варианты
-            existing_variants = db.query(EnglishTitleVariant).filter(
-                EnglishTitleVariant.english_parable_id == english_parable_id
-            ).count()
-            
-            if existing_variants == 0:
-                source_text = english_parable.text_translated if english_parable.text_translated else english_parable.text_for_tts
-                title_variants = await gemini_service.generate_title_variants(
-                    source_text,
-                    language="english"
+                    prompt_text=hook_prompts['image_prompt'],
+                    video_prompt_text=hook_prompts['video_prompt'],
+                    scene_order=-1  # Хук идёт ПЕРЕД всеми сценами
                 )
+                db.add(hook_prompt)
                 
-                for variant_data in title_variants:
-                    variant = EnglishTitleVariant(
+                # Сохраняем промпты для основных сцен
+                video_prompts = metadata.get('video_prompts', [])
+                for idx, prompt_text in enumerate(metadata.get("image_prompts", [])):
+                    # Получаем соответствующий video_prompt или используем пустую строку
+                    video_prompt = video_prompts[idx] if idx < len(video_prompts) else ""
+                    
+                    prompt = EnglishImagePrompt(
                         english_parable_id=english_parable_id,
-                        variant_text=variant_data.get('text', ''),
-                        variant_type=variant_data.get('type', 'unknown'),
-                        is_selected=False
+                        prompt_text=prompt_text,
+                        video_prompt_text=video_prompt,
+                        scene_order=idx
                     )
-                    db.add(variant)
-                db.commit()
-                print(f"[English Parable {english_parable_id}] Generated {len(title_variants)} title variants")
+                    db.add(prompt)
                 
-                # LLM автоматически выбирает лучший заголовок
-                if title_variants:
-                    print(f"[English Parable {english_parable_id}] LLM selecting best title...")
-                    best_index = await gemini_service.select_best_title(title_variants, source_text)
+                if existing_variants == 0:
+                    title_variants = step2["title_variants"]
                     
-                    # Получаем все варианты из БД
-                    all_variants = db.query(EnglishTitleVariant).filter(
-                        EnglishTitleVariant.english_parable_id == english_parable_id
-                    ).order_by(EnglishTitleVariant.id).all()
+                    variants = []
+                    for variant_data in title_variants:
+                        variant = EnglishTitleVariant(
+                            english_parable_id=english_parable_id,
+                            variant_text=variant_data.get('text', ''),
+                            variant_type=variant_data.get('type', 'unknown'),
+                            is_selected=False
+                        )
+                        db.add(variant)
+                        variants.append(variant)
+                    print(f"[English Parable {english_parable_id}] Generated {len(title_variants)} title variants")
                     
-                    if best_index < len(all_variants):
-                        all_variants[best_index].is_selected = True
-                        db.commit()
-                        print(f"[English Parable {english_parable_id}] ✅ Best title selected: {all_variants[best_index].variant_text}")
+                    best_index = step2["best_title"]
+                    if best_index is not None and best_index < len(variants):
+                        variants[best_index].is_selected = True
+                        print(f"[English Parable {english_parable_id}] ✅ Best title selected: {variants[best_index].variant_text}")
             
             print(f"[English Parable {english_parable_id}] ✅ Step 2 completed")
         else:
@@ -1225,50 +1884,57 @@ ENGLISH TEXT:
         # Шаг 3: Генерируем изображения
         if start_step <= 3:
             print(f"[English Parable {english_parable_id}] Step 3: Generating images...")
-            english_parable.current_step = 3
-            db.commit()
-            
-            prompts = db.query(EnglishImagePrompt).filter(
-                EnglishImagePrompt.english_parable_id == english_parable_id
-            ).order_by(EnglishImagePrompt.scene_order).all()
-            prompts_count = len(prompts)
             
-            existing_images_count = db.query(EnglishGeneratedImage).filter(
-                EnglishGeneratedImage.english_parable_id == english_parable_id
-            ).count()
+            with session_scope() as db:
+                db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).update({"current_step": 3})
+                
+                prompts = [
+                    (p.id, p.scene_order, p.prompt_text)
+                    for p in db.query(EnglishImagePrompt).filter(
+                        EnglishImagePrompt.english_parable_id == english_parable_id
+                    ).order_by(EnglishImagePrompt.scene_order).all()
+                ]
+                prompts_count = len(prompts)
+                
+                existing_images_count = db.query(EnglishGeneratedImage).filter(
+                    EnglishGeneratedImage.english_parable_id == english_parable_id
+                ).count()
             
             if existing_images_count < prompts_count:
                 print(f"[English Parable {english_parable_id}] Need to generate {prompts_count - existing_images_count} images.")
-                image_prompts = [p.prompt_text for p in prompts]
+                image_prompts = [prompt_text for _, _, prompt_text in prompts]
                 # Используем специальную папку для английских изображений
                 image_paths = await gemini_service.generate_images_with_context(
                     image_prompts,
                     f"english_{english_parable_id}"
                 )
                 
-                for idx, image_path in enumerate(image_paths):
-                    # Используем scene_order из промпта, а не idx
-                    prompt = prompts[idx]
-                    existing_image_db = db.query(EnglishGeneratedImage).filter(
-                        EnglishGeneratedImage.english_parable_id == english_parable_id,
-                        EnglishGeneratedImage.scene_order == prompt.scene_order
-                    ).first()
-                    
-                    if not existing_image_db:
-                        image = EnglishGeneratedImage(
-                            english_parable_id=english_parable_id,
-                            prompt_id=prompt.id,
-                            image_path=image_path,
-                            scene_order=prompt.scene_order  # -1 для хука, 0,1,2... для остальных
-                        )
-                        db.add(image)
-                db.commit()
+                with session_scope() as db:
+                    for idx, image_path in enumerate(image_paths):
+                        if not image_path:  # Сцена не сгенерирована — повторим при следующем запуске
+                            continue
+                        # Используем scene_order из промпта, а не idx
+                        prompt_id, scene_order, _ = prompts[idx]
+                        existing_image_db = db.query(EnglishGeneratedImage).filter(
+                            EnglishGeneratedImage.english_parable_id == english_parable_id,
+                            EnglishGeneratedImage.scene_order == scene_order
+                        ).first()
+                        
+                        if not existing_image_db:
+                            image = EnglishGeneratedImage(
+                                english_parable_id=english_parable_id,
+                                prompt_id=prompt_id,
+                                image_path=image_path,
+                                scene_order=scene_order  # -1 для хука, 0,1,2... для остальных
+                            )
+                            db.add(image)
             else:
                 print(f"[English Parable {english_parable_id}] All {prompts_count} images already exist, skipping generation.")
             
-            saved_count = db.query(EnglishGeneratedImage).filter(
-                EnglishGeneratedImage.english_parable_id == english_parable_id
-            ).count()
+            with session_scope() as db:
+                saved_count = db.query(EnglishGeneratedImage).filter(
+                    EnglishGeneratedImage.english_parable_id == english_parable_id
+                ).count()
             
             if saved_count < prompts_count:
                 raise Exception(f"Only {saved_count}/{prompts_count} images generated. Please retry.")
@@ -1280,12 +1946,13 @@ ENGLISH TEXT:
         # Шаг 4: Аудио (ручная загрузка)
         if start_step <= 4:
             print(f"[English Parable {english_parable_id}] Step 4: Audio (manual upload)...")
-            english_parable.current_step = 4
-            db.commit()
             
-            existing_audio = db.query(EnglishAudioFile).filter(
-                EnglishAudioFile.english_parable_id == english_parable_id
-            ).first()
+            with session_scope() as db:
+                db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).update({"current_step": 4})
+                
+                existing_audio = db.query(EnglishAudioFile).filter(
+                    EnglishAudioFile.english_parable_id == english_parable_id
+                ).first() is not None
             
             if existing_audio:
                 print(f"[English Parable {english_parable_id}] ✅ Audio already uploaded")
@@ -1299,29 +1966,31 @@ ENGLISH TEXT:
         # Финальная проверка
         print(f"[English Parable {english_parable_id}] Running final checks...")
         
-        prompts_count = db.query(EnglishImagePrompt).filter(
-            EnglishImagePrompt.english_parable_id == english_parable_id
-        ).count()
-        images_count = db.query(EnglishGeneratedImage).filter(
-            EnglishGeneratedImage.english_parable_id == english_parable_id
-        ).count()
-        
-        print(f"[English Parable {english_parable_id}] Final check results:")
-        print(f"  - TTS text: {'✅' if english_parable.text_for_tts else '❌'}")
-        print(f"  - Prompts: {prompts_count} {'✅' if prompts_count > 0 else '❌'}")
-        print(f"  - Images: {images_count}/{prompts_count} {'✅' if images_count == prompts_count else '❌'}")
-        
-        if not english_parable.text_for_tts:
-            raise Exception("TTS text is missing!")
-        if prompts_count == 0:
-            raise Exception("No image prompts found!")
-        if images_count < prompts_count:
-            raise Exception(f"Images incomplete: {images_count}/{prompts_count}. Please retry step 3.")
-        
-        english_parable.status = "awaiting_audio"
-        english_parable.current_step = 5
-        english_parable.error_message = None
-        db.commit()
+        with session_scope() as db:
+            english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
+            
+            prompts_count = db.query(EnglishImagePrompt).filter(
+                EnglishImagePrompt.english_parable_id == english_parable_id
+            ).count()
+            images_count = db.query(EnglishGeneratedImage).filter(
+                EnglishGeneratedImage.english_parable_id == english_parable_id
+            ).count()
+            
+            print(f"[English Parable {english_parable_id}] Final check results:")
+            print(f"  - TTS text: {'✅' if english_parable.text_for_tts else '❌'}")
+            print(f"  - Prompts: {prompts_count} {'✅' if prompts_count > 0 else '❌'}")
+            print(f"  - Images: {images_count}/{prompts_count} {'✅' if images_count == prompts_count else '❌'}")
+            
+            if not english_parable.text_for_tts:
+                raise Exception("TTS text is missing!")
+            if prompts_count == 0:
+                raise Exception("No image prompts found!")
+            if images_count < prompts_count:
+                raise Exception(f"Images incomplete: {images_count}/{prompts_count}. Please retry step 3.")
+            
+            english_parable.status = "awaiting_audio"
+            english_parable.current_step = 5
+            english_parable.error_message = None
         
         print(f"[English Parable {english_parable_id}] ✅ Processing completed!")
         print(f"[English Parable {english_parable_id}] ⏸️  Please upload audio file manually.")
@@ -1332,11 +2001,11 @@ ENGLISH TEXT:
         print(f"[English Parable {english_parable_id}] ❌ Error: {str(e)}")
         print(error_details)
         
-        english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
-        if english_parable:
-            english_parable.status = "error"
-            english_parable.error_message = str(e)
-            db.commit()
+        with session_scope() as db:
+            english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
+            if english_parable:
+                english_parable.status = "error"
+                english_parable.error_message = str(e)
 
 
 @app.post("/parables/{parable_id}/english/audio/upload")
@@ -1365,9 +2034,7 @@ async def upload_english_audio(
     with open(audio_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
     
-    from pydub import AudioSegment
-    audio_segment = AudioSegment.from_file(str(audio_path))
-    duration = len(audio_segment) / 1000.0
+    duration = await probe_upload_duration(audio_path)
     
     existing_audio = db.query(EnglishAudioFile).filter(
         EnglishAudioFile.english_parable_id == english_parable.id
@@ -1417,7 +2084,7 @@ async def upload_english_video_fragment(
         shutil.copyfileobj(file.file, buffer)
     
     # Получаем длительность видео
-    duration = await video_service.get_video_duration(str(video_path))
+    duration = await probe_upload_duration(video_path)
     
     # Получаем соответствующее изображение
     image = db.query(EnglishGeneratedImage).filter(
@@ -1435,6 +2102,12 @@ async def upload_english_video_fragment(
     )
     db.add(video_fragment)
     db.commit()
+    
+    # Нормализуем фрагмент в фоне, чтобы рендеры не перекодировали его каждый раз
+    if settings.fragment_normalize_enabled:
+        video_fragment.normalize_status = "pending"
+        enqueue_job(db, "normalize_english_fragment", video_fragment.id)
+    
     db.refresh(video_fragment)
     
     return video_fragment
@@ -1475,111 +2148,116 @@ async def update_english_video_duration(
 @app.post("/parables/{parable_id}/english/generate-final", response_model=ProcessingStatus)
 async def generate_english_final_video(
     parable_id: int,
-    background_tasks: BackgroundTasks,
+    mode: str = "final",
     db: Session = Depends(get_db)
 ):
     """
     Генерирует финальное видео для английской версии
+    mode=preview — быстрый черновой рендер, mode=final — итоговое качество
+    """
+    if mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown render mode: {mode}")
+    
+    job = queue_english_final_render(db, parable_id, mode)
+    
+    return ProcessingStatus(
+        status="generating_final",
+        message="English final video generation started",
+        parable_id=job.target_id,
+        job_id=job.id
+    )
+
+
+@app.get("/parables/{parable_id}/english/generate-final/timeline")
+async def get_english_final_video_timeline(
+    parable_id: int,
+    mode: str = "final",
+    db: Session = Depends(get_db)
+):
     """
+    Dry-run: временная карта финального видео английской версии без рендера
+    """
+    if mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown render mode: {mode}")
+    
     english_parable = db.query(EnglishParable).filter(
         EnglishParable.parable_id == parable_id
     ).first()
-    
     if not english_parable:
         raise HTTPException(status_code=404, detail="English version not found")
     
-    # Проверяем наличие всех необходимых данных
-    video_fragments = db.query(EnglishVideoFragment).filter(
-        EnglishVideoFragment.english_parable_id == english_parable.id
-    ).order_by(EnglishVideoFragment.scene_order).all()
-    
-    if not video_fragments:
-        raise HTTPException(status_code=400, detail="No video fragments uploaded")
+    return await plan_final_video_or_400(english_final_video_inputs(db, english_parable.id), mode)
+
+
+@app.get("/parables/{parable_id}/english/generate-final/plan")
+async def get_english_final_video_render_plan(
+    parable_id: int,
+    mode: str = "final",
+    db: Session = Depends(get_db)
+):
+    """
+    Dry-run с оценкой стоимости рендера английской версии
+    """
+    if mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown render mode: {mode}")
     
-    audio_file = db.query(EnglishAudioFile).filter(
-        EnglishAudioFile.english_parable_id == english_parable.id
+    english_parable = db.query(EnglishParable).filter(
+        EnglishParable.parable_id == parable_id
     ).first()
+    if not english_parable:
+        raise HTTPException(status_code=404, detail="English version not found")
     
-    if not audio_file:
-        raise HTTPException(status_code=400, detail="No audio file found")
-    
-    # Обновляем статус
-    english_parable.status = "generating_final"
-    db.commit()
-    
-    # Запускаем генерацию в фоне
-    background_tasks.add_task(generate_english_final_video_task, english_parable.id, db)
-    
-    return ProcessingStatus(
-        status="generating_final",
-        message="English final video generation started",
-        parable_id=english_parable.id
-    )
+    return await estimate_final_video(db, english_final_video_inputs(db, english_parable.id), mode)
 
 
-async def generate_english_final_video_task(english_parable_id: int, db: Session):
+async def generate_english_final_video_task(english_parable_id: int, render_mode: str = "final"):
     """
     Задача генерации финального видео для английской версии
     """
     try:
-        english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
+        with session_scope() as db:
+            inputs = english_final_video_inputs(db, english_parable_id)
         
-        # Получаем все видеофрагменты
-        video_fragments = db.query(EnglishVideoFragment).filter(
-            EnglishVideoFragment.english_parable_id == english_parable_id
-        ).order_by(EnglishVideoFragment.scene_order).all()
-        
-        video_paths = [vf.video_path for vf in video_fragments]
-        target_durations = [vf.target_duration for vf in video_fragments]
-        
-        # Получаем аудио
-        audio_file = db.query(EnglishAudioFile).filter(
-            EnglishAudioFile.english_parable_id == english_parable_id
-        ).first()
+        if not inputs["audio_path"]:
+            raise ValueError("No audio file found")
         
         print(f"[English Parable {english_parable_id}] Generating final video...")
-        
-        # Получаем музыку если назначена
-        from models import EnglishParableMusic
-        english_parable_music = db.query(EnglishParableMusic).filter(
-            EnglishParableMusic.english_parable_id == english_parable_id
-        ).first()
-        
-        music_path = None
-        music_volume = -18.0
-        
-        if english_parable_music and english_parable_music.music_track:
-            music_path = english_parable_music.music_track.file_path
-            music_volume = english_parable_music.volume_level
-            print(f"[English Parable {english_parable_id}] Using music: {english_parable_music.music_track.name}")
-        
-        # Создаём финальное видео
-        final_path, duration = await video_service.create_final_video(
-            video_paths=video_paths,
-            audio_path=audio_file.audio_path,
-            text_for_subtitles=english_parable.text_for_tts,
+        if inputs["music_path"]:
+            print(f"[English Parable {english_parable_id}] Using music: {inputs['music_name']}")
+        
+        # Создаём финальное видео (без открытой сессии БД)
+        final_path, duration, render_stats = await video_service.create_final_video(
+            video_paths=inputs["video_paths"],
+            audio_path=inputs["audio_path"],
+            text_for_subtitles=inputs["text_for_subtitles"],
             parable_id=f"english_{english_parable_id}",
-            music_path=music_path,
-            music_volume_db=music_volume,
-            target_durations=target_durations
+            music_path=inputs["music_path"],
+            music_volume_db=inputs["music_volume_db"],
+            target_durations=inputs["target_durations"],
+            render_mode=render_mode
         )
         
         # Обновляем притчу
-        english_parable.final_video_path = final_path
-        english_parable.final_video_duration = float(duration)  # Конвертируем numpy.float64 в Python float
-        english_parable.status = "completed"
-        db.commit()
+        with session_scope() as db:
+            english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
+            english_parable.final_video_path = final_path
+            english_parable.final_video_duration = float(duration)  # Конвертируем numpy.float64 в Python float
+            english_parable.render_mode = render_mode
+            english_parable.render_stats = render_stats
+            english_parable.status = "completed"
+            record_render_metric(db, "english_parable", english_parable_id, render_stats)
         
         print(f"[English Parable {english_parable_id}] Final video generated: {final_path}")
         
     except Exception as e:
         print(f"[English Parable {english_parable_id}] Error generating final video: {str(e)}")
-        db.rollback()
-        english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
-        if english_parable:
-            english_parable.status = "error"
-            english_parable.error_message = str(e)
-            db.commit()
+        with session_scope() as db:
+            english_parable = db.query(EnglishParable).filter(EnglishParable.id == english_parable_id).first()
+            if english_parable:
+                english_parable.status = "error"
+                english_parable.error_message = str(e)
+        # Ошибка рендера — ошибка задачи: очередь повторит её или отметит failed
+        raise
 
 
 if __name__ == "__main__":
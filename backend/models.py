@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, Boolean, func
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, Boolean, JSON, func
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -27,6 +27,8 @@ class Parable(Base):
     # Финальное видео
     final_video_path = Column(Text)
     final_video_duration = Column(Float)
+    render_mode = Column(String(20))  # preview, final — режим последнего рендера
+    render_stats = Column(JSON)  # Время рендера и попадания в кеш сегментов
     completed_at = Column(DateTime)
     
     # Relationships
@@ -88,6 +90,9 @@ class VideoFragment(Base):
     scene_order = Column(Integer, nullable=False)
     duration = Column(Float)
     target_duration = Column(Float)  # Целевая длительность (для ускорения/замедления)
+    normalized_path = Column(Text)  # Перекодированная при загрузке версия (1080x1920, 30 fps)
+    normalize_status = Column(String(20))  # pending, done, error
+    media_info = Column(JSON)  # Метаданные нормализованного файла (ffprobe)
     uploaded_at = Column(DateTime, server_default=func.now())
     
     parable = relationship("Parable", back_populates="video_fragments")
@@ -123,6 +128,8 @@ class EnglishParable(Base):
     # Финальное видео
     final_video_path = Column(Text)
     final_video_duration = Column(Float)
+    render_mode = Column(String(20))  # preview, final — режим последнего рендера
+    render_stats = Column(JSON)  # Время рендера и попадания в кеш сегментов
     completed_at = Column(DateTime)
     
     # Relationships
@@ -184,6 +191,9 @@ class EnglishVideoFragment(Base):
     scene_order = Column(Integer, nullable=False)
     duration = Column(Float)
     target_duration = Column(Float)  # Целевая длительность (для ускорения/замедления)
+    normalized_path = Column(Text)  # Перекодированная при загрузке версия (1080x1920, 30 fps)
+    normalize_status = Column(String(20))  # pending, done, error
+    media_info = Column(JSON)  # Метаданные нормализованного файла (ffprobe)
     uploaded_at = Column(DateTime, server_default=func.now())
     
     english_parable = relationship("EnglishParable", back_populates="video_fragments")
@@ -271,3 +281,52 @@ class EnglishTitleVariant(Base):
     # Relationships
     english_parable = relationship("EnglishParable")
 
+
+# ═══════════════════════════════════════════════════════════════
+# JOB QUEUE MODELS
+# ═══════════════════════════════════════════════════════════════
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(50), nullable=False)  # process_parable, generate_final, ...
+    queue = Column(String(20), nullable=False)  # llm | render — у каждой очереди свой лимит параллелизма
+    target_id = Column(Integer, nullable=False)  # ID притчи или английской версии
+    payload = Column(JSON, default=dict)
+    status = Column(String(20), nullable=False, default='queued')  # queued, running, done, failed, cancelled
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    worker_id = Column(String(255))
+    error_message = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    run_after = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class RenderMetric(Base):
+    __tablename__ = "render_metrics"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    target_type = Column(String(20), nullable=False)  # parable, english_parable
+    target_id = Column(Integer, nullable=False)
+    backend = Column(String(20), nullable=False)  # moviepy, ffmpeg
+    mode = Column(String(20), nullable=False)  # preview, final
+    frames = Column(Integer, nullable=False)
+    megapixels = Column(Float, nullable=False)  # Размер выходного кадра
+    fragments = Column(Integer, nullable=False)
+    segments_rendered = Column(Integer)  # Сегменты, пересобранные без кеша (только ffmpeg)
+    render_seconds = Column(Float, nullable=False)
+    peak_memory_mb = Column(Float)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class RenderBatch(Base):
+    __tablename__ = "render_batches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    mode = Column(String(20), nullable=False)  # preview, final
+    items = Column(JSON, nullable=False, default=list)  # [{parable_id, language, job_id, error}]
+    created_at = Column(DateTime, server_default=func.now())
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 
 class ParableCreate(BaseModel):
@@ -23,11 +23,33 @@ class ParableResponse(BaseModel):
     error_message: Optional[str] = None
     final_video_path: Optional[str] = None
     final_video_duration: Optional[float] = None
+    render_mode: Optional[str] = None
+    render_stats: Optional[Dict[str, Any]] = None
     
     class Config:
         from_attributes = True
 
 
+class ParableSummary(BaseModel):
+    """
+    Краткая карточка притчи для списка (без больших текстовых полей)
+    """
+    id: int
+    title_original: str
+    created_at: datetime
+    status: str
+    current_step: Optional[int] = 0
+    final_video_duration: Optional[float] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class ParablePage(BaseModel):
+    items: List[ParableSummary]
+    next_cursor: Optional[str] = None  # None — это последняя страница
+
+
 class ImagePromptResponse(BaseModel):
     id: int
     parable_id: int
@@ -68,6 +90,9 @@ class VideoFragmentResponse(BaseModel):
     scene_order: int
     duration: Optional[float] = None
     target_duration: Optional[float] = None  # Целевая длительность (для ускорения/замедления)
+    normalized_path: Optional[str] = None
+    normalize_status: Optional[str] = None
+    media_info: Optional[Dict[str, Any]] = None
     
     class Config:
         from_attributes = True
@@ -77,6 +102,7 @@ class ProcessingStatus(BaseModel):
     status: str
     message: str
     parable_id: int
+    job_id: Optional[int] = None
 
 
 class ParableDetailResponse(ParableResponse):
@@ -109,6 +135,8 @@ class EnglishParableResponse(BaseModel):
     error_message: Optional[str] = None
     final_video_path: Optional[str] = None
     final_video_duration: Optional[float] = None
+    render_mode: Optional[str] = None
+    render_stats: Optional[Dict[str, Any]] = None
     
     class Config:
         from_attributes = True
@@ -154,6 +182,9 @@ class EnglishVideoFragmentResponse(BaseModel):
     scene_order: int
     duration: Optional[float] = None
     target_duration: Optional[float] = None  # Целевая длительность (для ускорения/замедления)
+    normalized_path: Optional[str] = None
+    normalize_status: Optional[str] = None
+    media_info: Optional[Dict[str, Any]] = None
     
     class Config:
         from_attributes = True
@@ -197,3 +228,31 @@ class EnglishTitleVariantResponse(BaseModel):
 class UpdateVideoDurationRequest(BaseModel):
     target_duration: Optional[float] = None
 
+
+class RenderBatchItem(BaseModel):
+    parable_id: int
+    language: str = "ru"  # ru — притча, en — её английская версия
+
+
+class RenderBatchCreate(BaseModel):
+    items: List[RenderBatchItem]
+    mode: str = "final"
+
+
+class JobResponse(BaseModel):
+    id: int
+    job_type: str
+    queue: str
+    target_id: int
+    status: str
+    attempts: int
+    max_attempts: int
+    worker_id: Optional[str] = None
+    error_message: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
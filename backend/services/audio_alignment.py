@@ -0,0 +1,150 @@
+import hashlib
+import json
+import subprocess
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+
+# Слово озвучки: (начало, конец, слово) в секундах
+WordTiming = Tuple[float, float, str]
+
+ALIGNMENT_VERSION = 1
+SAMPLE_RATE = 16000
+FRAME_SIZE = 320  # 20 мс окно
+HOP_SIZE = 160  # 10 мс шаг
+MIN_GAP_FRAMES = 6  # Провалы энергии короче 60 мс — внутри слова
+MIN_SPEECH_FRAMES = 4  # Всплески короче 40 мс — щелчки, не речь
+
+
+def _decode_mono(audio_path: str) -> np.ndarray:
+    """
+    Декодирует аудио в моно float32 16 кГц через ffmpeg
+    """
+    result = subprocess.run(
+        [
+            settings.ffmpeg_binary, "-v", "error", "-nostdin",
+            "-i", str(audio_path),
+            "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+            "pipe:1"
+        ],
+        capture_output=True,
+        timeout=120
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not decode {audio_path}: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def _drop_short_runs(mask: np.ndarray, value: bool, max_len: int) -> np.ndarray:
+    """
+    Инвертирует внутренние серии значения value длиной не больше max_len
+    """
+    result = mask.copy()
+    changes = np.flatnonzero(np.diff(mask.astype(np.int8))) + 1
+    bounds = np.concatenate(([0], changes, [len(mask)]))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if mask[start] == value and end - start <= max_len and start > 0 and end < len(mask):
+            result[start:end] = not value
+    return result
+
+
+def _speech_mask(samples: np.ndarray) -> np.ndarray:
+    """
+    Маска речи по кадрам 10 мс: энергия выше адаптивного порога между шумом и пиками
+    """
+    if len(samples) < FRAME_SIZE:
+        return np.zeros(0, dtype=bool)
+
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+    energy_db = 10 * np.log10(np.mean(frames.astype(np.float32) ** 2, axis=1) + 1e-10)
+
+    noise_floor = np.percentile(energy_db, 10)
+    speech_level = np.percentile(energy_db, 95)
+    threshold = noise_floor + 0.3 * (speech_level - noise_floor)
+    mask = energy_db > threshold
+
+    mask = _drop_short_runs(mask, False, MIN_GAP_FRAMES)
+    mask = _drop_short_runs(mask, True, MIN_SPEECH_FRAMES)
+    return mask
+
+
+def _align(samples: np.ndarray, words: List[str]) -> List[WordTiming]:
+    """
+    Раскладывает слова по участкам речи пропорционально их длине, пропуская паузы
+    """
+    total_duration = len(samples) / SAMPLE_RATE
+    mask = _speech_mask(samples)
+    speech_frames = np.flatnonzero(mask)
+    if len(speech_frames) == 0:
+        # Речь не найдена — равномерно по всей длительности
+        speech_frames = np.arange(max(1, int(total_duration * SAMPLE_RATE / HOP_SIZE)))
+
+    weights = np.array([len(word) + 1 for word in words], dtype=np.float64)
+    positions = np.concatenate(([0.0], np.cumsum(weights))) / weights.sum() * len(speech_frames)
+
+    frame_seconds = HOP_SIZE / SAMPLE_RATE
+    last = len(speech_frames) - 1
+    timings = []
+    for idx, word in enumerate(words):
+        first_frame = speech_frames[min(int(positions[idx]), last)]
+        last_frame = speech_frames[min(max(int(np.ceil(positions[idx + 1])) - 1, 0), last)]
+        start = first_frame * frame_seconds
+        end = max(last_frame * frame_seconds + frame_seconds, start + frame_seconds)
+        timings.append((round(float(start), 3), round(float(min(end, total_duration)), 3), word))
+    return timings
+
+
+def _cache_path(audio_path: Path) -> Path:
+    return audio_path.with_name(f"{audio_path.stem}.words.json")
+
+
+def align_words(audio_path: str, words: List[str]) -> Optional[List[WordTiming]]:
+    """
+    Тайминги слов озвучки по энергии сигнала (VAD), без внешних моделей
+
+    Результат кешируется рядом с аудио (narration.words.json) и пересчитывается,
+    только если изменились файл озвучки или текст.
+
+    Returns:
+        Список (начало, конец, слово) или None, если выравнивание невозможно
+    """
+    if not words:
+        return None
+
+    path = Path(audio_path)
+    stat = path.stat()
+    fingerprint = {
+        "version": ALIGNMENT_VERSION,
+        "audio_size": stat.st_size,
+        "audio_mtime": stat.st_mtime,
+        "text_hash": hashlib.sha256(" ".join(words).encode("utf-8")).hexdigest(),
+    }
+
+    cache_path = _cache_path(path)
+    if cache_path.exists():
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if cached.get("fingerprint") == fingerprint:
+                return [tuple(item) for item in cached["words"]]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    samples = _decode_mono(audio_path)
+    if len(samples) == 0:
+        return None
+    timings = _align(samples, words)
+
+    try:
+        cache_path.write_text(
+            json.dumps({"fingerprint": fingerprint, "words": timings}, ensure_ascii=False),
+            encoding="utf-8"
+        )
+    except OSError as e:
+        print(f"[Audio Alignment] ⚠️  Could not write alignment cache: {e}")
+
+    print(f"[Audio Alignment] Aligned {len(words)} words over {len(samples) / SAMPLE_RATE:.2f}s")
+    return timings
@@ -0,0 +1,274 @@
+import subprocess
+import wave
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from .media_probe import probe_media
+from .render_cache import render_cache, file_digest, make_render_key
+
+
+MIX_SAMPLE_RATE = 44100
+MIX_CHANNELS = 2
+FRAGMENT_AUDIO_VOLUME = 0.03  # Звук видеофрагментов — 3%
+DUCK_FRAME_SECONDS = 0.01  # Шаг огибающей голоса для приглушения музыки
+DUCK_SMOOTH_SECONDS = 0.2  # Сглаживание, чтобы музыка не «прыгала» между словами
+
+# Звук фрагмента на шкале озвучки: (путь или None, если звука нет, длительность исходника, скорость)
+FragmentTrack = Tuple[Optional[str], float, float]
+
+
+def decode_audio(path: str) -> np.ndarray:
+    """
+    Декодирует аудио (или звуковую дорожку видео) в float32 стерео 44.1 кГц через ffmpeg
+
+    Returns:
+        Массив формы (сэмплы, 2)
+    """
+    result = subprocess.run(
+        [
+            settings.ffmpeg_binary, "-v", "error", "-nostdin",
+            "-i", str(path),
+            "-map", "0:a:0",
+            "-f", "f32le", "-ac", str(MIX_CHANNELS), "-ar", str(MIX_SAMPLE_RATE),
+            "pipe:1"
+        ],
+        capture_output=True,
+        timeout=300
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not decode {path}: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, MIX_CHANNELS)
+
+
+def decode_audio_shared(path: str) -> np.ndarray:
+    """
+    decode_audio с кешем декодированного PCM на диске (render_cache)
+
+    Для треков, общих для многих рендеров (фоновая музыка в пакетном рендере): трек декодируется
+    один раз, остальные рендеры — в том числе в других процессах — отображают файл в память
+    только для чтения, страницы делятся через page cache.
+    """
+    if not settings.render_cache_enabled:
+        return decode_audio(path)
+
+    key = make_render_key(
+        kind="pcm",
+        source=file_digest(path),
+        sample_rate=MIX_SAMPLE_RATE,
+        channels=MIX_CHANNELS
+    )
+    # Запись закрепляется, пока файл не отображён: вытеснение соседним рендером между get и memmap
+    # удалило бы её. Отображение держит файл само, закрепление после этого не нужно
+    with render_cache.pinned() as pin_dir:
+        cached = render_cache.get(key, ".f32", pin_dir)
+        if cached is None:
+            tmp_path = render_cache.tmp_path_for(key, ".f32")
+            try:
+                decode_audio(path).tofile(tmp_path)
+                cached = render_cache.put(key, ".f32", tmp_path, pin_dir)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+        if cached.stat().st_size == 0:
+            return np.zeros((0, MIX_CHANNELS), dtype=np.float32)
+        return np.memmap(cached, dtype=np.float32, mode="r").reshape(-1, MIX_CHANNELS)
+
+
+def db_to_gain(db: float) -> float:
+    return 10 ** (db / 20)
+
+
+def atempo_chain(factor: float) -> str:
+    """
+    Цепочка atempo для изменения скорости аудио (один фильтр atempo принимает 0.5..2.0)
+    """
+    if abs(factor - 1.0) < 1e-6:
+        return "anull"
+    filters = []
+    while factor > 2.0:
+        filters.append("atempo=2.0")
+        factor /= 2.0
+    while factor < 0.5:
+        filters.append("atempo=0.5")
+        factor /= 0.5
+    filters.append(f"atempo={factor:.6f}")
+    return ",".join(filters)
+
+
+def _retime(samples: np.ndarray, speed: float, length: int) -> np.ndarray:
+    """
+    Изменение скорости передискретизацией (как speedx в moviepy), результат ровно length сэмплов
+    """
+    output = np.zeros((length, MIX_CHANNELS), dtype=np.float32)
+    if len(samples) == 0 or length == 0:
+        return output
+    if abs(speed - 1.0) < 1e-6:
+        count = min(length, len(samples))
+        output[:count] = samples[:count]
+        return output
+
+    positions = np.arange(length, dtype=np.float64) * speed
+    positions = positions[positions <= len(samples) - 1]
+    source_index = np.arange(len(samples), dtype=np.float64)
+    for channel in range(MIX_CHANNELS):
+        output[:len(positions), channel] = np.interp(positions, source_index, samples[:, channel])
+    return output
+
+
+def _apply_fades(samples: np.ndarray, fade_in: float, fade_out: float):
+    """
+    Линейные fade-in / fade-out на месте
+    """
+    fade_in_len = min(int(fade_in * MIX_SAMPLE_RATE), len(samples))
+    if fade_in_len > 0:
+        samples[:fade_in_len] *= np.linspace(0.0, 1.0, fade_in_len, dtype=np.float32)[:, None]
+    fade_out_len = min(int(fade_out * MIX_SAMPLE_RATE), len(samples))
+    if fade_out_len > 0:
+        samples[-fade_out_len:] *= np.linspace(1.0, 0.0, fade_out_len, dtype=np.float32)[:, None]
+
+
+def _duck_gain(voice: np.ndarray, duck_db: float, threshold_db: float) -> np.ndarray:
+    """
+    Огибающая громкости музыки: duck_db там, где звучит голос (sidechain), 1.0 в паузах
+    """
+    hop = int(MIX_SAMPLE_RATE * DUCK_FRAME_SECONDS)
+    frame_count = len(voice) // hop
+    if frame_count == 0:
+        return np.ones(len(voice), dtype=np.float32)
+
+    mono = voice[:frame_count * hop].mean(axis=1).reshape(frame_count, hop)
+    level_db = 10 * np.log10(np.mean(mono ** 2, axis=1) + 1e-10)
+    target = np.where(level_db > threshold_db, db_to_gain(duck_db), 1.0)
+
+    window = max(1, int(DUCK_SMOOTH_SECONDS / DUCK_FRAME_SECONDS))
+    padded = np.pad(target, (window // 2, window - 1 - window // 2), mode="edge")
+    smooth = np.convolve(padded, np.ones(window) / window, mode="valid")
+
+    frame_centers = (np.arange(frame_count) + 0.5) * hop
+    return np.interp(np.arange(len(voice)), frame_centers, smooth).astype(np.float32)
+
+
+def _write_wav(samples: np.ndarray, output_path: Path):
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(str(output_path), "wb") as wav:
+        wav.setnchannels(MIX_CHANNELS)
+        wav.setsampwidth(2)
+        wav.setframerate(MIX_SAMPLE_RATE)
+        wav.writeframes(pcm.tobytes())
+
+
+def _change_tempo(input_path: Path, output_path: Path, tempo: float):
+    """
+    Ускорение дорожки без изменения высоты голоса (atempo в ffmpeg)
+    """
+    result = subprocess.run(
+        [
+            settings.ffmpeg_binary, "-v", "error", "-nostdin", "-y",
+            "-i", str(input_path),
+            "-af", atempo_chain(tempo),
+            "-c:a", "pcm_s16le",
+            str(output_path)
+        ],
+        capture_output=True,
+        timeout=300
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not change tempo: {result.stderr.decode(errors='replace').strip()}")
+
+
+def mix_settings() -> Dict[str, Any]:
+    """
+    Настройки сведения, влияющие на результат (для ключей кеша рендера)
+    """
+    return {
+        "fragment_volume": FRAGMENT_AUDIO_VOLUME,
+        "music_fade_in": settings.music_fade_in_seconds,
+        "music_fade_out": settings.music_fade_out_seconds,
+        "music_duck_db": settings.music_duck_db,
+        "music_duck_threshold_db": settings.music_duck_threshold_db,
+    }
+
+
+def mix_narration(
+    voice_path: str,
+    output_path: Path,
+    fragment_tracks: Optional[List[FragmentTrack]] = None,
+    music_path: Optional[str] = None,
+    music_volume_db: float = -18.0,
+    tempo: float = 1.0
+) -> Dict[str, Any]:
+    """
+    Сводит голос, звук видеофрагментов и музыку в одну PCM-дорожку (WAV) длиной с озвучку
+
+    Каждый источник декодируется один раз в float32; громкость, подгонка скорости,
+    зацикливание и обрезка музыки, fade и приглушение музыки под голосом считаются
+    векторно по всему массиву. Дорожки суммируются без нормализации (как CompositeAudioClip).
+
+    Args:
+        fragment_tracks: звук фрагментов по порядку (см. FragmentTrack); без звука — тишина
+        music_volume_db: громкость музыки в dB относительно голоса
+        tempo: итоговое ускорение всей дорожки (ограничение 60 секунд), высота голоса сохраняется
+
+    Returns:
+        Длительность дорожки и какие источники вошли в микс
+    """
+    voice = decode_audio(voice_path)
+    total = len(voice)
+    mix = voice.copy()
+
+    fragment_audio = False
+    if fragment_tracks:
+        track = np.zeros((total, MIX_CHANNELS), dtype=np.float32)
+        cursor = 0.0
+        for path, duration, speed in fragment_tracks:
+            start = int(round(cursor * MIX_SAMPLE_RATE))
+            cursor += duration / speed
+            end = min(int(round(cursor * MIX_SAMPLE_RATE)), total)
+            if path is None or end <= start:
+                continue
+            track[start:end] = _retime(decode_audio(path), speed, end - start)
+            fragment_audio = True
+        if fragment_audio:
+            mix += track * FRAGMENT_AUDIO_VOLUME
+            print(f"[Audio Mixer] Video fragments audio added to mix (3% volume)")
+
+    has_music = bool(music_path and Path(music_path).exists())
+    if has_music:
+        # np.resize повторяет массив по кругу — это и есть зацикливание, сразу с обрезкой
+        music = np.resize(decode_audio_shared(music_path), (total, MIX_CHANNELS))
+        music *= db_to_gain(music_volume_db)
+        _apply_fades(music, settings.music_fade_in_seconds, settings.music_fade_out_seconds)
+        if settings.music_duck_db:
+            music *= _duck_gain(voice, settings.music_duck_db, settings.music_duck_threshold_db)[:, None]
+        mix += music
+        print(f"[Audio Mixer] Music volume: {music_volume_db}dB (multiplier: {db_to_gain(music_volume_db):.3f})"
+              f"{f', ducking {settings.music_duck_db}dB' if settings.music_duck_db else ''}")
+
+    output_path = Path(output_path)
+    if abs(tempo - 1.0) < 1e-6:
+        _write_wav(mix, output_path)
+    else:
+        pre_tempo_path = output_path.with_name(f"{output_path.stem}.pre{output_path.suffix}")
+        _write_wav(mix, pre_tempo_path)
+        try:
+            _change_tempo(pre_tempo_path, output_path, tempo)
+        finally:
+            pre_tempo_path.unlink(missing_ok=True)
+
+    return {
+        "duration": total / MIX_SAMPLE_RATE / tempo,
+        "fragment_audio": fragment_audio,
+        "music": has_music,
+    }
+
+
+def fragment_tracks_for(video_paths: List[str], durations: List[float], speeds: List[float]) -> List[FragmentTrack]:
+    """
+    Звуковые дорожки фрагментов для mix_narration (файлы без звука отмечаются None)
+    """
+    return [
+        (path if probe_media(path)["has_audio"] else None, duration, speed)
+        for path, duration, speed in zip(video_paths, durations, speeds)
+    ]
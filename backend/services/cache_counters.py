@@ -0,0 +1,44 @@
+import fcntl
+import json
+from pathlib import Path
+from typing import Dict
+
+
+class SharedCounters:
+    """
+    Счётчики кеша в файле рядом с записями: общие для API и всех процессов воркеров
+
+    Обновление — под эксклюзивной блокировкой файла (flock), чтение — под разделяемой.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def add(self, **deltas: int):
+        try:
+            with open(self.path, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                counters = self._parse(f.read())
+                for name, delta in deltas.items():
+                    counters[name] = counters.get(name, 0) + delta
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(counters))
+        except OSError as e:
+            print(f"[Cache] ⚠️  Could not update counters {self.path}: {e}")
+
+    def read(self) -> Dict[str, int]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_SH)
+                return self._parse(f.read())
+        except OSError:
+            return {}
+
+    @staticmethod
+    def _parse(text: str) -> Dict[str, int]:
+        try:
+            return json.loads(text) if text else {}
+        except ValueError:
+            return {}
@@ -1,7 +1,7 @@
 from elevenlabs import generate, save, Voice, VoiceSettings
 from config import settings
 from pathlib import Path
-from pydub import AudioSegment
+from .media_probe import aprobe_media
 
 
 class ElevenLabsService:
@@ -38,9 +38,8 @@ class ElevenLabsService:
         # Сохраняем аудио
         save(audio, str(audio_path))
         
-        # Получаем длительность
-        audio_segment = AudioSegment.from_mp3(str(audio_path))
-        duration = len(audio_segment) / 1000.0  # в секундах
+        # Получаем длительность из заголовков файла (без декодирования)
+        duration = (await aprobe_media(str(audio_path)))["duration"]
         
         return str(audio_path), duration
 
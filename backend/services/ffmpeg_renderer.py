@@ -0,0 +1,544 @@
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from .audio_mixer import atempo_chain, mix_narration, mix_settings
+from .media_probe import probe_media
+from .render_cache import render_cache, file_digest, make_render_key
+from .render_metrics import render_features
+from .render_profiles import get_encoder_profile, ffmpeg_video_args, scaled_size, render_cores
+from .subtitles import SubtitleCue, build_subtitle_cues, write_ass_subtitles
+from .timeline import plan_timeline, retime_cues
+
+
+AUDIO_SAMPLE_RATE = 44100
+
+# Склейка без декодирования: кодеки, которые можно копировать в mp4
+STREAM_COPY_CODECS = ("h264", "hevc")
+# Энкодер профиля -> кодек потока: сегмент-копия должен совпадать с перекодированными соседями
+ENCODER_STREAM_CODECS = {"libx264": "h264"}
+# Параметры, которые должны совпадать у фрагментов для concat-демуксера
+DEMUXER_MATCH_KEYS = (
+    "video_codec", "width", "height", "pix_fmt",
+    "has_audio", "audio_codec", "sample_rate", "channels",
+)
+# Расхождение длительности видео и озвучки, при котором подгонка скорости не нужна
+FIT_TOLERANCE = 0.002
+
+
+def _filter_path(path: Path) -> str:
+    # Экранирование пути для аргумента фильтра (двоеточие и кавычки — спецсимволы графа)
+    return str(path).replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+
+
+def _concat_escape(path: Path) -> str:
+    # Экранирование кавычек для списка concat-демуксера
+    return str(path).replace("'", "'\\''")
+
+
+async def run_ffmpeg(args: List[str]):
+    """
+    Запускает ffmpeg и ждёт завершения; при ошибке бросает RuntimeError с хвостом stderr
+    """
+    process = await asyncio.create_subprocess_exec(
+        settings.ffmpeg_binary, "-hide_banner", "-nostdin", "-y", *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        tail = stderr.decode(errors="replace").strip()[-2000:]
+        raise RuntimeError(f"ffmpeg exited with code {process.returncode}: {tail}")
+
+
+class FFmpegRenderer:
+    """
+    Рендер финального видео одним процессом ffmpeg
+
+    Вместо покадровой сборки в Python (moviepy) строится один filter graph:
+    один setpts на каждый фрагмент по временной карте (timeline), concat и
+    прожиг субтитров из ASS. Звук сводится заранее (audio_mixer).
+    Результат совпадает с moviepy-рендером по таймингу, громкостям и расположению субтитров.
+
+    При RENDER_CACHE_ENABLED видео собирается из закешированных сегментов (по одному на фрагмент)
+    и отдельно сведённой звуковой дорожки — см. _render_segmented.
+    При SUBTITLE_BURN_IN=false субтитры не прожигаются, а идут дорожкой mov_text.
+    """
+
+    async def render(
+        self,
+        video_paths: List[str],
+        audio_path: str,
+        text_for_subtitles: str,
+        output_path: Path,
+        music_path: Optional[str] = None,
+        music_volume_db: float = -18.0,
+        target_durations: Optional[List[Optional[float]]] = None,
+        profile: Optional[Dict[str, Any]] = None
+    ) -> Tuple[float, Dict[str, Any]]:
+        """
+        Рендерит финальное видео в output_path
+        profile — параметры кодирования (см. render_profiles), по умолчанию режим final
+
+        Returns:
+            Длительность итогового видео в секундах и статистика рендера (попадания в кеш сегментов)
+        """
+        profile = profile or get_encoder_profile("final")
+        fps = profile["fps"]
+
+        fragments = await asyncio.to_thread(lambda: [probe_media(p) for p in video_paths])
+        voice = await asyncio.to_thread(probe_media, audio_path)
+        audio_duration = voice["duration"]
+
+        # Как concatenate_videoclips(method="compose"): кадр = максимальный размер, фрагменты по центру
+        width = max(f["width"] for f in fragments)
+        height = max(f["height"] for f in fragments)
+
+        # Временная карта: одна итоговая скорость на фрагмент (target_duration × озвучка × 60 секунд)
+        source_durations = [info["duration"] for info in fragments]
+        plan = plan_timeline(source_durations, target_durations, audio_duration, fps)
+
+        # Совместимые фрагменты без target_duration читаются concat-демуксером как один поток:
+        # без отдельного декодера, setpts и pad на каждый фрагмент
+        use_demuxer = self._demuxer_compatible(fragments, plan)
+        if use_demuxer:
+            plan = plan_timeline(source_durations, target_durations, audio_duration, fps, FIT_TOLERANCE)
+        fit, cap, final_duration = plan["fit"], plan["cap"], plan["final_duration"]
+
+        print(f"[FFmpeg Renderer] {len(fragments)} fragments {width}x{height}, "
+              f"narration {audio_duration:.2f}s, fit x{fit:.3f}, cap x{cap:.3f}")
+
+        # Субтитры строятся по озвучке и переводятся на выходную шкалу времени
+        cues: List[SubtitleCue] = []
+        if text_for_subtitles:
+            cues = await asyncio.to_thread(build_subtitle_cues, text_for_subtitles, audio_duration, audio_path)
+            cues = retime_cues(cues, cap)
+            print(f"[FFmpeg Renderer] Subtitles: {len(cues)} phrases"
+                  f"{'' if settings.subtitle_burn_in else ' (mov_text track)'}")
+        burn_cues = cues if settings.subtitle_burn_in else []
+
+        # Если видео не нужно ни ускорять, ни накладывать субтитры, ни масштабировать —
+        # битстрим копируется без перекодирования, пересобирается только звук.
+        # Прожиг субтитров требует перекодирования, поэтому путь работает только без прожига
+        # (нет субтитров или SUBTITLE_BURN_IN=false), без подгонки скорости и без превью-профиля.
+        # Иначе при RENDER_CACHE_ENABLED без перекодирования копируются отдельные сегменты
+        copy_video = (
+            use_demuxer and fit == 1.0 and cap == 1.0
+            and not burn_cues
+            and profile["height"] is None
+            and fragments[0]["video_codec"] in STREAM_COPY_CODECS
+        )
+        if use_demuxer:
+            print(f"[FFmpeg Renderer] Fragments are compatible, concat demuxer"
+                  f"{' + video stream copy' if copy_video else ''}")
+
+        out_width, out_height = scaled_size(width, height, profile["height"])
+        stats: Dict[str, Any] = {
+            "backend": "ffmpeg",
+            "mode": profile["mode"],
+            "cache": False,
+            **render_features(int(round(final_duration * fps)), out_width, out_height, len(fragments)),
+        }
+
+        # Копирование потока и так не перекодирует видео — кеш сегментов ему не нужен
+        if settings.render_cache_enabled and not copy_video:
+            stats.update(await self._render_segmented(
+                video_paths, fragments, plan, width, height, audio_path,
+                cues, music_path, music_volume_db, profile, output_path
+            ))
+            return final_duration, stats
+
+        with tempfile.TemporaryDirectory(prefix="render_") as tmp:
+            tmp_dir = Path(tmp)
+            inputs: List[str] = []
+            graph: List[str] = []
+
+            def add_input(*args: str) -> int:
+                inputs.extend(args)
+                return sum(1 for a in inputs if a == "-i") - 1
+
+            if use_demuxer:
+                self._add_demuxed_fragments(graph, add_input, video_paths, fit * cap, fps, tmp_dir, copy_video)
+            else:
+                self._add_separate_fragments(graph, add_input, video_paths, plan, fps, width, height)
+
+            # Звук сводится заранее (audio_mixer), в графе — только ускорение до 60 секунд
+            mix_path = await self._mix_audio(
+                tmp_dir / "mix.wav", video_paths, fragments, plan, audio_path, music_path, music_volume_db
+            )
+            mix_stream = add_input("-i", str(mix_path))
+            graph.append(f"[{mix_stream}:a]{atempo_chain(cap)}[aout]")
+
+            # Субтитры: одна ASS-дорожка, прожигается фильтром ass (libass) за один проход
+            # или добавляется в контейнер дорожкой mov_text
+            current = "vcat"
+            subtitle_args: List[str] = []
+            if cues:
+                ass_path = write_ass_subtitles(cues, tmp_dir / "subtitles.ass", width, height)
+                if burn_cues:
+                    graph.append(f"[vcat]ass=filename='{_filter_path(ass_path)}'[vsub]")
+                    current = "vsub"
+                else:
+                    subtitle_args = self._subtitle_track_args(add_input("-i", str(ass_path)))
+
+            if copy_video:
+                video_args = ["-map", "0:v:0", "-c:v", "copy"]
+            else:
+                # Превью уменьшается в самом конце, чтобы субтитры сохранили пропорции
+                scale = f",scale={out_width}:{out_height}" if (out_width, out_height) != (width, height) else ""
+                graph.append(f"[{current}]fps={fps}{scale},format=yuv420p[vout]")
+                video_args = ["-map", "[vout]", *ffmpeg_video_args(profile), "-r", str(fps)]
+
+            # Граф может быть длинным (много фрагментов) — передаём его файлом
+            graph_path = tmp_dir / "graph.txt"
+            graph_path.write_text(";\n".join(graph), encoding="utf-8")
+
+            await run_ffmpeg([
+                *inputs,
+                "-filter_complex_script", str(graph_path),
+                *video_args,
+                "-map", "[aout]",
+                *subtitle_args,
+                "-t", f"{final_duration:.6f}",
+                "-c:a", "aac", "-ar", str(AUDIO_SAMPLE_RATE),
+                "-movflags", "+faststart",
+                str(output_path)
+            ])
+
+        return final_duration, stats
+
+    async def _render_segmented(
+        self, video_paths, fragments, plan, width, height, audio_path,
+        cues, music_path, music_volume_db, profile, output_path: Path
+    ) -> Dict[str, Any]:
+        """
+        Рендер через кеш сегментов (render_cache)
+
+        Каждый фрагмент кодируется отдельным сегментом в собственном темпе (только target_duration)
+        со своим куском субтитров; сегменты кодируются параллельно (RENDER_SEGMENT_WORKERS процессов ffmpeg).
+        Общая подгонка под озвучку и ограничение 60 секунд применяются при склейке масштабом
+        временных меток (-itsscale), без перекодирования: частота кадров итога — fps / (fit × cap).
+        Фрагмент, который не нужно ни перевременивать, ни масштабировать, ни накрывать субтитрами,
+        копируется в сегмент без перекодирования (см. _segment_copyable).
+        Звук (голос, звук фрагментов, музыка) сводится audio_mixer в отдельную дорожку.
+        Ключ сегмента зависит только от его входов: хеш исходника, скорость фрагмента, число кадров
+        и субтитры относительно начала сегмента. При замене одного фрагмента пересобирается его сегмент
+        (и сегменты, на которых сдвинулись прожигаемые субтитры), а итог склеивается без перекодирования.
+
+        Returns:
+            Статистика попаданий в кеш для этого рендера
+        """
+        fps = profile["fps"]
+        out_width, out_height = scaled_size(width, height, profile["height"])
+        encoder_args = ffmpeg_video_args(profile)
+
+        # Сегменты — фрагменты в собственном темпе; кадры округляются у каждого отдельно,
+        # чтобы длина сегмента не зависела от соседей
+        segment_frames = [
+            int(round(entry["source_duration"] / entry["target_speed"] * fps)) for entry in plan["fragments"]
+        ]
+        final_duration = plan["final_duration"]
+        # Во сколько раз склейка сегментов растягивается до итоговой длительности
+        time_scale = final_duration / (sum(segment_frames) / fps)
+
+        # Субтитры прожигаются только в сегменты, на которые попадают; их время — на шкале сегментов
+        burn_cues = [
+            (start / time_scale, end / time_scale, text)
+            for start, end, text in (cues if settings.subtitle_burn_in else [])
+        ]
+        segments = []
+        segment_start = 0.0
+        for path, info, entry, frames in zip(video_paths, fragments, plan["fragments"], segment_frames):
+            speed = entry["target_speed"]
+            start, segment_start = segment_start, segment_start + frames / fps
+            if frames <= 0:
+                continue
+
+            segment_cues = self._slice_cues(burn_cues, start, frames / fps)
+            digest = await asyncio.to_thread(file_digest, path)
+            copy = self._segment_copyable(
+                info, speed, frames, segment_cues, (width, height), (out_width, out_height), profile
+            )
+            if copy:
+                key = make_render_key(kind="segment_copy", source=digest, frames=frames)
+            else:
+                key = make_render_key(
+                    kind="segment",
+                    source=digest,
+                    speed=round(speed, 6),
+                    frames=frames,
+                    frame=(width, height),
+                    output=(out_width, out_height),
+                    fps=fps,
+                    encoder=encoder_args,
+                    cues=segment_cues
+                )
+            segments.append((key, path, speed, frames, segment_cues, copy))
+
+        # Сегменты независимы (каждый — свой процесс ffmpeg) и кодируются параллельно вместе со звуком.
+        # Если число потоков энкодера не задано, ядра делятся между одновременными сегментами.
+        # Ядра рендера — доля машины с учётом других рендеров, идущих параллельно (пакетный рендер)
+        cores = render_cores()
+        workers = settings.render_segment_workers or cores
+        workers = max(1, min(workers, len(segments)))
+        segment_encoder_args = encoder_args
+        if not profile["threads"]:
+            segment_encoder_args = encoder_args + ["-threads", str(max(1, cores // workers))]
+        semaphore = asyncio.Semaphore(workers)
+
+        async def build_segment(key, path, speed, frames, segment_cues, copy) -> Tuple[bool, Path]:
+            cached = render_cache.get(key, ".mp4", pin_dir)
+            if cached:
+                return True, cached
+            async with semaphore:
+                if copy:
+                    return False, await self._copy_segment(key, path, pin_dir)
+                return False, await self._render_segment(
+                    key, path, speed, frames, fps, width, height, (out_width, out_height),
+                    segment_cues, segment_encoder_args, pin_dir
+                )
+
+        # Сегменты и дорожка закрепляются до конца склейки: их не удалит вытеснение в соседнем рендере
+        with render_cache.pinned() as pin_dir, tempfile.TemporaryDirectory(prefix="render_") as tmp:
+            print(f"[FFmpeg Renderer] Rendering {len(segments)} segments, {workers} in parallel")
+            *segment_results, (audio_hit, bed_path) = await asyncio.gather(
+                *(build_segment(*segment) for segment in segments),
+                self._audio_bed(video_paths, fragments, plan, audio_path, music_path, music_volume_db, pin_dir)
+            )
+            segment_paths = [path for _, path in segment_results]
+            hits = sum(1 for hit, _ in segment_results if hit)
+
+            # Без прожига субтитры добавляются при склейке дорожкой mov_text
+            subtitle_inputs: List[str] = []
+            subtitle_args: List[str] = []
+            if cues and not burn_cues:
+                ass_path = write_ass_subtitles(cues, Path(tmp) / "subtitles.ass", width, height)
+                subtitle_inputs = ["-i", str(ass_path)]
+                subtitle_args = self._subtitle_track_args(2)
+
+            list_path = Path(tmp) / "segments.txt"
+            list_path.write_text(
+                "ffconcat version 1.0\n" + "".join(
+                    f"file '{_concat_escape(path.resolve())}'\n" for path in segment_paths
+                ),
+                encoding="utf-8"
+            )
+            await run_ffmpeg([
+                "-itsscale", f"{time_scale:.9f}",
+                "-f", "concat", "-safe", "0", "-i", str(list_path),
+                "-i", str(bed_path),
+                *subtitle_inputs,
+                "-map", "0:v:0", "-map", "1:a:0",
+                "-c", "copy",
+                *subtitle_args,
+                "-t", f"{final_duration:.6f}",
+                "-movflags", "+faststart",
+                str(output_path)
+            ])
+
+        stats = {
+            "cache": True,
+            "segments": len(segment_paths),
+            "segment_hits": hits,
+            "segment_misses": len(segment_paths) - hits,
+            "segment_copies": sum(1 for *_, copy in segments if copy),
+            "segment_workers": workers,
+            "time_scale": round(time_scale, 6),
+            "audio_hit": audio_hit,
+        }
+        print(f"[FFmpeg Renderer] Render cache: {hits}/{len(segment_paths)} segments reused, "
+              f"audio {'reused' if audio_hit else 'rebuilt'}")
+        return stats
+
+    @staticmethod
+    def _slice_cues(cues: List[SubtitleCue], start: float, duration: float) -> List[SubtitleCue]:
+        """
+        Субтитры, попадающие в сегмент, со временем относительно его начала
+        """
+        result = []
+        for cue_start, cue_end, text in cues:
+            rel_start = cue_start - start
+            rel_end = cue_end - start
+            if rel_end <= 0 or rel_start >= duration:
+                continue
+            result.append((round(max(rel_start, 0.0), 3), round(min(rel_end, duration), 3), text))
+        return result
+
+    @staticmethod
+    def _segment_copyable(info, speed, frames, cues, frame_size, output_size, profile) -> bool:
+        """
+        Можно ли взять видео фрагмента в сегмент без перекодирования: темп не меняется,
+        кадр не дополняется полями и не масштабируется, субтитров на сегменте нет,
+        а поток уже в формате энкодера профиля (кодек, yuv420p, fps) ровно на frames кадров
+        """
+        return (
+            abs(speed - 1.0) <= 1e-6
+            and not cues
+            and (info["width"], info["height"]) == frame_size == output_size
+            and info.get("video_codec") == ENCODER_STREAM_CODECS.get(profile["codec"])
+            and info.get("pix_fmt") == "yuv420p"
+            and bool(info.get("fps")) and abs(info["fps"] - profile["fps"]) < 0.01
+            and info.get("frames") == frames
+        )
+
+    @staticmethod
+    async def _copy_segment(key, path, pin_dir) -> Path:
+        tmp_path = render_cache.tmp_path_for(key, ".mp4")
+        try:
+            await run_ffmpeg(["-i", str(path), "-map", "0:v:0", "-an", "-c:v", "copy", str(tmp_path)])
+            return render_cache.put(key, ".mp4", tmp_path, pin_dir)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _subtitle_track_args(input_index: int) -> List[str]:
+        # ASS-файл входом input_index -> дорожка mov_text (mp4 не хранит ASS)
+        return ["-map", f"{input_index}:s:0", "-c:s", "mov_text"]
+
+    @staticmethod
+    async def _render_segment(
+        key, path, speed, frames, fps, width, height, output_size, cues, encoder_args, pin_dir
+    ) -> Path:
+        tmp_path = render_cache.tmp_path_for(key, ".mp4")
+        ass_path = render_cache.tmp_path_for(key, ".ass")
+        # tpad добивает последний кадр, если после округления исходника не хватает до frames
+        filters = [
+            f"setpts=(PTS-STARTPTS)/{speed:.6f}",
+            f"fps={fps}",
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black",
+            "setsar=1",
+            "tpad=stop_mode=clone:stop_duration=1",
+        ]
+        if cues:
+            write_ass_subtitles(cues, ass_path, width, height)
+            filters.append(f"ass=filename='{_filter_path(ass_path)}'")
+        if output_size != (width, height):
+            filters.append(f"scale={output_size[0]}:{output_size[1]}")
+        filters.append("format=yuv420p")
+
+        try:
+            await run_ffmpeg([
+                "-i", str(path),
+                "-vf", ",".join(filters),
+                "-map", "0:v:0", "-an",
+                "-frames:v", str(frames),
+                *encoder_args, "-r", str(fps),
+                str(tmp_path)
+            ])
+            return render_cache.put(key, ".mp4", tmp_path, pin_dir)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+            ass_path.unlink(missing_ok=True)
+
+    async def _audio_bed(
+        self, video_paths, fragments, plan, audio_path, music_path, music_volume_db, pin_dir
+    ) -> Tuple[bool, Path]:
+        """
+        Сведённая звуковая дорожка (голос + звук фрагментов + музыка) в итоговом темпе
+
+        Returns:
+            (взята ли из кеша, путь к дорожке)
+        """
+        has_music = bool(music_path and Path(music_path).exists())
+        cap = plan["cap"]
+        sources = []
+        for path, info, entry in zip(video_paths, fragments, plan["fragments"]):
+            sources.append({
+                "digest": await asyncio.to_thread(file_digest, path) if info["has_audio"] else None,
+                "duration": round(info["duration"], 6),
+                "speed": round(entry["target_speed"] * plan["fit"], 6),
+            })
+        key = make_render_key(
+            kind="audio",
+            voice=await asyncio.to_thread(file_digest, audio_path),
+            fragments=sources,
+            music=await asyncio.to_thread(file_digest, music_path) if has_music else None,
+            music_volume_db=music_volume_db if has_music else None,
+            mix=mix_settings(),
+            cap=round(cap, 6),
+            sample_rate=AUDIO_SAMPLE_RATE
+        )
+        cached = render_cache.get(key, ".m4a", pin_dir)
+        if cached:
+            return True, cached
+
+        tmp_path = render_cache.tmp_path_for(key, ".m4a")
+        with tempfile.TemporaryDirectory(prefix="render_") as tmp:
+            mix_path = await self._mix_audio(
+                Path(tmp) / "mix.wav", video_paths, fragments, plan, audio_path,
+                music_path if has_music else None, music_volume_db
+            )
+            try:
+                await run_ffmpeg([
+                    "-i", str(mix_path),
+                    "-af", atempo_chain(cap),
+                    "-t", f"{plan['final_duration']:.6f}",
+                    "-c:a", "aac", "-ar", str(AUDIO_SAMPLE_RATE),
+                    str(tmp_path)
+                ])
+                return False, render_cache.put(key, ".m4a", tmp_path, pin_dir)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    async def _mix_audio(
+        mix_path: Path, video_paths, fragments, plan, audio_path, music_path, music_volume_db
+    ) -> Path:
+        """
+        Сводит звук на шкале озвучки (до ограничения 60 секунд) в WAV через audio_mixer
+        """
+        fragment_tracks = [
+            (path if info["has_audio"] else None, info["duration"], entry["target_speed"] * plan["fit"])
+            for path, info, entry in zip(video_paths, fragments, plan["fragments"])
+        ]
+        await asyncio.to_thread(
+            mix_narration, audio_path, mix_path, fragment_tracks, music_path, music_volume_db
+        )
+        return mix_path
+
+    @staticmethod
+    def _demuxer_compatible(fragments: List[Dict[str, Any]], plan: Dict[str, Any]) -> bool:
+        """
+        Можно ли склеить фрагменты concat-демуксером: без изменения скорости отдельных фрагментов
+        и с одинаковыми параметрами потоков (кодек, размер, fps, формат пикселей, звук)
+        """
+        if any(abs(entry["target_speed"] - 1.0) > 1e-6 for entry in plan["fragments"]):
+            return False
+
+        first = fragments[0]
+        if not first.get("fps"):
+            return False
+        for info in fragments[1:]:
+            if any(info.get(key) != first.get(key) for key in DEMUXER_MATCH_KEYS):
+                return False
+            if not info.get("fps") or abs(info["fps"] - first["fps"]) > 0.01:
+                return False
+        return True
+
+    @staticmethod
+    def _add_demuxed_fragments(graph, add_input, video_paths, speed, fps, tmp_dir: Path, copy_video: bool):
+        list_path = tmp_dir / "fragments.txt"
+        list_path.write_text(
+            "ffconcat version 1.0\n" + "".join(
+                f"file '{_concat_escape(Path(path).resolve())}'\n" for path in video_paths
+            ),
+            encoding="utf-8"
+        )
+        stream = add_input("-f", "concat", "-safe", "0", "-i", str(list_path))
+
+        if not copy_video:
+            graph.append(f"[{stream}:v]setpts=(PTS-STARTPTS)/{speed:.6f},fps={fps},setsar=1[vcat]")
+
+    @staticmethod
+    def _add_separate_fragments(graph, add_input, video_paths, plan, fps, width, height):
+        for idx, (path, entry) in enumerate(zip(video_paths, plan["fragments"])):
+            stream = add_input("-i", str(path))
+            graph.append(
+                f"[{stream}:v]setpts=(PTS-STARTPTS)/{entry['speed']:.6f},fps={fps},"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black,setsar=1[v{idx}]"
+            )
+
+        video_labels = "".join(f"[v{idx}]" for idx in range(len(video_paths)))
+        graph.append(f"{video_labels}concat=n={len(video_paths)}:v=1:a=0[vcat]")
@@ -0,0 +1,59 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from config import settings
+from .ffmpeg_renderer import run_ffmpeg, AUDIO_SAMPLE_RATE
+from .media_probe import probe_media
+
+
+def normalized_path_for(video_path: str, fragment_id: int) -> Path:
+    """
+    Файл нормализованной версии: повторная загрузка сцены пишет исходник в тот же scene_{n}.mp4,
+    но создаёт новый фрагмент, поэтому имя включает id фрагмента
+    """
+    path = Path(video_path)
+    return path.with_name(f"{path.stem}_{fragment_id}_normalized.mp4")
+
+
+async def normalize_fragment(video_path: str, fragment_id: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Один раз перекодирует загруженный видеофрагмент к единому формату
+
+    Кадр 1080x1920 (вписывание с чёрными полями), постоянные 30 fps, H.264 yuv420p
+    с фиксированным GOP, AAC 44.1 кГц стерео (тишина, если звука не было).
+    Такие фрагменты рендер склеивает concat-демуксером без декодирования каждого по отдельности.
+
+    Returns:
+        Путь к нормализованному файлу и его метаданные (probe_media)
+    """
+    source = await asyncio.to_thread(probe_media, video_path)
+    output_path = normalized_path_for(video_path, fragment_id)
+    width, height = settings.normalize_width, settings.normalize_height
+
+    args = ["-i", str(video_path)]
+    if not source["has_audio"]:
+        args += ["-f", "lavfi", "-i", f"anullsrc=r={AUDIO_SAMPLE_RATE}:cl=stereo"]
+
+    args += [
+        "-vf",
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black,setsar=1,"
+        f"fps={settings.normalize_fps},format=yuv420p",
+        "-map", "0:v:0",
+        "-map", "0:a:0" if source["has_audio"] else "1:a:0",
+        "-c:v", "libx264", "-profile:v", "high",
+        "-preset", settings.normalize_preset, "-crf", str(settings.normalize_crf),
+        "-g", str(settings.normalize_gop), "-keyint_min", str(settings.normalize_gop), "-sc_threshold", "0",
+        "-c:a", "aac", "-ar", str(AUDIO_SAMPLE_RATE), "-ac", "2",
+        "-t", f"{source['duration']:.6f}",
+        "-movflags", "+faststart",
+        str(output_path)
+    ]
+    await run_ffmpeg(args)
+
+    info = await asyncio.to_thread(probe_media, str(output_path))
+    print(f"[Fragment Normalizer] {Path(video_path).name}: "
+          f"{source.get('width')}x{source.get('height')} {source.get('video_codec')} "
+          f"-> {info['width']}x{info['height']} {info['video_codec']}, {info['duration']:.2f}s")
+    return str(output_path), info
@@ -1,11 +1,16 @@
 import os
+import asyncio
+import base64
+import functools
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from google.genai import types
 from config import settings
-from typing import Dict, List
+from typing import Dict, List, Optional
 import json
 from pathlib import Path
+from .llm_cache import llm_cache
 
 
 class GeminiService:
@@ -25,6 +30,88 @@ class GeminiService:
         self.text_model_name = settings.gemini_text_model
         self.image_model_name = settings.gemini_image_model
         self.chat_history = []
+        
+        # Асинхронный транспорт SDK (client.aio), чтобы вызовы LLM не блокировали event loop.
+        # Если SDK его не предоставляет — выполняем синхронные вызовы в ограниченном пуле потоков.
+        self.aio_client = getattr(self.client, "aio", None)
+        self._executor = None
+        if self.aio_client is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.gemini_max_workers,
+                thread_name_prefix="gemini"
+            )
+    
+    async def generate_content(
+        self,
+        contents: List[types.Content],
+        model: Optional[str] = None,
+        config: Optional[types.GenerateContentConfig] = None
+    ):
+        """
+        Неблокирующий вызов generate_content (по умолчанию — текстовая модель)
+        Ответы кешируются по (модель, промпт, конфиг), см. services/llm_cache.py
+        """
+        model = model or self.text_model_name
+        
+        cache_key = None
+        if settings.llm_cache_enabled:
+            cache_key = llm_cache.make_key(model, contents, config)
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                return types.GenerateContentResponse.model_validate_json(cached)
+        
+        if self.aio_client is not None:
+            response = await self.aio_client.models.generate_content(
+                model=model,
+                contents=contents,
+                config=config,
+            )
+        else:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                self._executor,
+                functools.partial(
+                    self.client.models.generate_content,
+                    model=model,
+                    contents=contents,
+                    config=config,
+                )
+            )
+        
+        # Кешируем только непустые ответы, чтобы сбой модели не закрепился
+        if cache_key and response.text:
+            llm_cache.set(cache_key, response.model_dump_json(exclude_none=True))
+        
+        return response
+    
+    async def generate_content_stream(
+        self,
+        contents: List[types.Content],
+        model: Optional[str] = None,
+        config: Optional[types.GenerateContentConfig] = None
+    ) -> list:
+        """
+        Неблокирующий потоковый вызов generate_content_stream, возвращает все чанки ответа
+        """
+        model = model or self.image_model_name
+        
+        if self.aio_client is not None:
+            stream = await self.aio_client.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=config,
+            )
+            return [chunk async for chunk in stream]
+        
+        def _collect():
+            return list(self.client.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=config,
+            ))
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _collect)
     
     async def rewrite_for_tts(self, original_text: str) -> str:
         """
@@ -84,10 +171,7 @@ class GeminiService:
             ),
         ]
         
-        response = self.client.models.generate_content(
-            model=self.text_model_name,
-            contents=contents,
-        )
+        response = await self.generate_content(contents)
         
         return response.text.strip()
     
@@ -157,10 +241,7 @@ class GeminiService:
             ),
         ]
         
-        response = self.client.models.generate_content(
-            model=self.text_model_name,
-            contents=contents,
-        )
+        response = await self.generate_content(contents)
         
         text = response.text.strip()
         
@@ -172,17 +253,21 @@ class GeminiService:
         
         return json.loads(text)
     
-    async def generate_images_with_context(self, prompts: List[str], parable_id: int) -> List[str]:
+    async def generate_images_with_context(self, prompts: List[str], parable_id: int) -> List[Optional[str]]:
         """
-        Генерирует изображения в режиме чата для сохранения контекста
+        Генерирует изображения для всех сцен параллельно (не более GEMINI_IMAGE_CONCURRENCY одновременно)
         Использует официальный API gemini-2.5-flash-image
         Пропускает уже сгенерированные изображения
+        
+        Returns:
+            Список путей в порядке промптов; None на месте сцены, которую не удалось сгенерировать
         """
         # Создаём директорию для изображений
         image_dir = settings.upload_dir / "images" / str(parable_id)
         image_dir.mkdir(parents=True, exist_ok=True)
         
-        generated_images = []
+        # Результаты раскладываются строго по индексу сцены
+        generated_images: List[Optional[str]] = [None] * len(prompts)
         
         # Проверяем какие изображения уже существуют
         existing_images = {}
@@ -192,7 +277,7 @@ class GeminiService:
                 image_path = image_dir / f"scene_{idx}{ext}"
                 if image_path.exists():
                     existing_images[idx] = str(image_path)
-                    generated_images.append(str(image_path))
+                    generated_images[idx] = str(image_path)
                     print(f"[Image Generation] ✅ Scene {idx + 1} already exists: {image_path}")
                     break
         
@@ -217,14 +302,11 @@ CRITICAL REQUIREMENTS FOR CONSISTENCY:
 
 Think of this as frames from the same movie - everything must look like it belongs together."""
         
-        for idx, prompt in enumerate(prompts):
-            # Пропускаем уже существующие
-            if idx in existing_images:
-                continue
-            
-            print(f"[Image Generation] Generating scene {idx + 1}/{len(prompts)}...")
-            print(f"[Image Generation] Prompt: {prompt[:100]}...")
-            
+        # Каждая сцена — отдельный запрос без истории, поэтому сцены независимы
+        # и могут генерироваться одновременно
+        semaphore = asyncio.Semaphore(max(1, settings.gemini_image_concurrency))
+        
+        async def generate_scene(idx: int, prompt: str):
             # Добавляем контекст предыдущих сцен
             scene_context = f"Scene {idx + 1} of {len(prompts)}"
             if idx > 0:
@@ -242,136 +324,143 @@ SCENE DESCRIPTION:
 
 STYLE: Cinematic, realistic, dramatic lighting, high quality, vertical 9:16 format."""
             
-            # Создаём НОВЫЙ запрос для каждого изображения (без истории)
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[types.Part.from_text(text=full_prompt)]
-                )
-            ]
-            
-            # Конфигурация для генерации изображений
-            # ВАЖНО: убираем лишние запятые из JSON
-            generate_content_config = types.GenerateContentConfig(
-                response_modalities=["IMAGE", "TEXT"],
-                image_config=types.ImageConfig(
-                    aspect_ratio="9:16"  # Вертикальный формат для YouTube Shorts
-                )
+            attempts = 1 + max(0, settings.gemini_image_retries)
+            async with semaphore:
+                for attempt in range(1, attempts + 1):
+                    print(f"[Image Generation] Generating scene {idx + 1}/{len(prompts)} (attempt {attempt}/{attempts})...")
+                    print(f"[Image Generation] Prompt: {prompt[:100]}...")
+                    
+                    image_path = await self._generate_scene_image(idx, full_prompt, image_dir)
+                    if image_path:
+                        generated_images[idx] = image_path
+                        return
+                
+                print(f"[Image Generation] ⚠️  Warning: No image generated for scene {idx + 1}")
+        
+        await asyncio.gather(*[
+            generate_scene(idx, prompt)
+            for idx, prompt in enumerate(prompts)
+            if idx not in existing_images
+        ])
+        
+        successful_count = sum(1 for img in generated_images if img is not None)
+        print(f"\n[Image Generation] ✅ Generated {successful_count}/{len(prompts)} images")
+        return generated_images
+    
+    async def _generate_scene_image(self, idx: int, full_prompt: str, image_dir: Path) -> Optional[str]:
+        """
+        Один запрос к модели изображений для сцены idx, сохраняет файл scene_{idx}
+        Возвращает путь к файлу или None
+        """
+        # Создаём НОВЫЙ запрос для каждого изображения (без истории)
+        contents = [
+            types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=full_prompt)]
             )
+        ]
+        
+        # Конфигурация для генерации изображений
+        # ВАЖНО: убираем лишние запятые из JSON
+        generate_content_config = types.GenerateContentConfig(
+            response_modalities=["IMAGE", "TEXT"],
+            image_config=types.ImageConfig(
+                aspect_ratio="9:16"  # Вертикальный формат для YouTube Shorts
+            )
+        )
+        
+        text_parts = []
+        
+        try:
+            chunks = await self.generate_content_stream(
+                contents,  # Передаём только текущий запрос
+                config=generate_content_config
+            )
+        except Exception as e:
+            print(f"[Image Generation] ❌ Error generating scene {idx + 1}: {str(e)}")
+            return None
+        
+        for chunk in chunks:
+            if (
+                chunk.candidates is None
+                or not chunk.candidates
+                or chunk.candidates[0].content is None
+                or chunk.candidates[0].content.parts is None
+            ):
+                continue
             
-            image_saved = False
-            text_parts = []
-            
-            try:
-                for chunk in self.client.models.generate_content_stream(
-                    model=self.image_model_name,
-                    contents=contents,  # Передаём только текущий запрос
-                    config=generate_content_config
-                ):
-                    if (
-                        chunk.candidates is None
-                        or not chunk.candidates
-                        or chunk.candidates[0].content is None
-                        or chunk.candidates[0].content.parts is None
-                    ):
-                        continue
-                    
-                    # Обрабатываем каждую часть ответа
-                    for part in chunk.candidates[0].content.parts:
-                        # СНАЧАЛА проверяем наличие изображения
-                        if hasattr(part, 'inline_data') and part.inline_data:
-                            if hasattr(part.inline_data, 'data') and part.inline_data.data and not image_saved:
-                                inline_data = part.inline_data
-                                data_buffer = inline_data.data
-                                mime_type = inline_data.mime_type if hasattr(inline_data, 'mime_type') else 'image/jpeg'
-                                
-                                print(f"[Image Generation] 🎨 Found image data! mime_type: {mime_type}")
-                                print(f"[Image Generation] Data type: {type(data_buffer)}")
-                                print(f"[Image Generation] Data length: {len(data_buffer)}")
-                                
-                                # ВАЖНО: Декодируем base64
-                                # Данные могут быть str или bytes, но в любом случае это base64
-                                import base64
-                                try:
-                                    # Если это bytes, конвертируем в str для декодирования
-                                    if isinstance(data_buffer, bytes):
-                                        data_buffer = data_buffer.decode('utf-8')
-                                        print(f"[Image Generation] Converted bytes to str")
-                                    
-                                    # Теперь декодируем base64
-                                    print(f"[Image Generation] Decoding base64 data (length: {len(data_buffer)})...")
-                                    data_buffer = base64.b64decode(data_buffer)
-                                    print(f"[Image Generation] ✅ Decoded to {len(data_buffer)} bytes")
-                                    
-                                    # Проверяем что это действительно изображение
-                                    if len(data_buffer) < 100:
-                                        print(f"[Image Generation] ❌ Data too small, not an image!")
-                                        continue
-                                        
-                                except Exception as e:
-                                    print(f"[Image Generation] ❌ Base64 decode error: {e}")
-                                    print(f"[Image Generation] First 100 chars: {str(data_buffer)[:100]}")
-                                    continue
-                                
-                                # Определяем расширение из mime_type
-                                file_extension = mimetypes.guess_extension(mime_type)
-                                if not file_extension:
-                                    # Fallback: если mime_type не распознан
-                                    if 'jpeg' in mime_type.lower() or 'jpg' in mime_type.lower():
-                                        file_extension = '.jpeg'
-                                    elif 'png' in mime_type.lower():
-                                        file_extension = '.png'
-                                    elif 'webp' in mime_type.lower():
-                                        file_extension = '.webp'
-                                    else:
-                                        file_extension = '.jpeg'  # По умолчанию JPEG
-                                
-                                print(f"[Image Generation] Extension: {file_extension}, Size: {len(data_buffer)} bytes")
-                                
-                                # Сохраняем изображение
-                                file_name = f"scene_{idx}{file_extension}"
-                                image_path = image_dir / file_name
-                                
-                                with open(image_path, "wb") as f:
-                                    f.write(data_buffer)
-                                
-                                # Добавляем в нужную позицию
-                                while len(generated_images) <= idx:
-                                    generated_images.append(None)
-                                generated_images[idx] = str(image_path)
+            # Обрабатываем каждую часть ответа
+            for part in chunk.candidates[0].content.parts:
+                # СНАЧАЛА проверяем наличие изображения
+                if hasattr(part, 'inline_data') and part.inline_data:
+                    if hasattr(part.inline_data, 'data') and part.inline_data.data:
+                        inline_data = part.inline_data
+                        data_buffer = inline_data.data
+                        mime_type = inline_data.mime_type if hasattr(inline_data, 'mime_type') else 'image/jpeg'
+                        
+                        print(f"[Image Generation] 🎨 Scene {idx + 1}: found image data! mime_type: {mime_type}")
+                        print(f"[Image Generation] Data type: {type(data_buffer)}")
+                        print(f"[Image Generation] Data length: {len(data_buffer)}")
+                        
+                        # ВАЖНО: Декодируем base64
+                        # Данные могут быть str или bytes, но в любом случае это base64
+                        try:
+                            # Если это bytes, конвертируем в str для декодирования
+                            if isinstance(data_buffer, bytes):
+                                data_buffer = data_buffer.decode('utf-8')
+                                print(f"[Image Generation] Converted bytes to str")
+                            
+                            # Теперь декодируем base64
+                            print(f"[Image Generation] Decoding base64 data (length: {len(data_buffer)})...")
+                            data_buffer = base64.b64decode(data_buffer)
+                            print(f"[Image Generation] ✅ Decoded to {len(data_buffer)} bytes")
+                            
+                            # Проверяем что это действительно изображение
+                            if len(data_buffer) < 100:
+                                print(f"[Image Generation] ❌ Data too small, not an image!")
+                                continue
                                 
-                                image_saved = True
-                                print(f"[Image Generation] ✅ Scene {idx + 1} saved: {image_path}")
+                        except Exception as e:
+                            print(f"[Image Generation] ❌ Base64 decode error: {e}")
+                            print(f"[Image Generation] First 100 chars: {str(data_buffer)[:100]}")
+                            continue
                         
-                        # ПОТОМ собираем текстовые части (если есть)
-                        if hasattr(part, 'text') and part.text:
-                            text_parts.append(part.text)
-                
-                # Если были текстовые части, выводим их
-                if text_parts and not image_saved:
-                    full_text = ''.join(text_parts)
-                    print(f"[Image Generation] Model text response: {full_text[:200]}...")
-                    print(f"[Image Generation] ⚠️  No image data received, only text!")
+                        # Определяем расширение из mime_type
+                        file_extension = mimetypes.guess_extension(mime_type)
+                        if not file_extension:
+                            # Fallback: если mime_type не распознан
+                            if 'jpeg' in mime_type.lower() or 'jpg' in mime_type.lower():
+                                file_extension = '.jpeg'
+                            elif 'png' in mime_type.lower():
+                                file_extension = '.png'
+                            elif 'webp' in mime_type.lower():
+                                file_extension = '.webp'
+                            else:
+                                file_extension = '.jpeg'  # По умолчанию JPEG
+                        
+                        print(f"[Image Generation] Extension: {file_extension}, Size: {len(data_buffer)} bytes")
+                        
+                        # Сохраняем изображение
+                        file_name = f"scene_{idx}{file_extension}"
+                        image_path = image_dir / file_name
+                        
+                        with open(image_path, "wb") as f:
+                            f.write(data_buffer)
+                        
+                        print(f"[Image Generation] ✅ Scene {idx + 1} saved: {image_path}")
+                        return str(image_path)
                 
-                if not image_saved:
-                    print(f"[Image Generation] ⚠️  Warning: No image generated for scene {idx + 1}")
-                    # Добавляем None чтобы сохранить порядок
-                    while len(generated_images) <= idx:
-                        generated_images.append(None)
-                    generated_images[idx] = None
-                    
-            except Exception as e:
-                print(f"[Image Generation] ❌ Error generating scene {idx + 1}: {str(e)}")
-                # Добавляем None чтобы сохранить порядок
-                while len(generated_images) <= idx:
-                    generated_images.append(None)
-                generated_images[idx] = None
-                continue
+                # ПОТОМ собираем текстовые части (если есть)
+                if hasattr(part, 'text') and part.text:
+                    text_parts.append(part.text)
+        
+        # Если были текстовые части, выводим их
+        if text_parts:
+            full_text = ''.join(text_parts)
+            print(f"[Image Generation] Model text response: {full_text[:200]}...")
+            print(f"[Image Generation] ⚠️  No image data received for scene {idx + 1}, only text!")
         
-        # Фильтруем None и возвращаем только успешные
-        successful_images = [img for img in generated_images if img is not None]
-        print(f"\n[Image Generation] ✅ Generated {len(successful_images)}/{len(prompts)} images")
-        return successful_images
+        return None
     
     # ═══════════════════════════════════════════════════════════════
     # ENGLISH TRANSLATION METHODS
@@ -433,10 +522,7 @@ RUSSIAN TEXT:
             ),
         ]
         
-        response = self.client.models.generate_content(
-            model=self.text_model_name,
-            contents=contents,
-        )
+        response = await self.generate_content(contents)
         
         return response.text.strip()
     
@@ -506,10 +592,7 @@ Return result STRICTLY in JSON format:
             ),
         ]
         
-        response = self.client.models.generate_content(
-            model=self.text_model_name,
-            contents=contents,
-        )
+        response = await self.generate_content(contents)
         
         text = response.text.strip()
         
@@ -603,10 +686,7 @@ RETURN ONLY THE HOOK TEXT, NO EXPLANATIONS.
             ),
         ]
         
-        response = self.client.models.generate_content(
-            model=self.text_model_name,
-            contents=contents,
-        )
+        response = await self.generate_content(contents)
         
         hook = response.text.strip()
         
@@ -692,10 +772,7 @@ Prompts must be in ENGLISH for Gemini/Grok!
             ),
         ]
         
-        response = self.client.models.generate_content(
-            model=self.text_model_name,
-            contents=contents,
-        )
+        response = await self.generate_content(contents)
         
         text = response.text.strip()
         
@@ -821,10 +898,7 @@ RETURN STRICTLY IN JSON FORMAT:
             ),
         ]
         
-        response = self.client.models.generate_content(
-            model=self.text_model_name,
-            contents=contents,
-        )
+        response = await self.generate_content(contents)
         
         text = response.text.strip()
         
@@ -891,10 +965,7 @@ RETURN STRICTLY IN JSON FORMAT:
             ),
         ]
         
-        response = self.client.models.generate_content(
-            model=self.text_model_name,
-            contents=contents,
-        )
+        response = await self.generate_content(contents)
         
         result = response.text.strip()
         
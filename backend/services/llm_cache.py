@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from .cache_counters import SharedCounters
+
+
+# Флаг принудительной регенерации: если True, кеш не читается (но свежий ответ записывается).
+# Устанавливается пайплайнами на время выполнения и наследуется вложенными задачами asyncio.
+llm_cache_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+class LLMCache:
+    """
+    Персистентный кеш ответов LLM на диске
+
+    Ключ — sha256 от (модель, содержимое запроса, конфиг генерации).
+    Каждая запись — отдельный JSON-файл; порядок LRU определяется временем доступа (mtime).
+    Источник истины — сам каталог: API и процессы воркеров видят записи друг друга,
+    счётчики попаданий общие (файл .counters, см. SharedCounters).
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl_seconds: int,
+        max_entries: int,
+        max_bytes: int
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.counters = SharedCounters(self.cache_dir / ".counters")
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _entries(self) -> List[Tuple[float, Path, int]]:
+        """
+        Записи на диске: (mtime, путь, размер), от давно использованных к недавним
+        """
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        return sorted(entries)
+
+    @staticmethod
+    def make_key(model: str, contents: List[Any], config: Any = None) -> str:
+        """
+        Вычисляет ключ кеша из модели, промпта и конфигурации генерации
+        """
+        def dump(obj):
+            if obj is None:
+                return None
+            if hasattr(obj, "model_dump"):
+                return obj.model_dump(mode="json", exclude_none=True)
+            return obj
+
+        payload = json.dumps(
+            {
+                "model": model,
+                "contents": [dump(c) for c in contents],
+                "config": dump(config),
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Возвращает сохранённый ответ (JSON-строку) или None
+        """
+        if llm_cache_bypass.get():
+            self.counters.add(bypassed=1)
+            return None
+
+        path = self._path(key)
+        try:
+            if self.ttl_seconds > 0 and time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                self.counters.add(expirations=1, misses=1)
+                return None
+
+            value = path.read_text(encoding="utf-8")
+            os.utime(path)  # Обновляем время доступа для LRU
+        except OSError:
+            # Нет записи (или её только что вытеснил другой процесс)
+            self.counters.add(misses=1)
+            return None
+
+        self.counters.add(hits=1)
+        return value
+
+    def set(self, key: str, value: str):
+        """
+        Сохраняет ответ и вытесняет старые записи сверх лимитов
+        """
+        path = self._path(key)
+        # Временный файл уникален для процесса и потока: одинаковый ответ могут писать несколько воркеров
+        tmp_path = self.cache_dir / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            tmp_path.write_text(value, encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"[LLM Cache] ⚠️  Could not write cache entry: {e}")
+            return
+
+        self._evict(keep=path)
+
+    def _evict(self, keep: Path):
+        entries = self._entries()
+        count = len(entries)
+        total_bytes = sum(size for _, _, size in entries)
+        evicted = 0
+        for _, path, size in entries:
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            count -= 1
+            total_bytes -= size
+            evicted += 1
+        if evicted:
+            self.counters.add(evictions=evicted)
+
+    def clear(self):
+        """
+        Удаляет все записи кеша (в том числе записанные другими процессами)
+        """
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        counters = self.counters.read()
+        hits = counters.get("hits", 0)
+        lookups = hits + counters.get("misses", 0)
+        entries = self._entries()
+        return {
+            "enabled": settings.llm_cache_enabled,
+            "hits": hits,
+            "misses": counters.get("misses", 0),
+            "bypassed": counters.get("bypassed", 0),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": counters.get("evictions", 0),
+            "expirations": counters.get("expirations", 0),
+            "entries": len(entries),
+            "size_bytes": sum(size for _, _, size in entries),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+llm_cache = LLMCache(
+    cache_dir=settings.cache_dir / "llm",
+    ttl_seconds=settings.llm_cache_ttl_seconds,
+    max_entries=settings.llm_cache_max_entries,
+    max_bytes=settings.llm_cache_max_mb * 1024 * 1024
+)
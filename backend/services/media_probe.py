@@ -0,0 +1,93 @@
+import asyncio
+import json
+import subprocess
+from typing import Any, Dict, Optional
+
+from config import settings
+
+
+PROBE_TIMEOUT_SECONDS = 30
+
+
+def _parse_rate(rate: Optional[str]) -> Optional[float]:
+    # ffprobe отдаёт частоту кадров дробью вида "30000/1001"
+    if not rate or rate == "0/0":
+        return None
+    num, _, den = rate.partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def probe_media(path: str) -> Dict[str, Any]:
+    """
+    Читает метаданные медиафайла через ffprobe (только заголовки контейнера, без декодирования)
+
+    Returns:
+        Словарь: duration (секунды), duration_ms, has_video, has_audio, а также
+        width/height/fps/frames/video_codec/pix_fmt для видео и sample_rate/channels/audio_codec для аудио
+        (frames — число кадров из заголовка контейнера, None, если контейнер его не хранит)
+
+    Raises:
+        RuntimeError: файл не читается, ffprobe завис (PROBE_TIMEOUT_SECONDS) или не запускается
+    """
+    try:
+        result = subprocess.run(
+            [
+                settings.ffprobe_binary, "-v", "error",
+                "-print_format", "json",
+                "-show_format", "-show_streams",
+                str(path)
+            ],
+            capture_output=True,
+            text=True,
+            timeout=PROBE_TIMEOUT_SECONDS
+        )
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"ffprobe timed out after {PROBE_TIMEOUT_SECONDS}s for {path}")
+    except OSError as e:
+        # Нет ffprobe по пути FFPROBE_BINARY или его нельзя запустить
+        raise RuntimeError(f"Could not run ffprobe for {path}: {e}")
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {result.stderr.strip()}")
+
+    data = json.loads(result.stdout)
+    streams = data.get("streams", [])
+    # Обложка mp3 тоже выглядит как видеопоток — пропускаем её
+    video = next((
+        s for s in streams
+        if s.get("codec_type") == "video" and not s.get("disposition", {}).get("attached_pic")
+    ), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    duration = data.get("format", {}).get("duration") or (video or audio or {}).get("duration") or 0.0
+    info: Dict[str, Any] = {
+        "duration": float(duration),
+        "duration_ms": int(round(float(duration) * 1000)),
+        "has_video": video is not None,
+        "has_audio": audio is not None,
+    }
+    if video:
+        info.update(
+            width=int(video.get("width", 0)),
+            height=int(video.get("height", 0)),
+            fps=_parse_rate(video.get("avg_frame_rate")) or _parse_rate(video.get("r_frame_rate")),
+            frames=int(video["nb_frames"]) if video.get("nb_frames") else None,
+            video_codec=video.get("codec_name"),
+            pix_fmt=video.get("pix_fmt"),
+        )
+    if audio:
+        info.update(
+            sample_rate=int(audio.get("sample_rate", 0)),
+            channels=int(audio.get("channels", 0)),
+            audio_codec=audio.get("codec_name"),
+        )
+    return info
+
+
+async def aprobe_media(path: str) -> Dict[str, Any]:
+    """
+    probe_media для async-кода (ffprobe запускается в отдельном потоке)
+    """
+    return await asyncio.to_thread(probe_media, path)
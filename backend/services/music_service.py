@@ -29,7 +29,7 @@ class MusicService:
         
         return random.choice(tracks) if tracks else None
     
-    def detect_mood_from_text(self, text: str, gemini_service) -> str:
+    async def detect_mood_from_text(self, text: str, gemini_service) -> str:
         """
         Определяет настроение текста через LLM
         """
@@ -57,10 +57,7 @@ Return ONLY the mood word, nothing else.
             ),
         ]
         
-        response = gemini_service.client.models.generate_content(
-            model=gemini_service.text_model_name,
-            contents=contents,
-        )
+        response = await gemini_service.generate_content(contents)
         
         mood = response.text.strip().lower()
         
@@ -81,7 +78,7 @@ Return ONLY the mood word, nothing else.
         
         # Определяем настроение текста
         text = parable.text_for_tts if parable.text_for_tts else parable.text_original
-        mood = self.detect_mood_from_text(text, gemini_service)
+        mood = await self.detect_mood_from_text(text, gemini_service)
         
         print(f"[Music Service] Detected mood for parable {parable_id}: {mood}")
         
@@ -142,7 +139,7 @@ Return ONLY the mood word, nothing else.
         if not text:
             return None
         
-        mood = self.detect_mood_from_text(text, gemini_service)
+        mood = await self.detect_mood_from_text(text, gemini_service)
         
         print(f"[Music Service] Detected mood for English parable {english_parable_id}: {mood}")
         
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+
+# Узел графа: (имена зависимостей, функция от результатов зависимостей -> awaitable)
+DagNode = Tuple[List[str], Callable[..., Awaitable[Any]]]
+
+
+async def run_dag(nodes: Dict[str, DagNode], log_prefix: str = "[Pipeline]") -> Dict[str, Any]:
+    """
+    Выполняет небольшой граф асинхронных задач: каждый узел стартует,
+    как только готовы его зависимости, независимые узлы идут параллельно.
+
+    Узлы не должны работать с общей сессией БД — запись результатов
+    выполняется вызывающим кодом после завершения графа.
+
+    Returns:
+        Словарь {имя узла: результат}
+    """
+    for name, (deps, _) in nodes.items():
+        for dep in deps:
+            if dep not in nodes:
+                raise ValueError(f"DAG node '{name}' depends on unknown node '{dep}'")
+
+    tasks: Dict[str, asyncio.Task] = {}
+    visiting = set()
+
+    async def run_node(name: str) -> Any:
+        deps, fn = nodes[name]
+        dep_results = [await tasks[dep] for dep in deps]
+
+        started = time.perf_counter()
+        result = await fn(*dep_results)
+        elapsed = time.perf_counter() - started
+        print(f"{log_prefix} ⏱️  {name}: {elapsed:.2f}s")
+        return result
+
+    def schedule(name: str):
+        if name in tasks:
+            return
+        if name in visiting:
+            raise ValueError(f"DAG has a cycle at node '{name}'")
+        visiting.add(name)
+        for dep in nodes[name][0]:
+            schedule(dep)
+        visiting.discard(name)
+        tasks[name] = asyncio.create_task(run_node(name))
+
+    started = time.perf_counter()
+    try:
+        for name in nodes:
+            schedule(name)
+        results = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    print(f"{log_prefix} ⏱️  DAG total ({len(nodes)} nodes): {time.perf_counter() - started:.2f}s")
+    return dict(zip(tasks.keys(), results))
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import shutil
+import stat as stat_module
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from .cache_counters import SharedCounters
+
+
+# Версия формата сегментов: увеличить при изменении команд рендера, чтобы не брать старые файлы
+RENDER_CACHE_VERSION = 1
+
+
+_digest_cache: Dict[Tuple[str, int, int], str] = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path: str) -> str:
+    """
+    sha256 содержимого файла; повторные вызовы для неизменённого файла берутся из памяти
+    """
+    stat = os.stat(path)
+    memo_key = (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        if memo_key in _digest_cache:
+            return _digest_cache[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    with _digest_lock:
+        _digest_cache[memo_key] = digest.hexdigest()
+    return digest.hexdigest()
+
+
+def make_render_key(**params: Any) -> str:
+    """
+    Ключ сегмента из хешей входных файлов и параметров рендера
+    """
+    payload = json.dumps(
+        {"version": RENDER_CACHE_VERSION, **params},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class RenderCache:
+    """
+    Кеш промежуточных результатов рендера на диске (сегменты видео, аудиодорожка)
+
+    Файл записи называется по ключу; порядок LRU — по времени доступа (mtime),
+    при превышении max_bytes удаляются давно не использованные записи.
+    Источник истины — сам каталог: рендеры в разных процессах видят и вытесняют записи друг друга,
+    счётчики общие (файл .counters, см. SharedCounters).
+
+    Запись, которую рендер ещё читает, закрепляется жёсткой ссылкой в его каталоге закреплений
+    (pinned): вытеснение удаляет только имя в кеше, файл остаётся доступным до конца рендера.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.pins_dir = self.cache_dir / ".pins"
+        self.pins_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.counters = SharedCounters(self.cache_dir / ".counters")
+        self._cleanup_pins()
+
+    def _entries(self) -> List[Tuple[float, Path, int]]:
+        """
+        Записи на диске: (mtime, путь, размер), от давно использованных к недавним
+        """
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.name.startswith(".") or ".tmp" in path.suffixes:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if stat_module.S_ISREG(stat.st_mode):
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return sorted(entries)
+
+    def path_for(self, key: str, suffix: str) -> Path:
+        return self.cache_dir / f"{key}{suffix}"
+
+    def tmp_path_for(self, key: str, suffix: str) -> Path:
+        # Расширение сохраняем, чтобы ffmpeg определил контейнер
+        return self.cache_dir / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp{suffix}"
+
+    @contextmanager
+    def pinned(self) -> Iterator[Path]:
+        """
+        Каталог закреплений на время рендера; удаляется вместе со ссылками по выходу
+        """
+        pin_dir = Path(tempfile.mkdtemp(prefix=f"{os.getpid()}.", dir=self.pins_dir))
+        try:
+            yield pin_dir
+        finally:
+            shutil.rmtree(pin_dir, ignore_errors=True)
+
+    @staticmethod
+    def _pin(source: Path, pin_dir: Path, name: str) -> Path:
+        """
+        Жёсткая ссылка на файл в каталоге закреплений (копия, если ФС не поддерживает ссылки)
+        """
+        pinned = pin_dir / name
+        try:
+            os.link(source, pinned)
+        except FileExistsError:
+            pass  # Та же запись уже закреплена этим рендером
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(source, pinned)
+        return pinned
+
+    def get(self, key: str, suffix: str, pin_dir: Optional[Path] = None) -> Optional[Path]:
+        """
+        Путь к готовой записи или None
+
+        С pin_dir возвращается закреплённая копия записи: её не удалит вытеснение в другом процессе.
+        """
+        path = self.path_for(key, suffix)
+        try:
+            os.utime(path)  # Обновляем время доступа для LRU
+            if pin_dir is not None:
+                path = self._pin(path, pin_dir, path.name)
+        except FileNotFoundError:
+            # Нет записи (или её только что вытеснил другой процесс)
+            self.counters.add(misses=1)
+            return None
+
+        self.counters.add(hits=1)
+        return path
+
+    def put(self, key: str, suffix: str, tmp_path: Path, pin_dir: Optional[Path] = None) -> Path:
+        """
+        Переносит готовый файл в кеш и вытесняет старые записи сверх лимита
+
+        С pin_dir файл закрепляется до переноса и возвращается закреплённый путь.
+        """
+        path = self.path_for(key, suffix)
+        pinned = self._pin(tmp_path, pin_dir, path.name) if pin_dir is not None else path
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+        return pinned
+
+    def _evict(self, keep: Path):
+        entries = self._entries()
+        total_bytes = sum(size for _, _, size in entries)
+        evicted = 0
+        for _, path, size in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            evicted += 1
+        if evicted:
+            self.counters.add(evictions=evicted)
+
+    def _cleanup_pins(self):
+        """
+        Удаляет закрепления процессов рендера, которые завершились, не убрав их (убиты супервизором)
+        """
+        for pin_dir in self.pins_dir.iterdir():
+            pid = pin_dir.name.split(".")[0]
+            if pid.isdigit() and not _alive(int(pid)):
+                shutil.rmtree(pin_dir, ignore_errors=True)
+
+    def clear(self):
+        """
+        Удаляет все записи кеша (в том числе записанные другими процессами)
+
+        Закреплённые файлы идущих рендеров остаются до их завершения.
+        """
+        for _, path, _ in self._entries():
+            path.unlink(missing_ok=True)
+        self._cleanup_pins()
+
+    def stats(self) -> Dict[str, Any]:
+        counters = self.counters.read()
+        hits = counters.get("hits", 0)
+        lookups = hits + counters.get("misses", 0)
+        entries = self._entries()
+        return {
+            "enabled": settings.render_cache_enabled,
+            "hits": hits,
+            "misses": counters.get("misses", 0),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": counters.get("evictions", 0),
+            "entries": len(entries),
+            "size_bytes": sum(size for _, _, size in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+render_cache = RenderCache(
+    cache_dir=settings.cache_dir / "render",
+    max_bytes=settings.render_cache_max_mb * 1024 * 1024
+)
@@ -0,0 +1,182 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+
+
+MEMORY_SAMPLE_SECONDS = 0.5
+
+# Грубые начальные коэффициенты линейных моделей ниже (порядок величин для 1080x1920, 30 fps);
+# используются, пока в render_metrics не накопится RENDER_ESTIMATE_MIN_SAMPLES рендеров
+DEFAULT_TIME_COEFFICIENTS = {
+    "ffmpeg": [2.0, 0.004, 0.5],
+    "moviepy": [5.0, 0.02, 1.0],
+    "streaming": [3.0, 0.01, 0.3],
+}
+DEFAULT_MEMORY_COEFFICIENTS = {
+    "ffmpeg": [150.0, 120.0, 40.0],
+    "moviepy": [300.0, 250.0, 60.0],
+    # Потоковый рендер держит один декодер: память не растёт с числом фрагментов
+    "streaming": [200.0, 100.0, 0.0],
+}
+
+
+def _rss_mb(pid: int) -> float:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0.0
+
+
+def _children(pid: int) -> List[int]:
+    result = []
+    try:
+        for task in Path(f"/proc/{pid}/task").iterdir():
+            result.extend(int(child) for child in (task / "children").read_text().split())
+    except (OSError, ValueError):
+        pass
+    return result
+
+
+def process_tree_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """
+    Суммарная резидентная память процесса и всех его потомков (ffmpeg), МБ; None вне Linux
+    """
+    pid = pid or os.getpid()
+    if not Path(f"/proc/{pid}/status").exists():
+        return None
+    total = 0.0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += _rss_mb(current)
+        stack.extend(_children(current))
+    return total
+
+
+class MemorySampler:
+    """
+    Пиковая память процесса вместе с дочерними ffmpeg за время блока with
+
+    Опрос идёт в отдельном потоке: moviepy кодирует синхронно и блокирует event loop.
+    При нескольких рендерах в одном процессе воркера пик включает их все.
+    """
+
+    def __init__(self, interval: float = MEMORY_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peak_mb: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        current = process_tree_rss_mb()
+        if current is not None:
+            self.peak_mb = max(self.peak_mb or 0.0, current)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="render-memory-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return False
+
+
+def render_features(frames: int, width: int, height: int, fragments: int) -> Dict[str, float]:
+    """
+    Признаки рендера для модели стоимости
+    """
+    return {
+        "frames": frames,
+        "megapixels": width * height / 1_000_000,
+        "fragments": fragments,
+    }
+
+
+def _time_row(features: Dict[str, float]) -> List[float]:
+    # Время: постоянные расходы + объём кодирования (кадры × мегапиксели) + открытие фрагментов
+    return [1.0, features["frames"] * features["megapixels"], features["fragments"]]
+
+
+def _memory_row(features: Dict[str, float]) -> List[float]:
+    # Память: постоянные расходы + буферы кадра + декодер на каждый фрагмент
+    return [1.0, features["megapixels"], features["fragments"]]
+
+
+def _fit(rows: List[List[float]], targets: List[float]) -> Optional[np.ndarray]:
+    """
+    Линейная регрессия методом наименьших квадратов; None, если данных недостаточно
+
+    Признаки, постоянные во всей истории (например, мегапиксели после нормализации фрагментов),
+    неотличимы от свободного члена: такие столбцы исключаются, их вклад входит в свободный член,
+    а коэффициент равен 0.
+    """
+    if not rows:
+        return None
+    matrix = np.array(rows, dtype=float)
+    # Столбец 0 — свободный член, остальные учитываются, только если меняются
+    columns = [0] + [i for i in range(1, matrix.shape[1]) if np.ptp(matrix[:, i]) > 1e-9]
+    if len(rows) < max(settings.render_estimate_min_samples, len(columns)):
+        return None
+    reduced, _, rank, _ = np.linalg.lstsq(matrix[:, columns], np.array(targets, dtype=float), rcond=None)
+    if rank < len(columns):
+        return None
+    coefficients = np.zeros(matrix.shape[1])
+    coefficients[columns] = reduced
+    return coefficients
+
+
+def _is_full_render(entry: Dict[str, Any]) -> bool:
+    # Рендер с попаданиями в кеш сегментов пересобрал не все фрагменты — он быстрее полного
+    # и занижал бы прогноз; None — бэкенд без кеша сегментов
+    rendered = entry.get("segments_rendered")
+    return rendered is None or rendered >= entry["fragments"]
+
+
+def estimate_render(features: Dict[str, float], history: List[Dict[str, Any]], backend: str) -> Dict[str, Any]:
+    """
+    Прогноз времени рендера и пиковой памяти для рендера без кеша
+
+    history — прошлые рендеры того же бэкенда и режима: признаки (render_features),
+    segments_rendered и замеры render_seconds / peak_memory_mb. Модель строится только
+    по полным рендерам (все сегменты пересобраны). Пока истории мало, используются коэффициенты по умолчанию.
+    """
+    history = [h for h in history if _is_full_render(h)]
+    timed = [h for h in history if h.get("render_seconds") is not None]
+    time_coefficients = _fit([_time_row(h) for h in timed], [h["render_seconds"] for h in timed])
+    time_fitted = time_coefficients is not None
+    if not time_fitted:
+        time_coefficients = DEFAULT_TIME_COEFFICIENTS.get(backend, DEFAULT_TIME_COEFFICIENTS["moviepy"])
+
+    measured = [h for h in history if h.get("peak_memory_mb") is not None]
+    memory_coefficients = _fit([_memory_row(h) for h in measured], [h["peak_memory_mb"] for h in measured])
+    memory_fitted = memory_coefficients is not None
+    if not memory_fitted:
+        memory_coefficients = DEFAULT_MEMORY_COEFFICIENTS.get(backend, DEFAULT_MEMORY_COEFFICIENTS["moviepy"])
+
+    render_seconds = float(np.dot(_time_row(features), time_coefficients))
+    peak_memory_mb = float(np.dot(_memory_row(features), memory_coefficients))
+
+    return {
+        "render_seconds": round(max(render_seconds, 0.0), 1),
+        "peak_memory_mb": round(max(peak_memory_mb, 0.0)),
+        "time_model": "fitted" if time_fitted else "default",
+        "memory_model": "fitted" if memory_fitted else "default",
+        "time_samples": len(timed),
+        "memory_samples": len(measured),
+    }
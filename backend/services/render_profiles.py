@@ -0,0 +1,91 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+
+RENDER_MODES = ("preview", "final")
+
+
+def get_encoder_profile(mode: str = "final") -> Dict[str, Any]:
+    """
+    Параметры кодирования для режима рендера
+
+    preview — быстрый черновой рендер: уменьшенное разрешение, ultrafast, CRF
+    final — итоговое качество: preset/CRF (или битрейт)/потоки из настроек
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {mode}")
+
+    if mode == "preview":
+        return {
+            "mode": mode,
+            "codec": "libx264",
+            "preset": settings.render_preview_preset,
+            "crf": settings.render_preview_crf,
+            "bitrate": None,
+            "threads": settings.render_threads,
+            "height": settings.render_preview_height,
+            "fps": settings.render_preview_fps,
+        }
+
+    return {
+        "mode": mode,
+        "codec": "libx264",
+        "preset": settings.render_final_preset,
+        "crf": settings.render_final_crf,
+        # CRF задаёт постоянное качество; битрейт используется, только если CRF не задан
+        "bitrate": None if settings.render_final_crf is not None else settings.render_final_bitrate,
+        "threads": settings.render_threads,
+        "height": None,
+        "fps": 30,
+    }
+
+
+def ffmpeg_video_args(profile: Dict[str, Any]) -> List[str]:
+    """
+    Аргументы видеоэнкодера ffmpeg для профиля
+    """
+    args = ["-c:v", profile["codec"], "-preset", profile["preset"]]
+    if profile["crf"] is not None:
+        args += ["-crf", str(profile["crf"])]
+    if profile["bitrate"]:
+        args += ["-b:v", profile["bitrate"]]
+    if profile["threads"]:
+        args += ["-threads", str(profile["threads"])]
+    return args
+
+
+def scaled_size(width: int, height: int, target_height: Optional[int]):
+    """
+    Размер кадра после уменьшения до target_height (чётные стороны для yuv420p)
+    """
+    if not target_height or target_height >= height:
+        return width, height
+    scaled_width = int(round(width * target_height / height / 2)) * 2
+    return scaled_width, target_height - target_height % 2
+
+
+def available_cores() -> int:
+    """
+    Число ядер, доступных процессу (с учётом cpuset контейнера)
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def render_host_concurrency_limit() -> int:
+    """
+    Сколько рендеров выполняется одновременно на этой машине (по всем её воркерам):
+    RENDER_HOST_CONCURRENCY или ядра / RENDER_CORES_PER_JOB
+    """
+    return settings.render_host_concurrency or max(1, available_cores() // settings.render_cores_per_job)
+
+
+def render_cores() -> int:
+    """
+    Ядер на один рендер, когда на машине одновременно идут render_host_concurrency_limit() рендеров
+    """
+    return max(1, available_cores() // render_host_concurrency_limit())
@@ -0,0 +1,149 @@
+import asyncio
+import ctypes
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Не Unix
+    resource = None
+
+from config import settings
+from .render_metrics import process_tree_rss_mb
+
+
+# Метки окружения процесса рендера; их наследуют дочерние ffmpeg, по ним находятся осиротевшие процессы
+RENDER_JOB_ENV = "RENDER_JOB_ID"
+RENDER_SUPERVISOR_ENV = "RENDER_SUPERVISOR_PID"
+WATCHDOG_SECONDS = 1.0
+PR_SET_PDEATHSIG = 1
+
+
+def _kill_group(pgid: int):
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def run_isolated(
+    command: List[str], job_id: int, cancelled: Callable[[], bool]
+) -> Tuple[Optional[str], bool]:
+    """
+    Запускает задачу рендера отдельным процессом под надзором
+
+    Процесс получает свою группу (сессию): при таймауте, превышении памяти или отмене
+    группа убивается целиком вместе с ffmpeg. Память считается по всему дереву процессов.
+
+    Args:
+        command: команда процесса рендера (worker.py --run-job)
+        cancelled: проверка отмены (воркер потерял задачу — её отменили через API)
+
+    Returns:
+        (None при успехе, иначе текст ошибки для очереди задач; можно ли повторить задачу).
+        Таймаут и превышение памяти не повторяются: тот же рендер упрётся в тот же лимит.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        env={**os.environ, RENDER_JOB_ENV: str(job_id), RENDER_SUPERVISOR_ENV: str(os.getpid())},
+        start_new_session=True
+    )
+    timeout = settings.render_job_timeout_seconds
+    memory_limit = settings.render_job_memory_limit_mb
+    started = time.monotonic()
+
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(process.wait(), WATCHDOG_SECONDS)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+            reason, retry = None, False
+            if cancelled():
+                reason = "Cancelled"
+            elif timeout and time.monotonic() - started > timeout:
+                reason = f"Render timed out after {timeout}s"
+            elif memory_limit:
+                current = process_tree_rss_mb(process.pid)
+                if current is not None and current > memory_limit:
+                    reason = f"Render exceeded memory limit: {current:.0f} MB > {memory_limit} MB"
+
+            if reason:
+                print(f"[Render Supervisor] Job {job_id}: {reason}, killing render process {process.pid}")
+                _kill_group(process.pid)
+                await process.wait()
+                return reason, retry
+
+        if process.returncode != 0:
+            return f"Render process exited with code {process.returncode}", True
+        return None, True
+    finally:
+        # ffmpeg, оставшиеся от процесса рендера (в том числе после его падения)
+        _kill_group(process.pid)
+
+
+def isolate_current_process():
+    """
+    Настройка процесса рендера при старте: лимит адресного пространства (наследуется ffmpeg)
+    и завершение вместе с воркером (только Linux)
+    """
+    if resource is not None and settings.render_job_address_space_mb:
+        limit = settings.render_job_address_space_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    try:
+        ctypes.CDLL(None).prctl(PR_SET_PDEATHSIG, signal.SIGTERM)
+    except (OSError, AttributeError):
+        return
+
+    # Воркер мог завершиться до prctl — тогда сигнала уже не будет
+    supervisor = os.environ.get(RENDER_SUPERVISOR_ENV)
+    if supervisor and os.getppid() != int(supervisor):
+        sys.exit(1)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def cleanup_orphaned_renders() -> int:
+    """
+    Завершает процессы рендера и их ffmpeg, чей воркер больше не работает (упал или был убит)
+
+    Returns:
+        Сколько процессов завершено
+    """
+    proc = Path("/proc")
+    if not proc.exists():
+        return 0
+
+    marker = f"{RENDER_SUPERVISOR_ENV}=".encode()
+    killed = 0
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            environ = (entry / "environ").read_bytes().split(b"\0")
+        except OSError:
+            continue
+        supervisor = next((item[len(marker):] for item in environ if item.startswith(marker)), None)
+        if supervisor is None or _alive(int(supervisor)):
+            continue
+        try:
+            os.kill(int(entry.name), signal.SIGKILL)
+            killed += 1
+        except (ProcessLookupError, PermissionError):
+            pass
+    return killed
@@ -0,0 +1,275 @@
+import asyncio
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from .audio_mixer import mix_narration
+from .ffmpeg_renderer import AUDIO_SAMPLE_RATE
+from .media_probe import probe_media
+from .render_metrics import process_tree_rss_mb, render_features
+from .render_profiles import get_encoder_profile, ffmpeg_video_args, scaled_size
+from .subtitles import SubtitleTrack, build_subtitle_cues
+from .timeline import plan_timeline, retime_cues
+
+
+MEMORY_CHECK_FRAMES = 10  # Как часто (в кадрах) сверять память процесса с потолком
+QUEUE_POLL_SECONDS = 0.05
+
+
+def _stderr_tail(stderr_file) -> str:
+    stderr_file.seek(0)
+    return stderr_file.read().decode(errors="replace").strip()[-2000:]
+
+
+class StreamingRenderer:
+    """
+    Потоковый рендер финального видео с ограничением памяти
+
+    moviepy открывает декодеры всех фрагментов сразу и держит их до конца рендера.
+    Здесь кадры идут по конвейеру генераторов: декодер ffmpeg текущего фрагмента
+    (открыт только один) -> очередь кадров фиксированной глубины -> субтитры (SubtitleTrack)
+    -> stdin энкодера ffmpeg. Медленный энкодер блокирует запись, очередь заполняется
+    и останавливает декодер — в памяти одновременно не больше queue_frames кадров.
+
+    Глубина очереди рассчитывается от потолка RENDER_MEMORY_LIMIT_MB; если память процесса
+    вместе с дочерними ffmpeg всё же выше потолка, декодер ждёт, пока очередь опустеет.
+    """
+
+    async def render(
+        self,
+        video_paths: List[str],
+        audio_path: str,
+        text_for_subtitles: str,
+        output_path: Path,
+        music_path: Optional[str] = None,
+        music_volume_db: float = -18.0,
+        target_durations: Optional[List[Optional[float]]] = None,
+        profile: Optional[Dict[str, Any]] = None
+    ) -> Tuple[float, Dict[str, Any]]:
+        """
+        Рендерит финальное видео в output_path (интерфейс как у FFmpegRenderer.render)
+
+        Returns:
+            Длительность итогового видео в секундах и статистика рендера
+        """
+        profile = profile or get_encoder_profile("final")
+        fps = profile["fps"]
+
+        fragments = await asyncio.to_thread(lambda: [probe_media(p) for p in video_paths])
+        voice = await asyncio.to_thread(probe_media, audio_path)
+
+        # Как concatenate_videoclips(method="compose"): кадр = максимальный размер, фрагменты по центру
+        width = max(f["width"] for f in fragments)
+        height = max(f["height"] for f in fragments)
+        plan = plan_timeline([f["duration"] for f in fragments], target_durations, voice["duration"], fps)
+        out_width, out_height = scaled_size(width, height, profile["height"])
+
+        print(f"[Streaming Renderer] {len(fragments)} fragments {width}x{height}, "
+              f"fit x{plan['fit']:.3f}, cap x{plan['cap']:.3f} -> {plan['final_duration']:.2f}s")
+
+        track = None
+        if text_for_subtitles:
+            cues = await asyncio.to_thread(build_subtitle_cues, text_for_subtitles, voice["duration"], audio_path)
+            track = SubtitleTrack(retime_cues(cues, plan["cap"]), width, height)
+            print(f"[Streaming Renderer] Subtitles: {len(cues)} phrases")
+
+        with tempfile.TemporaryDirectory(prefix="render_") as tmp:
+            # Звук сводится заранее одной дорожкой сразу в итоговом темпе (ограничение 60 секунд)
+            mix_path = Path(tmp) / "mix.wav"
+            fragment_tracks = [
+                (path if info["has_audio"] else None, info["duration"], entry["target_speed"] * plan["fit"])
+                for path, info, entry in zip(video_paths, fragments, plan["fragments"])
+            ]
+            await asyncio.to_thread(
+                mix_narration, audio_path, mix_path, fragment_tracks, music_path, music_volume_db, plan["cap"]
+            )
+
+            pipeline_stats = await asyncio.to_thread(
+                self._stream, video_paths, plan, track, width, height, (out_width, out_height),
+                mix_path, profile, output_path
+            )
+
+        stats = {
+            "backend": "streaming",
+            "mode": profile["mode"],
+            "cache": False,
+            **render_features(int(round(plan["final_duration"] * fps)), out_width, out_height, len(fragments)),
+            **pipeline_stats,
+        }
+        return plan["final_duration"], stats
+
+    @staticmethod
+    def _queue_frames(frame_bytes: int) -> int:
+        """
+        Глубина очереди кадров: RENDER_STREAM_QUEUE_FRAMES, но не больше половины
+        свободного запаса до потолка памяти
+        """
+        depth = settings.render_stream_queue_frames
+        current = process_tree_rss_mb()
+        if settings.render_memory_limit_mb and current is not None:
+            budget = (settings.render_memory_limit_mb - current) * 1024 * 1024 / 2
+            depth = min(depth, int(budget // frame_bytes))
+        return max(1, depth)
+
+    def _stream(
+        self, video_paths, plan, track: Optional[SubtitleTrack], width, height, output_size,
+        mix_path: Path, profile, output_path: Path
+    ) -> Dict[str, Any]:
+        """
+        Конвейер декодер -> очередь -> энкодер (выполняется в отдельном потоке)
+        """
+        fps = profile["fps"]
+        limit_mb = settings.render_memory_limit_mb
+        queue_frames = self._queue_frames(width * height * 3)
+        frames: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(maxsize=queue_frames)
+        stop = threading.Event()
+        producer_error: List[BaseException] = []
+        memory_waits = 0
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=QUEUE_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            nonlocal memory_waits
+            source = self._timeline_frames(video_paths, plan, fps, width, height)
+            try:
+                for index, frame in enumerate(source):
+                    if limit_mb and index % MEMORY_CHECK_FRAMES == 0:
+                        current = process_tree_rss_mb()
+                        if current is not None and current > limit_mb:
+                            # Над потолком — не декодируем дальше, пока энкодер не разберёт очередь
+                            memory_waits += 1
+                            while not frames.empty() and not stop.is_set():
+                                time.sleep(QUEUE_POLL_SECONDS)
+                    if not put(frame):
+                        return
+            except BaseException as e:
+                producer_error.append(e)
+            finally:
+                source.close()
+                put(None)
+
+        scale = f"scale={output_size[0]}:{output_size[1]}," if output_size != (width, height) else ""
+        print(f"[Streaming Renderer] Frame queue: {queue_frames} frames, memory limit {limit_mb or '-'} MB")
+
+        with tempfile.TemporaryFile() as encoder_stderr:
+            encoder = subprocess.Popen(
+                [
+                    settings.ffmpeg_binary, "-hide_banner", "-nostdin", "-y", "-v", "error",
+                    "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps),
+                    "-i", "pipe:0",
+                    "-i", str(mix_path),
+                    "-map", "0:v:0", "-map", "1:a:0",
+                    "-vf", f"{scale}format=yuv420p",
+                    *ffmpeg_video_args(profile), "-r", str(fps),
+                    "-t", f"{plan['final_duration']:.6f}",
+                    "-c:a", "aac", "-ar", str(AUDIO_SAMPLE_RATE),
+                    "-movflags", "+faststart",
+                    str(output_path)
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=encoder_stderr
+            )
+            producer = threading.Thread(target=produce, name="render-stream-decoder", daemon=True)
+            producer.start()
+
+            written = 0
+            try:
+                while True:
+                    frame = frames.get()
+                    if frame is None:
+                        break
+                    t = written / fps
+                    if track:
+                        frame = track.apply(frame, t)
+                        if written % fps == 0:
+                            track.release_before(t)
+                    encoder.stdin.write(memoryview(np.ascontiguousarray(frame)))
+                    written += 1
+
+                if producer_error:
+                    raise producer_error[0]
+                encoder.stdin.close()
+                if encoder.wait() != 0:
+                    raise RuntimeError(f"ffmpeg encoder exited with code {encoder.returncode}: "
+                                       f"{_stderr_tail(encoder_stderr)}")
+            except BrokenPipeError:
+                encoder.wait()
+                raise RuntimeError(f"ffmpeg encoder exited with code {encoder.returncode}: "
+                                   f"{_stderr_tail(encoder_stderr)}")
+            finally:
+                stop.set()
+                producer.join()
+                if encoder.poll() is None:
+                    encoder.kill()
+                    encoder.wait()
+
+        return {
+            "queue_frames": queue_frames,
+            "memory_limit_mb": limit_mb or None,
+            "memory_waits": memory_waits,
+        }
+
+    def _timeline_frames(self, video_paths, plan, fps, width, height) -> Iterator[np.ndarray]:
+        """
+        Кадры всего видео по временной карте; декодер следующего фрагмента открывается
+        только после закрытия предыдущего
+        """
+        for path, entry in zip(video_paths, plan["fragments"]):
+            if entry["frames"] > 0:
+                yield from self._fragment_frames(path, entry["speed"], entry["frames"], fps, width, height)
+
+    @staticmethod
+    def _fragment_frames(path, speed, frame_count, fps, width, height) -> Iterator[np.ndarray]:
+        """
+        Декодирует фрагмент в итоговом темпе: ровно frame_count кадров RGB размера width x height
+        """
+        frame_bytes = width * height * 3
+        # Те же фильтры, что у сегментов ffmpeg-рендера; tpad добивает последний кадр после округления
+        filters = [
+            f"setpts=(PTS-STARTPTS)/{speed:.6f}",
+            f"fps={fps}",
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black",
+            "setsar=1",
+            "tpad=stop_mode=clone:stop_duration=1",
+            "format=rgb24",
+        ]
+        with tempfile.TemporaryFile() as decoder_stderr:
+            decoder = subprocess.Popen(
+                [
+                    settings.ffmpeg_binary, "-hide_banner", "-nostdin", "-v", "error",
+                    "-i", str(path),
+                    "-map", "0:v:0", "-an",
+                    "-vf", ",".join(filters),
+                    "-frames:v", str(frame_count),
+                    "-f", "rawvideo", "pipe:1"
+                ],
+                stdout=subprocess.PIPE,
+                stderr=decoder_stderr
+            )
+            try:
+                for _ in range(frame_count):
+                    data = decoder.stdout.read(frame_bytes)
+                    if len(data) < frame_bytes:
+                        decoder.wait()
+                        raise RuntimeError(f"Could not decode {path}: {_stderr_tail(decoder_stderr)}")
+                    yield np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+            finally:
+                decoder.stdout.close()
+                if decoder.poll() is None:
+                    decoder.kill()
+                decoder.wait()
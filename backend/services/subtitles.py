@@ -0,0 +1,276 @@
+import bisect
+import functools
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from config import settings
+from .audio_alignment import align_words
+
+
+# Субтитр: (начало, конец, текст) в секундах от начала видео
+SubtitleCue = Tuple[float, float, str]
+
+# Плашка субтитра: высота 150 px, верхний край на 180 px выше низа кадра
+SUBTITLE_BOX_HEIGHT = 150
+SUBTITLE_BOTTOM_OFFSET = 180
+
+SUBTITLE_FONT_SIZE = 24
+SUBTITLE_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/System/Library/Fonts/Helvetica.ttc",
+]
+SUBTITLE_PADDING = 15  # Отступ чёрной плашки вокруг текста
+SUBTITLE_STROKE_WIDTH = 1  # Чёрная обводка букв
+SUBTITLE_HOLD_SECONDS = 0.5  # Сколько фраза держится после последнего слова
+
+
+def clean_subtitle_text(text: str) -> str:
+    """
+    Очищает текст озвучки от тегов эмоций [], кавычек и переносов строк
+    """
+    clean_text = re.sub(r'\[.*?\]', '', text)  # Убираем [excited], [calm] и т.д.
+    clean_text = clean_text.replace('"', '').replace("'", '')  # Убираем кавычки
+    clean_text = clean_text.replace('\n', ' ')  # Убираем переносы строк
+    clean_text = re.sub(r'\s+', ' ', clean_text)  # Убираем лишние пробелы
+    return clean_text.strip()
+
+
+def _split_phrases(words: List[str]) -> List[Tuple[str, int, int]]:
+    """
+    Группирует слова во фразы: (тип, индекс первого слова, индекс после последнего)
+    Хук (первые ~20 слов) идёт по 1-2 слова, остальное — по 2-3 слова
+    """
+    # Первые ~15-20 слов - это обычно хук (быстрая речь)
+    hook_words_count = min(20, len(words) // 3)
+    
+    phrases = []
+    # ДЛЯ ХУКА: по 1-2 слова (очень быстро)
+    for i in range(0, hook_words_count, 2):
+        phrases.append(('hook', i, min(i + 2, hook_words_count)))
+    
+    # ДЛЯ ОСНОВНОГО ТЕКСТА: по 2-3 слова (нормально)
+    for i in range(hook_words_count, len(words), 3):
+        phrases.append(('main', i, min(i + 3, len(words))))
+    
+    return phrases
+
+
+def _proportional_cues(words: List[str], phrases, total_duration: float) -> List[SubtitleCue]:
+    # Хук занимает примерно первые 15% времени (быстрее читается)
+    hook_duration = total_duration * 0.15
+    main_duration = total_duration * 0.85
+    
+    hook_count = sum(1 for t, _, _ in phrases if t == 'hook')
+    main_count = sum(1 for t, _, _ in phrases if t == 'main')
+    
+    cues: List[SubtitleCue] = []
+    current_time = 0.0
+    for sent_type, first, last in phrases:
+        # Длительность зависит от типа (хук быстрее)
+        if sent_type == 'hook' and hook_count > 0:
+            duration = hook_duration / hook_count
+        elif main_count > 0:
+            duration = main_duration / main_count
+        else:
+            duration = 1.0
+        cues.append((current_time, current_time + duration, ' '.join(words[first:last])))
+        current_time += duration
+    
+    return cues
+
+
+def _aligned_cues(words: List[str], phrases, timings, total_duration: float) -> List[SubtitleCue]:
+    # Фраза видна с начала первого слова до начала следующей фразы,
+    # но в длинной паузе гаснет через SUBTITLE_HOLD_SECONDS после последнего слова
+    starts = [timings[first][0] for _, first, _ in phrases]
+    cues: List[SubtitleCue] = []
+    for idx, (_, first, last) in enumerate(phrases):
+        last_word_end = timings[last - 1][1]
+        hold_end = min(last_word_end + SUBTITLE_HOLD_SECONDS, total_duration)
+        end = min(starts[idx + 1], hold_end) if idx + 1 < len(phrases) else hold_end
+        cues.append((starts[idx], max(end, last_word_end), ' '.join(words[first:last])))
+    return cues
+
+
+def build_subtitle_cues(text: str, total_duration: float, audio_path: Optional[str] = None) -> List[SubtitleCue]:
+    """
+    Разбивает текст на короткие фразы и распределяет их по времени видео
+    
+    Если передан audio_path, фразы привязываются к таймингам слов озвучки
+    (см. audio_alignment); иначе — по долям длительности: хук 15%, остальное 85%.
+    Видео к этому моменту уже подогнано под длительность озвучки, поэтому шкалы совпадают.
+    """
+    words = clean_subtitle_text(text).split()
+    phrases = _split_phrases(words)
+    if not phrases:
+        return []
+    
+    if audio_path and settings.subtitle_alignment_enabled:
+        try:
+            timings = align_words(audio_path, words)
+            if timings:
+                return _aligned_cues(words, phrases, timings, total_duration)
+        except Exception as e:
+            print(f"[Subtitles] ⚠️  Alignment failed, using proportional timing: {e}")
+    
+    return _proportional_cues(words, phrases, total_duration)
+
+
+@functools.lru_cache(maxsize=8)
+def load_subtitle_font(size: int = SUBTITLE_FONT_SIZE):
+    """
+    Загружает шрифт субтитров один раз на процесс
+    """
+    for font_path in SUBTITLE_FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=settings.subtitle_bitmap_cache_size)
+def render_subtitle_bitmap(text: str, max_width: int, font_size: int = SUBTITLE_FONT_SIZE) -> np.ndarray:
+    """
+    Рисует субтитр: белый текст с чёрной обводкой на полупрозрачной чёрной плашке
+    
+    Картинка обрезана по плашке (а не на всю ширину кадра), результат кешируется (LRU)
+    по тексту, ширине кадра и размеру шрифта. Массив только для чтения — он общий для всех вызовов.
+    """
+    font = load_subtitle_font(font_size)
+    
+    # Габариты текста с учётом обводки
+    left, top, right, bottom = font.getbbox(text, stroke_width=SUBTITLE_STROKE_WIDTH)
+    width = min(right - left + 2 * SUBTITLE_PADDING, max_width)
+    height = bottom - top + 2 * SUBTITLE_PADDING
+    
+    # Плашка во всё изображение, текст по центру
+    img = Image.new('RGBA', (width, height), (0, 0, 0, 200))
+    draw = ImageDraw.Draw(img)
+    x = (width - (right - left)) // 2 - left
+    draw.text(
+        (x, SUBTITLE_PADDING - top), text, font=font,
+        fill=(255, 255, 255, 255),
+        stroke_width=SUBTITLE_STROKE_WIDTH, stroke_fill=(0, 0, 0, 255)
+    )
+    
+    bitmap = np.array(img)
+    bitmap.setflags(write=False)
+    return bitmap
+
+
+class SubtitleTrack:
+    """
+    Дорожка субтитров для moviepy: одна разреженная накладка вместо клипа на каждую фразу
+    
+    Фраза для кадра находится бинарным поиском по времени, картинка фразы рендерится
+    один раз и смешивается только в своей области кадра (плашка по центру полосы субтитров) —
+    стоимость кадра не зависит от числа фраз.
+    """
+    
+    def __init__(self, cues: List[SubtitleCue], frame_width: int, frame_height: int):
+        self.cues = cues
+        self.starts = [start for start, _, _ in cues]
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        # Центр плашки по вертикали
+        self.center_y = frame_height - SUBTITLE_BOTTOM_OFFSET + SUBTITLE_BOX_HEIGHT // 2
+        self._bitmaps: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    
+    def cue_index_at(self, t: float) -> Optional[int]:
+        idx = bisect.bisect_right(self.starts, t) - 1
+        if idx < 0 or t >= self.cues[idx][1]:
+            return None
+        return idx
+    
+    def _bitmap(self, idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        if idx not in self._bitmaps:
+            rgba = render_subtitle_bitmap(self.cues[idx][2], self.frame_width)
+            rgb = rgba[..., :3].astype(np.float32)
+            alpha = rgba[..., 3:4].astype(np.float32) / 255.0
+            self._bitmaps[idx] = (rgb, alpha)
+        return self._bitmaps[idx]
+    
+    def apply(self, frame: np.ndarray, t: float) -> np.ndarray:
+        """
+        Накладывает субтитр момента t на кадр
+        """
+        idx = self.cue_index_at(t)
+        if idx is None:
+            return frame
+        
+        rgb, alpha = self._bitmap(idx)
+        height, width = alpha.shape[:2]
+        x = (self.frame_width - width) // 2
+        y = self.center_y - height // 2
+        
+        # Обрезаем накладку по границам кадра
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, frame.shape[1]), min(y + height, frame.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return frame
+        rgb = rgb[y0 - y:y1 - y, x0 - x:x1 - x]
+        alpha = alpha[y0 - y:y1 - y, x0 - x:x1 - x]
+        
+        frame = frame.copy()
+        region = frame[y0:y1, x0:x1].astype(np.float32)
+        frame[y0:y1, x0:x1] = (region * (1.0 - alpha) + rgb * alpha).astype(np.uint8)
+        return frame
+    
+    def release_before(self, t: float):
+        """
+        Освобождает картинки фраз, закончившихся до момента t (потоковый рендер идёт только вперёд)
+        """
+        for idx in [idx for idx in self._bitmaps if self.cues[idx][1] <= t]:
+            del self._bitmaps[idx]
+
+
+def _ass_time(seconds: float) -> str:
+    centiseconds = int(round(seconds * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+
+def write_ass_subtitles(cues: List[SubtitleCue], path: Path, frame_width: int, frame_height: int) -> Path:
+    """
+    Записывает субтитры в формате ASS для прожига энкодером (фильтр ass в ffmpeg)
+    Стиль повторяет PIL-плашку: белый жирный текст на полупрозрачном чёрном фоне
+    """
+    center_x = frame_width // 2
+    center_y = frame_height - SUBTITLE_BOTTOM_OFFSET + SUBTITLE_BOX_HEIGHT // 2
+    
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {frame_width}",
+        f"PlayResY: {frame_height}",
+        "WrapStyle: 2",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        # BorderStyle 3 — непрозрачная плашка, Outline задаёт её отступ; альфа 0x37 ≈ 200/255 непрозрачности
+        "Style: Default,DejaVu Sans,24,&H00FFFFFF,&H00FFFFFF,&H37000000,&H37000000,"
+        "-1,0,0,0,100,100,0,0,3,15,0,5,0,0,0,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for start, end, text in cues:
+        # Фигурные скобки и обратный слэш — управляющие символы ASS
+        safe_text = text.replace("\\", "").replace("{", "(").replace("}", ")")
+        lines.append(
+            f"Dialogue: 0,{_ass_time(start)},{_ass_time(end)},Default,,0,0,0,,"
+            f"{{\\pos({center_x},{center_y})}}{safe_text}"
+        )
+    
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
@@ -0,0 +1,91 @@
+from typing import Any, Dict, List, Optional
+
+from .subtitles import SubtitleCue
+
+
+MAX_DURATION = 60.0  # Shorts: не длиннее 60 секунд
+
+
+def plan_timeline(
+    source_durations: List[float],
+    target_durations: Optional[List[Optional[float]]],
+    narration_duration: float,
+    fps: Optional[int] = None,
+    fit_tolerance: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Единая временная карта финального видео
+
+    Скорость каждого фрагмента складывается из трёх множителей и применяется один раз:
+    target — подгонка фрагмента под его target_duration,
+    fit — подгонка всей склейки под длительность озвучки,
+    cap — ограничение 60 секунд (ускоряет и видео, и звук).
+    Времена фрагментов — на выходной шкале (после ограничения 60 секунд).
+
+    Args:
+        fps: если задан, для каждого фрагмента считаются границы в кадрах
+            (от накопленной длительности, чтобы округление не копилось)
+        fit_tolerance: расхождение с озвучкой, при котором подгонка скорости не делается
+
+    Raises:
+        ValueError: длительность озвучки или видео не положительна (нечитаемый или пустой файл)
+    """
+    if narration_duration <= 0:
+        raise ValueError(f"Narration duration must be positive, got {narration_duration}")
+
+    target_speeds = []
+    for idx, duration in enumerate(source_durations):
+        target = target_durations[idx] if target_durations and idx < len(target_durations) else None
+        target_speeds.append(duration / target if target else 1.0)
+
+    video_duration = sum(duration / speed for duration, speed in zip(source_durations, target_speeds))
+    if video_duration <= 0:
+        raise ValueError(f"Video duration must be positive, got {video_duration}")
+    fit = video_duration / narration_duration
+    if abs(fit - 1.0) <= fit_tolerance:
+        fit = 1.0
+
+    cap = narration_duration / MAX_DURATION if narration_duration > MAX_DURATION else 1.0
+
+    fragments = []
+    elapsed = 0.0
+    frame_cursor = 0
+    for idx, (duration, target_speed) in enumerate(zip(source_durations, target_speeds)):
+        speed = target_speed * fit * cap
+        start = elapsed
+        elapsed += duration / speed
+        entry = {
+            "index": idx,
+            "source_duration": duration,
+            "target_duration": target_durations[idx] if target_durations and idx < len(target_durations) else None,
+            "target_speed": target_speed,
+            "speed": speed,
+            "start": start,
+            "end": elapsed,
+            "duration": elapsed - start,
+        }
+        if fps:
+            end_frame = int(round(elapsed * fps))
+            entry["start_frame"] = frame_cursor
+            entry["frames"] = end_frame - frame_cursor
+            frame_cursor = end_frame
+        fragments.append(entry)
+
+    return {
+        "narration_duration": narration_duration,
+        "video_duration": video_duration,
+        "fit": fit,
+        "cap": cap,
+        "final_duration": narration_duration / cap,
+        "fps": fps,
+        "fragments": fragments,
+    }
+
+
+def retime_cues(cues: List[SubtitleCue], cap: float) -> List[SubtitleCue]:
+    """
+    Переводит тайминги субтитров со шкалы озвучки на выходную (с учётом ограничения 60 секунд)
+    """
+    if cap == 1.0:
+        return list(cues)
+    return [(start / cap, end / cap, text) for start, end, text in cues]
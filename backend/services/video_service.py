@@ -1,16 +1,35 @@
-from moviepy.editor import VideoFileClip, AudioFileClip, concatenate_videoclips, CompositeAudioClip, TextClip, CompositeVideoClip
+import asyncio
+from moviepy.editor import VideoFileClip, AudioFileClip, concatenate_videoclips, TextClip, CompositeVideoClip
 from moviepy.video.fx.all import speedx
-from moviepy.audio.fx.all import volumex
 from pathlib import Path
 from config import settings
 from typing import List, Tuple, Optional, Dict
 import json
+import time
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from .audio_mixer import mix_narration, fragment_tracks_for
+from .ffmpeg_renderer import FFmpegRenderer
+from .streaming_renderer import StreamingRenderer
+from .subtitles import build_subtitle_cues, SubtitleTrack
+from .render_profiles import get_encoder_profile, scaled_size
+from .render_metrics import MemorySampler, render_features
+from .timeline import plan_timeline, retime_cues
+from .media_probe import aprobe_media
 
 
 class VideoService:
     
+    def __init__(self):
+        self.ffmpeg_renderer = FFmpegRenderer()
+        self.streaming_renderer = StreamingRenderer()
+    
+    @staticmethod
+    def _output_path(parable_id, render_mode: str = "final") -> Path:
+        output_dir = settings.output_dir / "final"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        # Превью пишется в отдельный файл, чтобы не затирать готовое финальное видео
+        return output_dir / f"parable_{parable_id}_{render_mode}.mp4"
+    
     async def create_final_video(
         self,
         video_paths: List[str],
@@ -19,8 +38,9 @@ class VideoService:
         parable_id: int,
         music_path: Optional[str] = None,
         music_volume_db: float = -18.0,
-        target_durations: Optional[List[Optional[float]]] = None
-    ) -> Tuple[str, float]:
+        target_durations: Optional[List[Optional[float]]] = None,
+        render_mode: str = "final"
+    ) -> Tuple[str, float, Dict]:
         """
         Создаёт финальное видео с синхронизацией аудио и музыкой
         
@@ -32,259 +52,154 @@ class VideoService:
             music_path: Путь к музыкальному треку (опционально)
             music_volume_db: Громкость музыки в dB относительно голоса (по умолчанию -18dB)
             target_durations: Список целевых длительностей для каждого видео (None = без изменений)
-        """
-        # Загружаем все видеофрагменты
-        video_clips = [VideoFileClip(path) for path in video_paths]
-        
-        # Снижаем звук из всех видео до 3% (0.03)
-        video_clips = [clip.fx(volumex, 0.03) if clip.audio else clip for clip in video_clips]
+            render_mode: preview (быстрый черновой) или final (см. render_profiles)
         
-        # Применяем целевые длительности для каждого видео
-        if target_durations:
-            for idx, (clip, target_duration) in enumerate(zip(video_clips, target_durations)):
-                if target_duration is not None and clip.duration > target_duration:
-                    speed_factor = clip.duration / target_duration
-                    video_clips[idx] = clip.fx(speedx, speed_factor)
-                    print(f"[Video Service] Video {idx} accelerated: {clip.duration:.2f}s -> {target_duration:.2f}s")
-                elif target_duration is not None and clip.duration < target_duration:
-                    # Замедляем если нужно увеличить длительность
-                    speed_factor = clip.duration / target_duration
-                    video_clips[idx] = clip.fx(speedx, speed_factor)
-                    print(f"[Video Service] Video {idx} slowed down: {clip.duration:.2f}s -> {target_duration:.2f}s")
+        Returns:
+            Путь к видео, его длительность и статистика рендера
+            (время, пиковая память, признаки для оценки стоимости, попадания в кеш сегментов)
+        """
+        started = time.monotonic()
+        with MemorySampler() as sampler:
+            final_path, duration, stats = await self._render_final_video(
+                video_paths, audio_path, text_for_subtitles, parable_id,
+                music_path, music_volume_db, target_durations, render_mode
+            )
+        stats["render_seconds"] = round(time.monotonic() - started, 2)
+        stats["peak_memory_mb"] = round(sampler.peak_mb) if sampler.peak_mb is not None else None
+        return final_path, duration, stats
+    
+    async def _render_final_video(
+        self, video_paths, audio_path, text_for_subtitles, parable_id,
+        music_path, music_volume_db, target_durations, render_mode
+    ) -> Tuple[str, float, Dict]:
+        profile = get_encoder_profile(render_mode)
+        print(f"[Video Service] Render mode: {render_mode} (preset {profile['preset']}, "
+              f"crf {profile['crf']}, bitrate {profile['bitrate']})")
+        
+        if settings.render_backend in ("ffmpeg", "streaming"):
+            renderer = self.ffmpeg_renderer if settings.render_backend == "ffmpeg" else self.streaming_renderer
+            output_path = self._output_path(parable_id, render_mode)
+            duration, stats = await renderer.render(
+                video_paths=video_paths,
+                audio_path=audio_path,
+                text_for_subtitles=text_for_subtitles,
+                output_path=output_path,
+                music_path=music_path,
+                music_volume_db=music_volume_db,
+                target_durations=target_durations,
+                profile=profile
+            )
+            return str(output_path), duration, stats
+        
+        # Временная карта: одна итоговая скорость на фрагмент (target_duration × озвучка × 60 секунд)
+        plan = await self.plan_final_video(video_paths, audio_path, target_durations, profile["fps"])
+        print(f"[Video Service] Timeline: narration {plan['narration_duration']:.2f}s, "
+              f"fit x{plan['fit']:.3f}, cap x{plan['cap']:.3f} -> {plan['final_duration']:.2f}s")
+        
+        # Загружаем все видеофрагменты (их звук сводит audio_mixer, декодер звука не нужен)
+        video_clips = [VideoFileClip(path, audio=False) for path in video_paths]
+        
+        # Каждый фрагмент перевременивается один раз, сразу в итоговую длительность
+        for idx, (clip, entry) in enumerate(zip(video_clips, plan["fragments"])):
+            if abs(entry["speed"] - 1.0) > 1e-6:
+                video_clips[idx] = clip.fx(speedx, final_duration=entry["duration"])
+            if entry["target_duration"]:
+                print(f"[Video Service] Video {idx}: {entry['source_duration']:.2f}s -> "
+                      f"{entry['target_duration']:.2f}s (x{entry['speed']:.3f} on final timeline)")
         
         # Объединяем видео
         combined_video = concatenate_videoclips(video_clips, method="compose")
         
-        # Загружаем аудио озвучки
-        voice_audio = AudioFileClip(audio_path)
-        audio_duration = voice_audio.duration
-        video_duration = combined_video.duration
-        
-        # Синхронизируем длительность видео и аудио
-        if video_duration > audio_duration:
-            # Видео длиннее — ускоряем
-            speed_factor = video_duration / audio_duration
-            combined_video = combined_video.fx(speedx, speed_factor)
-        elif video_duration < audio_duration:
-            # Видео короче — замедляем
-            speed_factor = video_duration / audio_duration
-            combined_video = combined_video.fx(speedx, speed_factor)
-        
-        # Извлекаем аудио из видеофрагментов (уже снижено до 3%)
-        video_audio = combined_video.audio if combined_video.audio else None
-        
-        # Создаём финальный аудио микс
-        audio_tracks = [voice_audio]  # Голос - основной трек
-        
-        # Добавляем звук из видеофрагментов (если есть)
-        if video_audio:
-            # Подгоняем длительность звука из видео под голос
-            if video_audio.duration != voice_audio.duration:
-                if video_audio.duration > voice_audio.duration:
-                    video_audio = video_audio.subclip(0, voice_audio.duration)
-                else:
-                    # Если короче, зацикливаем или растягиваем
-                    from moviepy.audio.AudioClip import concatenate_audioclips
-                    loops_needed = int(voice_audio.duration / video_audio.duration) + 1
-                    video_audio = concatenate_audioclips([video_audio] * loops_needed)
-                    video_audio = video_audio.subclip(0, voice_audio.duration)
-            audio_tracks.append(video_audio)
-            print(f"[Video Service] Video fragments audio added to mix (3% volume)")
-        
+        # Сводим звук (голос + звук фрагментов 3% + музыка) одним проходом NumPy в WAV,
+        # ограничение 60 секунд применяется к готовой дорожке (atempo, без изменения высоты голоса)
         if music_path and Path(music_path).exists():
             print(f"[Video Service] Adding background music: {music_path}")
-            
-            # Загружаем музыку
-            music_audio = AudioFileClip(music_path)
-            
-            # Подгоняем длительность музыки под видео
-            if music_audio.duration < voice_audio.duration:
-                # Если музыка короче, зацикливаем её
-                loops_needed = int(voice_audio.duration / music_audio.duration) + 1
-                from moviepy.audio.AudioClip import concatenate_audioclips
-                music_audio = concatenate_audioclips([music_audio] * loops_needed)
-            
-            # Обрезаем музыку до длительности голоса
-            music_audio = music_audio.subclip(0, voice_audio.duration)
-            
-            # Конвертируем dB в множитель громкости
-            # -18dB означает примерно 0.125 (12.5%) от оригинальной громкости
-            volume_multiplier = 10 ** (music_volume_db / 20)
-            music_audio = music_audio.fx(volumex, volume_multiplier)
-            
-            print(f"[Video Service] Music volume: {music_volume_db}dB (multiplier: {volume_multiplier:.3f})")
-            
-            # Добавляем музыку в микс
-            audio_tracks.append(music_audio)
-            
-            # Закрываем музыкальный клип
-            music_audio.close()
-        
-        # Микшируем все аудио треки
-        final_audio = CompositeAudioClip(audio_tracks)
+        output_path = self._output_path(parable_id, render_mode)
+        mix_path = output_path.with_suffix(".mix.wav")
+        fragment_tracks = await asyncio.to_thread(
+            fragment_tracks_for,
+            video_paths,
+            [entry["source_duration"] for entry in plan["fragments"]],
+            [entry["target_speed"] * plan["fit"] for entry in plan["fragments"]]
+        )
+        await asyncio.to_thread(
+            mix_narration, audio_path, mix_path, fragment_tracks, music_path, music_volume_db, plan["cap"]
+        )
+        final_audio = AudioFileClip(str(mix_path))
         
         # Добавляем финальный аудио к видео
-        final_video = combined_video.set_audio(final_audio)
+        final_video = combined_video.set_audio(final_audio).set_duration(plan["final_duration"])
         
         # Добавляем субтитры
         if text_for_subtitles:
             print(f"[Video Service] Adding subtitles...")
             try:
-                final_video = self._add_subtitles(final_video, text_for_subtitles, audio_path)
+                final_video = self._add_subtitles(final_video, text_for_subtitles, audio_path, plan)
             except Exception as e:
                 print(f"[Video Service] Warning: Could not add subtitles: {e}")
         
-        # Проверяем длительность
-        if final_video.duration > 60:
-            # Ускоряем до 60 секунд
-            speed_factor = final_video.duration / 60
-            final_video = final_video.fx(speedx, speed_factor)
-        
         # Сохраняем финальное видео
-        output_dir = settings.output_dir / "final"
-        output_dir.mkdir(parents=True, exist_ok=True)
-        output_path = output_dir / f"parable_{parable_id}_final.mp4"
+        # Превью рендерится в уменьшенном разрешении
+        new_size = scaled_size(final_video.w, final_video.h, profile["height"])
+        if new_size != (final_video.w, final_video.h):
+            final_video = final_video.resize(newsize=new_size)
         
         final_video.write_videofile(
             str(output_path),
-            codec='libx264',
+            codec=profile["codec"],
             audio_codec='aac',
-            fps=30,
-            preset='medium',
-            bitrate='8000k'
+            fps=profile["fps"],
+            preset=profile["preset"],
+            bitrate=profile["bitrate"],
+            threads=profile["threads"] or None,
+            ffmpeg_params=["-crf", str(profile["crf"])] if profile["crf"] is not None else None
         )
         
         # Закрываем все клипы
         for clip in video_clips:
             clip.close()
-        voice_audio.close()
-        if final_audio != voice_audio:
-            final_audio.close()
+        final_audio.close()
         final_video.close()
-        
-        return str(output_path), final_video.duration
+        mix_path.unlink(missing_ok=True)
+        
+        stats = {
+            "backend": "moviepy",
+            "mode": render_mode,
+            "cache": False,
+            **render_features(
+                int(round(plan["final_duration"] * profile["fps"])), new_size[0], new_size[1], len(video_paths)
+            ),
+        }
+        return str(output_path), final_video.duration, stats
     
-    def _add_subtitles(self, video, text: str, audio_path: str):
+    def _add_subtitles(self, video, text: str, audio_path: str, plan: Dict):
         """
         Добавляет субтитры к видео с умной разбивкой по словам
         Использует PIL вместо ImageMagick для избежания зависимостей
+        Все фразы идут одной дорожкой (SubtitleTrack), а не отдельным клипом на каждую
+        Тайминги строятся по озвучке и переводятся на итоговую шкалу (ограничение 60 секунд)
         """
-        import re
-        
-        # Очищаем текст от тегов эмоций [] и кавычек
-        clean_text = re.sub(r'\[.*?\]', '', text)  # Убираем [excited], [calm] и т.д.
-        clean_text = clean_text.replace('"', '').replace("'", '')  # Убираем кавычки
-        clean_text = clean_text.replace('\n', ' ')  # Убираем переносы строк
-        clean_text = re.sub(r'\s+', ' ', clean_text)  # Убираем лишние пробелы
-        
-        # Разбиваем текст на части с учётом хука
-        sentences = []
-        all_words = clean_text.split()
-        
-        # Первые ~15-20 слов - это обычно хук (быстрая речь)
-        hook_words_count = min(20, len(all_words) // 3)
-        hook_words = all_words[:hook_words_count]
-        main_words = all_words[hook_words_count:]
-        
-        # ДЛЯ ХУКА: по 1-2 слова (очень быстро)
-        for i in range(0, len(hook_words), 2):
-            part = ' '.join(hook_words[i:i+2])
-            if part:
-                sentences.append(('hook', part))
-        
-        # ДЛЯ ОСНОВНОГО ТЕКСТА: по 2-3 слова (нормально)
-        for i in range(0, len(main_words), 3):
-            part = ' '.join(main_words[i:i+3])
-            if part:
-                sentences.append(('main', part))
-        
-        # Рассчитываем время для каждого субтитра
-        total_duration = video.duration
-        
-        # Хук занимает примерно первые 15% времени (быстрее читается)
-        hook_duration = total_duration * 0.15
-        main_duration = total_duration * 0.85
-        
-        hook_count = sum(1 for t, _ in sentences if t == 'hook')
-        main_count = sum(1 for t, _ in sentences if t == 'main')
-        
-        subtitle_clips = []
-        current_time = 0
-        
-        for sent_type, sentence in sentences:
-            # Длительность зависит от типа (хук быстрее)
-            if sent_type == 'hook' and hook_count > 0:
-                duration = hook_duration / hook_count
-            elif main_count > 0:
-                duration = main_duration / main_count
-            else:
-                duration = 1.0
-            
-            # Создаём изображение с текстом
-            img = self._create_subtitle_image(sentence, video.w, 150)
-            
-            # Создаём клип из изображения
-            from moviepy.video.VideoClip import ImageClip
-            txt_clip = ImageClip(img).set_duration(duration).set_position(('center', video.h - 180)).set_start(current_time)
-            
-            subtitle_clips.append(txt_clip)
-            current_time += duration
-        
-        # Накладываем субтитры на видео
-        final_video = CompositeVideoClip([video] + subtitle_clips)
-        
-        return final_video
+        cues = build_subtitle_cues(text, plan["narration_duration"], audio_path)
+        track = SubtitleTrack(retime_cues(cues, plan["cap"]), video.w, video.h)
+        return video.fl(lambda get_frame, t: track.apply(get_frame(t), t))
     
-    def _create_subtitle_image(self, text: str, width: int, height: int) -> np.ndarray:
+    async def plan_final_video(
+        self,
+        video_paths: List[str],
+        audio_path: str,
+        target_durations: Optional[List[Optional[float]]] = None,
+        fps: Optional[int] = None
+    ) -> Dict:
         """
-        Создаёт изображение субтитра используя PIL
+        Временная карта финального видео без рендера (длительности берутся из ffprobe)
         """
-        
-        # Создаём изображение с прозрачным фоном
-        img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-        
-        # Пытаемся загрузить шрифт (маленький размер)
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-        except:
-            try:
-                font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 24)
-            except:
-                font = ImageFont.load_default()
-        
-        # Получаем размер текста
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        # Позиция текста (по центру)
-        x = (width - text_width) // 2
-        y = (height - text_height) // 2
-        
-        # Рисуем чёрный фон под текстом (для контраста, меньший padding)
-        padding = 15
-        draw.rectangle([x - padding, y - padding, x + text_width + padding, y + text_height + padding], 
-                      fill=(0, 0, 0, 200))
-        
-        # Рисуем белый текст с чёрной обводкой (тоньше обводка)
-        # Обводка
-        for adj_x in [-1, 0, 1]:
-            for adj_y in [-1, 0, 1]:
-                if adj_x != 0 or adj_y != 0:
-                    draw.text((x + adj_x, y + adj_y), text, font=font, fill=(0, 0, 0, 255))
-        # Основной текст
-        draw.text((x, y), text, font=font, fill=(255, 255, 255, 255))
-        
-        # Конвертируем в numpy array
-        return np.array(img)
+        probes = await asyncio.gather(*(aprobe_media(path) for path in video_paths))
+        narration = await aprobe_media(audio_path)
+        return plan_timeline([info["duration"] for info in probes], target_durations, narration["duration"], fps)
     
     async def get_video_duration(self, video_path: str) -> float:
         """
-        Получает длительность видео
+        Получает длительность видео (ffprobe, без открытия декодера)
         """
-        clip = VideoFileClip(video_path)
-        duration = clip.duration
-        clip.close()
-        return duration
+        return (await aprobe_media(video_path))["duration"]
 
@@ -0,0 +1,186 @@
+import asyncio
+import base64
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Тесты запускаются из backend/: python -m pytest
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# main создаёт сервисы при импорте — ключи нужны только для конструкторов, запросы не выполняются
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test")
+
+from config import settings  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def database():
+    """
+    PostgreSQL из DATABASE_URL; без доступной БД тесты пропускаются
+    """
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    import database as db_module
+
+    try:
+        with db_module.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except OperationalError as e:
+        pytest.skip(f"PostgreSQL is not available: {e}")
+    return db_module
+
+
+@pytest.fixture
+def main_module(database):
+    import main
+    return main
+
+
+# Ответ модели на любой текстовый запрос: в нём есть поля всех методов GeminiService
+FAKE_TEXT_RESPONSE = json.dumps({
+    "youtube_title": "Title",
+    "youtube_description": "Description",
+    "youtube_hashtags": "#test",
+    "image_prompts": ["scene one", "scene two"],
+    "video_prompts": ["video one", "video two"],
+    "image_prompt": "hook image",
+    "video_prompt": "hook video",
+    "variants": [{"type": "question", "text": "Variant"}],
+})
+FAKE_IMAGE = base64.b64encode(b"\x89PNG\r\n\x1a\n" + bytes(256))
+
+
+class FakeGeminiClient:
+    """
+    Подмена genai.Client с задержкой «сети»: client.models блокирует поток (как синхронный SDK),
+    client.aio.models ждёт через asyncio
+
+    calls — тексты запросов по порядку; fail(prompt) -> True имитирует сбой запроса.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = []
+        self.fail = lambda prompt: False
+        self.models = SimpleNamespace(
+            generate_content=self._generate_content,
+            generate_content_stream=self._generate_content_stream,
+        )
+        self.aio = SimpleNamespace(models=SimpleNamespace(
+            generate_content=self._agenerate_content,
+            generate_content_stream=self._agenerate_content_stream,
+        ))
+
+    def _request(self, contents) -> str:
+        prompt = contents[0].parts[0].text
+        self.calls.append(prompt)
+        if self.fail(prompt):
+            raise RuntimeError("503 UNAVAILABLE")
+        return prompt
+
+    @staticmethod
+    def _response(part):
+        from google.genai import types
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))]
+        )
+
+    def _text(self):
+        from google.genai import types
+        return self._response(types.Part(text=FAKE_TEXT_RESPONSE))
+
+    def _image(self):
+        from google.genai import types
+        return self._response(types.Part(inline_data=types.Blob(mime_type="image/png", data=FAKE_IMAGE)))
+
+    def _generate_content(self, model, contents, config=None):
+        time.sleep(self.latency)
+        self._request(contents)
+        return self._text()
+
+    def _generate_content_stream(self, model, contents, config=None):
+        time.sleep(self.latency)
+        self._request(contents)
+        return iter([self._image()])
+
+    async def _agenerate_content(self, model, contents, config=None):
+        await asyncio.sleep(self.latency)
+        self._request(contents)
+        return self._text()
+
+    async def _agenerate_content_stream(self, model, contents, config=None):
+        await asyncio.sleep(self.latency)
+        self._request(contents)
+
+        async def chunks():
+            yield self._image()
+        return chunks()
+
+
+@pytest.fixture
+def fake_gemini(main_module, monkeypatch, tmp_path):
+    """
+    GeminiService приложения без сети: запросы идут в FakeGeminiClient, кеш LLM выключен,
+    изображения пишутся во временный каталог
+    """
+    client = FakeGeminiClient(latency=0.2)
+    monkeypatch.setattr(main_module.gemini_service, "client", client)
+    monkeypatch.setattr(main_module.gemini_service, "aio_client", client.aio)
+    monkeypatch.setattr(settings, "llm_cache_enabled", False)
+    monkeypatch.setattr(settings, "upload_dir", tmp_path / "uploads")
+    return client
+
+
+@pytest.fixture
+def make_parables(database):
+    """
+    Фабрика притч в статусе processing; созданные притчи удаляются после теста
+    """
+    from models import Parable, TitleVariant
+
+    created = []
+
+    def make(count: int, **fields):
+        db = database.SessionLocal()
+        try:
+            parables = [
+                Parable(title_original=f"Test {i}", text_original="Text", status="processing", **fields)
+                for i in range(count)
+            ]
+            db.add_all(parables)
+            db.commit()
+            ids = [parable.id for parable in parables]
+        finally:
+            db.close()
+        created.extend(ids)
+        return ids
+
+    yield make
+
+    db = database.SessionLocal()
+    try:
+        db.query(TitleVariant).filter(TitleVariant.parable_id.in_(created)).delete()
+        for parable in db.query(Parable).filter(Parable.id.in_(created)).all():
+            db.delete(parable)
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="session")
+def ffmpeg():
+    """
+    ffmpeg и ffprobe из настроек; без них тесты рендера пропускаются
+    """
+    binary = shutil.which(settings.ffmpeg_binary)
+    if not binary or not shutil.which(settings.ffprobe_binary):
+        pytest.skip("ffmpeg/ffprobe is not available")
+    return binary
+
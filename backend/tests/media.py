@@ -0,0 +1,62 @@
+"""
+Тестовые медиафайлы и запуск кода бэкенда в отдельном процессе (бенчмарки рендера)
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from config import settings
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def lavfi(ffmpeg, source, output, *args):
+    subprocess.run(
+        [ffmpeg, "-hide_banner", "-nostdin", "-y", "-v", "error", "-f", "lavfi", "-i", source, *args, str(output)],
+        check=True
+    )
+    return str(output)
+
+
+def make_video(ffmpeg, path, seconds, size=(360, 640), fps=30, source="testsrc2"):
+    """
+    Видеофрагмент без звука: тестовая таблица в H.264
+    """
+    return lavfi(ffmpeg, f"{source}=size={size[0]}x{size[1]}:rate={fps}", path,
+                 "-t", str(seconds), "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p")
+
+
+def make_narration(ffmpeg, path, seconds, word_seconds=0.3, pause_seconds=0.1):
+    """
+    «Озвучка»: тон словами по word_seconds с паузами тишины между ними
+    """
+    period = word_seconds + pause_seconds
+    expr = f"0.5*sin(2*PI*220*t)*lt(mod(t\\,{period})\\,{word_seconds})"
+    return lavfi(ffmpeg, f"aevalsrc='{expr}':s=44100", path, "-t", str(seconds))
+
+
+def run_backend_script(script, args, tmp_path, timeout=600, **env):
+    """
+    Выполняет script отдельным процессом Python в backend/ и возвращает JSON из последней строки вывода
+
+    Отдельный процесс нужен для замеров памяти (ru_maxrss — пик за всю жизнь процесса) и
+    для настроек из окружения (RENDER_BACKEND и т. п.). Кеш и результаты — во временном каталоге.
+    """
+    full_env = {
+        **os.environ,
+        "CACHE_DIR": str(tmp_path / "cache"),
+        "OUTPUT_DIR": str(tmp_path / "outputs"),
+        "UPLOAD_DIR": str(tmp_path / "uploads"),
+        "FFMPEG_BINARY": settings.ffmpeg_binary,
+        "FFPROBE_BINARY": settings.ffprobe_binary,
+        **{name.upper(): str(value) for name, value in env.items()},
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script, json.dumps(args)],
+        cwd=BACKEND_DIR, env=full_env, capture_output=True, text=True, timeout=timeout
+    )
+    assert result.returncode == 0, result.stderr[-4000:]
+    return json.loads(result.stdout.strip().splitlines()[-1])
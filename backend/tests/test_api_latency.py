@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import httpx
+
+from models import Parable
+
+
+PIPELINES = 10
+LLM_LATENCY = 0.5
+REQUEST_INTERVAL = 0.02
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def test_list_latency_while_pipelines_run(database, main_module, fake_gemini, make_parables):
+    """
+    Нагрузочный тест: GET /parables, пока идут PIPELINES пайплайнов
+
+    Вызовы LLM длятся LLM_LATENCY секунд; синхронный вызов SDK в event loop
+    задержал бы каждый запрос списка на это время, поэтому p99 должен быть заметно меньше.
+    """
+    fake_gemini.latency = LLM_LATENCY
+    parable_ids = make_parables(PIPELINES)
+
+    async def run():
+        latencies = []
+        transport = httpx.ASGITransport(app=main_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Прогрев: первое соединение пула и первый запрос не относятся к нагрузке от пайплайнов
+            assert (await client.get("/parables", params={"limit": 20})).status_code == 200
+            pipelines = asyncio.gather(*(main_module.process_parable_pipeline(pid) for pid in parable_ids))
+            while not pipelines.done():
+                started = time.perf_counter()
+                response = await client.get("/parables", params={"limit": 20})
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200
+                await asyncio.sleep(REQUEST_INTERVAL)
+            await pipelines
+        return latencies
+
+    latencies = asyncio.run(run())
+
+    p50, p99 = percentile(latencies, 0.5), percentile(latencies, 0.99)
+    print(f"\nGET /parables during {PIPELINES} pipelines: {len(latencies)} requests, "
+          f"p50 {p50 * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms")
+
+    db = database.SessionLocal()
+    try:
+        statuses = {p.status for p in db.query(Parable).filter(Parable.id.in_(parable_ids)).all()}
+    finally:
+        db.close()
+    assert statuses == {"awaiting_audio"}
+    assert len(latencies) > 20
+    assert p99 < LLM_LATENCY / 2
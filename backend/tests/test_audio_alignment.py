@@ -0,0 +1,38 @@
+import time
+
+from services.audio_alignment import align_words
+from .media import make_narration
+
+
+DURATION = 60
+WORD_SECONDS = 0.3
+PAUSE_SECONDS = 0.1
+
+
+def test_alignment_of_60_second_narration_is_fast_and_follows_speech(ffmpeg, tmp_path):
+    """
+    Бенчмарк выравнивания: 60 секунд озвучки (150 «слов» с паузами) быстрее секунды,
+    начала слов совпадают с началами всплесков речи; повтор берётся из кеша рядом с файлом
+    """
+    period = WORD_SECONDS + PAUSE_SECONDS
+    words = [f"w{index:03d}" for index in range(int(DURATION / period))]
+    audio_path = make_narration(
+        ffmpeg, tmp_path / "narration.mp3", DURATION, word_seconds=WORD_SECONDS, pause_seconds=PAUSE_SECONDS
+    )
+
+    started = time.perf_counter()
+    timings = align_words(audio_path, words)
+    cold = time.perf_counter() - started
+
+    started = time.perf_counter()
+    assert align_words(audio_path, words) == timings
+    cached = time.perf_counter() - started
+
+    drift = max(abs(start - index * period) for index, (start, _, _) in enumerate(timings))
+    print(f"\nAlignment of {DURATION} s, {len(words)} words: {cold * 1000:.0f} ms, "
+          f"cached {cached * 1000:.1f} ms, max start drift {drift * 1000:.0f} ms")
+    assert cold < 1.0
+    assert cached < cold
+    # MP3 размывает границы всплесков: слово может начаться в предыдущей паузе, но не в соседнем слове
+    assert drift <= PAUSE_SECONDS + 0.02
+    assert (tmp_path / "narration.words.json").exists()
@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+
+from services.audio_mixer import FRAGMENT_AUDIO_VOLUME, decode_audio, mix_narration
+from .media import lavfi, make_narration
+
+
+DURATION = 60
+FRAGMENT_SECONDS = 20
+MUSIC_SECONDS = 25
+MUSIC_VOLUME_DB = -18.0
+
+
+def moviepy_mix(voice_path, fragment_paths, music_path, output_path):
+    """
+    Прежнее сведение через moviepy (до audio_mixer): volumex, concatenate_audioclips + subclip
+    для зацикливания музыки и CompositeAudioClip, вычисляемый по кускам при записи
+    """
+    from moviepy.editor import AudioFileClip, CompositeAudioClip
+    from moviepy.audio.AudioClip import concatenate_audioclips
+    from moviepy.audio.fx.all import volumex
+
+    voice = AudioFileClip(voice_path)
+    fragments = concatenate_audioclips([
+        AudioFileClip(path).fx(volumex, FRAGMENT_AUDIO_VOLUME) for path in fragment_paths
+    ]).subclip(0, voice.duration)
+    music = AudioFileClip(music_path)
+    loops = int(voice.duration / music.duration) + 1
+    music = concatenate_audioclips([music] * loops).subclip(0, voice.duration)
+    music = music.fx(volumex, 10 ** (MUSIC_VOLUME_DB / 20))
+    CompositeAudioClip([voice, fragments, music]).write_audiofile(
+        str(output_path), fps=44100, codec="pcm_s16le", logger=None
+    )
+    voice.close()
+
+
+def test_numpy_mixer_is_faster_than_moviepy_on_60_second_mix(ffmpeg, tmp_path):
+    """
+    Бенчмарк сведения 60 секунд: голос, звук трёх фрагментов (3%) и зацикленная музыка
+    """
+    voice_path = make_narration(ffmpeg, tmp_path / "narration.wav", DURATION)
+    fragment_paths = [
+        lavfi(ffmpeg, f"sine=frequency={300 + index * 100}:sample_rate=44100", tmp_path / f"scene_{index}.wav",
+              "-t", str(FRAGMENT_SECONDS))
+        for index in range(DURATION // FRAGMENT_SECONDS)
+    ]
+    music_path = lavfi(ffmpeg, "sine=frequency=110:sample_rate=44100", tmp_path / "music.wav",
+                       "-t", str(MUSIC_SECONDS), "-ac", "2")
+
+    started = time.perf_counter()
+    moviepy_mix(voice_path, fragment_paths, music_path, tmp_path / "moviepy.wav")
+    moviepy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = mix_narration(
+        voice_path, tmp_path / "numpy.wav",
+        [(path, FRAGMENT_SECONDS, 1.0) for path in fragment_paths],
+        music_path, MUSIC_VOLUME_DB
+    )
+    numpy_seconds = time.perf_counter() - started
+
+    print(f"\n{DURATION} s mix: moviepy {moviepy_seconds:.2f} s, NumPy {numpy_seconds:.2f} s")
+    assert abs(result["duration"] - DURATION) < 0.1
+    assert result["fragment_audio"] and result["music"]
+
+    # Тот же микс до первой склейки фрагментов; дальше moviepy сдвигает фазу на стыках клипов
+    old, new = decode_audio(str(tmp_path / "moviepy.wav")), decode_audio(str(tmp_path / "numpy.wav"))
+    head = FRAGMENT_SECONDS * 44100 // 2
+    assert np.corrcoef(old[:head, 0], new[:head, 0])[0, 1] > 0.99
+    assert numpy_seconds < moviepy_seconds
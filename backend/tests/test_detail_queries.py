@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from models import (
+    Parable, ImagePrompt, GeneratedImage, AudioFile, VideoFragment,
+    EnglishParable, EnglishImagePrompt, EnglishGeneratedImage, EnglishAudioFile, EnglishVideoFragment
+)
+from schemas import ParableDetailResponse, EnglishParableDetailResponse
+
+
+# 1 запрос сущности + 4 selectinload-коллекции
+DETAIL_QUERIES = 5
+
+
+def create_parable(db, scenes: int) -> Parable:
+    parable = Parable(title_original="Test", text_original="Text", status="draft")
+    english = EnglishParable(parable=parable, status="draft")
+    rows = [
+        parable, english,
+        AudioFile(parable=parable, audio_path="voice.mp3"),
+        EnglishAudioFile(english_parable=english, audio_path="voice.mp3"),
+    ]
+    for order in range(scenes):
+        prompt = ImagePrompt(parable=parable, prompt_text="p", video_prompt_text="v", scene_order=order)
+        image = GeneratedImage(parable=parable, prompt=prompt, image_path=f"{order}.png", scene_order=order)
+        english_prompt = EnglishImagePrompt(
+            english_parable=english, prompt_text="p", video_prompt_text="v", scene_order=order
+        )
+        english_image = EnglishGeneratedImage(
+            english_parable=english, prompt=english_prompt, image_path=f"{order}.png", scene_order=order
+        )
+        rows += [
+            prompt, image,
+            VideoFragment(parable=parable, image=image, video_path=f"{order}.mp4", scene_order=order),
+            english_prompt, english_image,
+            EnglishVideoFragment(english_parable=english, image=english_image, video_path=f"{order}.mp4", scene_order=order),
+        ]
+    db.add_all(rows)
+    db.commit()
+    return parable
+
+
+@pytest.fixture
+def parables(database):
+    """
+    Две притчи с разным числом сцен; удаляются после теста
+    """
+    db = database.SessionLocal()
+    created = [create_parable(db, 2), create_parable(db, 12)]
+    ids = [parable.id for parable in created]
+    db.close()
+    yield ids
+
+    db = database.SessionLocal()
+    for parable in db.query(Parable).filter(Parable.id.in_(ids)).all():
+        db.delete(parable)
+    db.commit()
+    db.close()
+
+
+def count_queries(database, endpoint, response_model):
+    """
+    SQL-запросы сессии: (в эндпоинте, при сериализации ответа)
+
+    Коллекции должны загружаться в эндпоинте; ленивая подгрузка при сериализации —
+    это запросы, число которых растёт с вложенностью схемы ответа
+    """
+    db = database.SessionLocal()
+    statements = []
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    try:
+        result = asyncio.run(endpoint(db))
+        in_endpoint = len(statements)
+        response_model.model_validate(result)
+    finally:
+        db.close()
+    return in_endpoint, len(statements) - in_endpoint
+
+
+def test_get_parable_runs_fixed_number_of_queries(database, main_module, parables):
+    for parable_id in parables:
+        counts = count_queries(
+            database, lambda db: main_module.get_parable(parable_id, db), ParableDetailResponse
+        )
+        assert counts == (DETAIL_QUERIES, 0)
+
+
+def test_get_english_version_runs_fixed_number_of_queries(database, main_module, parables):
+    for parable_id in parables:
+        counts = count_queries(
+            database, lambda db: main_module.get_english_version(parable_id, db), EnglishParableDetailResponse
+        )
+        assert counts == (DETAIL_QUERIES, 0)
@@ -0,0 +1,102 @@
+import asyncio
+import subprocess
+
+import pytest
+
+from config import settings
+from services import ffmpeg_renderer
+from services.ffmpeg_renderer import FFmpegRenderer
+from services.render_cache import RenderCache
+from services.render_profiles import get_encoder_profile
+from .media import lavfi, make_video
+
+
+FRAGMENTS = 3
+FRAGMENT_SECONDS = 4
+# Речь только в первые 3 секунды: субтитры попадают лишь на первый фрагмент
+SPEECH = "aevalsrc='0.5*sin(2*PI*220*t)*lt(mod(t\\,0.4)\\,0.3)*lt(t\\,3)':s=44100"
+SUBTITLES = "раз два три четыре пять шесть семь восемь"
+
+
+@pytest.fixture
+def renderer_cache(tmp_path, monkeypatch):
+    cache = RenderCache(tmp_path / "cache", 1024 * 1024 * 1024)
+    monkeypatch.setattr(ffmpeg_renderer, "render_cache", cache)
+    monkeypatch.setattr(settings, "render_cache_enabled", True)
+    return cache
+
+
+def frame_hashes(ffmpeg, path):
+    """
+    MD5 каждого декодированного кадра: после перекодирования кадры не совпали бы с исходником бит в бит
+    """
+    result = subprocess.run(
+        [ffmpeg, "-v", "error", "-i", str(path), "-map", "0:v:0", "-f", "framemd5", "-"],
+        capture_output=True, text=True, check=True
+    )
+    return [line.rsplit(",", 1)[1].strip() for line in result.stdout.splitlines() if not line.startswith("#")]
+
+
+def subtitle_codecs(path):
+    result = subprocess.run(
+        [settings.ffprobe_binary, "-v", "error", "-select_streams", "s",
+         "-show_entries", "stream=codec_name", "-of", "csv=p=0", str(path)],
+        capture_output=True, text=True, check=True
+    )
+    return result.stdout.split()
+
+
+def render(fragments, audio_path, output_path):
+    return asyncio.run(FFmpegRenderer().render(
+        video_paths=fragments,
+        audio_path=audio_path,
+        text_for_subtitles=SUBTITLES,
+        output_path=output_path,
+        profile=get_encoder_profile("final")
+    ))
+
+
+@pytest.fixture
+def inputs(ffmpeg, tmp_path):
+    # Фрагменты в формате энкодера (H.264 yuv420p 30 fps), озвучка ровно по длине видео — подгонки нет
+    fragments = [
+        make_video(ffmpeg, tmp_path / f"scene_{index}.mp4", FRAGMENT_SECONDS, source=source)
+        for index, source in enumerate(["testsrc2", "mandelbrot", "rgbtestsrc"])
+    ]
+    audio_path = lavfi(ffmpeg, SPEECH, tmp_path / "narration.wav", "-t", str(FRAGMENTS * FRAGMENT_SECONDS))
+    return fragments, audio_path
+
+
+def test_fragments_without_subtitles_are_stream_copied(ffmpeg, tmp_path, inputs, renderer_cache):
+    fragments, audio_path = inputs
+    output_path = tmp_path / "final.mp4"
+
+    duration, stats = render(fragments, audio_path, output_path)
+
+    assert duration == FRAGMENTS * FRAGMENT_SECONDS
+    # Субтитры прожжены только в первый сегмент, два других скопированы
+    assert (stats["segments"], stats["segment_copies"]) == (FRAGMENTS, FRAGMENTS - 1)
+    output = frame_hashes(ffmpeg, output_path)
+    frames = FRAGMENT_SECONDS * 30
+    assert len(output) == FRAGMENTS * frames
+    assert output[:frames] != frame_hashes(ffmpeg, fragments[0])
+    assert output[frames:] == frame_hashes(ffmpeg, fragments[1]) + frame_hashes(ffmpeg, fragments[2])
+
+
+def test_subtitle_track_lets_every_fragment_be_copied(ffmpeg, tmp_path, inputs, renderer_cache, monkeypatch):
+    monkeypatch.setattr(settings, "subtitle_burn_in", False)
+    fragments, audio_path = inputs
+    # Звук только у одного фрагмента: concat-демуксер неприменим, рендер идёт через сегменты
+    voiced = tmp_path / "scene_voiced.mp4"
+    subprocess.run([
+        ffmpeg, "-v", "error", "-y", "-i", fragments[2], "-f", "lavfi", "-i", "sine=frequency=440",
+        "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac", "-shortest", str(voiced)
+    ], check=True)
+    fragments[2] = str(voiced)
+    output_path = tmp_path / "final.mp4"
+
+    _, stats = render(fragments, audio_path, output_path)
+
+    assert stats["segment_copies"] == FRAGMENTS
+    assert frame_hashes(ffmpeg, output_path) == sum((frame_hashes(ffmpeg, path) for path in fragments), [])
+    assert subtitle_codecs(output_path) == ["mov_text"]
@@ -0,0 +1,178 @@
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+import job_queue
+from config import settings
+from job_queue import claim_job, finish_job, enqueue_job
+from models import Job, Parable, VideoFragment, AudioFile
+
+
+WORKER = "test-worker"
+# worker_id — «машина:pid:суффикс», как у Worker
+SAME_HOST_WORKER = f"{WORKER}:2:b"
+OTHER_HOST_WORKER = "other-host:1:a"
+MIGRATIONS = Path(__file__).resolve().parents[2] / "database"
+
+
+@pytest.fixture
+def active_job_index(database):
+    """
+    Уникальный индекс активных задач из миграции: тестовая схема создана через create_all
+    """
+    sql = (MIGRATIONS / "migration_add_active_job_unique_index.sql").read_text()
+    # Комментарии не передаём: кодировка клиента тестовой БД может быть не UTF-8
+    statements = "\n".join(line for line in sql.splitlines() if not line.lstrip().startswith("--"))
+    with database.engine.begin() as connection:
+        connection.exec_driver_sql(statements)
+
+
+@pytest.fixture
+def render_job(database):
+    """
+    Выполняющаяся задача рендера первой попытки и притча, которая её ждёт
+    """
+    db = database.SessionLocal()
+    parable = Parable(title_original="Test", text_original="Text", status="generating_final")
+    db.add(parable)
+    db.flush()
+    job = Job(
+        job_type="generate_final", queue="render", target_id=parable.id,
+        status="running", attempts=1, max_attempts=3, worker_id=WORKER
+    )
+    db.add(job)
+    db.commit()
+    ids = (job.id, parable.id)
+    db.close()
+    yield ids
+
+    db = database.SessionLocal()
+    db.query(Job).filter(Job.id == ids[0]).delete()
+    db.delete(db.query(Parable).filter(Parable.id == ids[1]).first())
+    db.commit()
+    db.close()
+
+
+@pytest.fixture
+def queued_render_job(database, render_job):
+    """
+    Задача рендера в очереди, пока на машине WORKER уже идёт render_job
+    """
+    db = database.SessionLocal()
+    job = Job(job_type="generate_english_final", queue="render", target_id=render_job[1], status="queued")
+    db.add(job)
+    db.commit()
+    job_id = job.id
+    db.close()
+    yield job_id
+
+    db = database.SessionLocal()
+    db.query(Job).filter(Job.id == job_id).delete()
+    db.commit()
+    db.close()
+
+
+def load(database, job_id, parable_id):
+    db = database.SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        parable = db.query(Parable).filter(Parable.id == parable_id).first()
+        return job.status, parable.status
+    finally:
+        db.close()
+
+
+def test_limit_kill_fails_job_without_retry(database, render_job):
+    finish_job(render_job[0], WORKER, "Render timed out after 1800s", retry=False)
+
+    assert load(database, *render_job) == ("failed", "error")
+
+
+def test_render_error_is_retried_and_target_waits_again(database, render_job):
+    # Задача рендера отметила притчу ошибкой и упала
+    db = database.SessionLocal()
+    db.query(Parable).filter(Parable.id == render_job[1]).update({"status": "error"})
+    db.commit()
+    db.close()
+
+    finish_job(render_job[0], WORKER, "ffmpeg exited with code 1")
+
+    assert load(database, *render_job) == ("queued", "generating_final")
+
+
+def test_render_request_in_other_mode_conflicts_with_active_job(database, render_job):
+    import main
+
+    job_id, parable_id = render_job
+    db = database.SessionLocal()
+    db.add_all([
+        VideoFragment(parable_id=parable_id, video_path="0.mp4", scene_order=0),
+        AudioFile(parable_id=parable_id, audio_path="voice.mp3"),
+    ])
+    db.commit()
+    try:
+        # Идущая задача рендерит в режиме final
+        with pytest.raises(HTTPException) as error:
+            main.queue_final_render(db, parable_id, "preview")
+        assert error.value.status_code == 409
+
+        db.rollback()
+        assert main.queue_final_render(db, parable_id, "final").id == job_id
+        assert db.query(Parable).filter(Parable.id == parable_id).first().render_mode == "final"
+    finally:
+        db.close()
+
+
+def test_concurrent_enqueue_returns_job_of_the_winner(database, render_job, active_job_index, monkeypatch):
+    job_id, parable_id = render_job
+    # Гонка: проверка активной задачи прошла до того, как сосед закоммитил свою
+    real_active_job = job_queue.active_job
+    checks = []
+
+    def stale_active_job(db, job_type, target_id):
+        checks.append(target_id)
+        return None if len(checks) == 1 else real_active_job(db, job_type, target_id)
+
+    monkeypatch.setattr(job_queue, "active_job", stale_active_job)
+
+    db = database.SessionLocal()
+    try:
+        parable = db.query(Parable).filter(Parable.id == parable_id).first()
+        parable.render_mode = "final"
+        job = enqueue_job(db, "generate_final", parable_id, {"render_mode": "final"})
+
+        assert job.id == job_id
+        # Откатывается только вставка задачи, изменения вызывающего коммитятся
+        db.expire_all()
+        assert db.query(Parable).filter(Parable.id == parable_id).first().render_mode == "final"
+        assert db.query(Job).filter(
+            Job.job_type == "generate_final", Job.target_id == parable_id
+        ).count() == 1
+    finally:
+        db.close()
+
+
+def claim_render(database, worker_id):
+    db = database.SessionLocal()
+    try:
+        job = claim_job(db, "render", worker_id)
+        return job.id if job else None
+    finally:
+        db.close()
+
+
+def test_render_limit_counts_running_renders_per_host(database, queued_render_job, monkeypatch):
+    monkeypatch.setattr(settings, "render_host_concurrency", 1)
+    monkeypatch.setattr(settings, "render_cluster_concurrency", 0)
+
+    # Слот машины WORKER занят; рендер на другой машине ядра не отнимает
+    assert claim_render(database, SAME_HOST_WORKER) is None
+    assert claim_render(database, OTHER_HOST_WORKER) == queued_render_job
+
+
+def test_cluster_limit_counts_renders_of_all_hosts(database, queued_render_job, monkeypatch):
+    monkeypatch.setattr(settings, "render_host_concurrency", 1)
+    monkeypatch.setattr(settings, "render_cluster_concurrency", 1)
+
+    assert claim_render(database, OTHER_HOST_WORKER) is None
@@ -0,0 +1,58 @@
+from services.llm_cache import LLMCache
+
+
+def make_cache(path, **limits):
+    return LLMCache(
+        cache_dir=path,
+        ttl_seconds=limits.get("ttl_seconds", 0),
+        max_entries=limits.get("max_entries", 100),
+        max_bytes=limits.get("max_bytes", 1024 * 1024)
+    )
+
+
+def test_entries_written_by_another_process_are_hits(tmp_path):
+    # Два экземпляра на одном каталоге — как API и процесс воркера
+    worker_cache, api_cache = make_cache(tmp_path), make_cache(tmp_path)
+    worker_cache.set("k1", '{"text": "ok"}')
+
+    assert api_cache.get("k1") == '{"text": "ok"}'
+    assert api_cache.stats()["entries"] == 1
+
+
+def test_clear_and_stats_cover_all_processes(tmp_path):
+    worker_cache, api_cache = make_cache(tmp_path), make_cache(tmp_path)
+    worker_cache.set("k1", "1")
+    worker_cache.get("k1")
+    api_cache.get("missing")
+
+    stats = api_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    api_cache.clear()
+    assert worker_cache.get("k1") is None
+    assert api_cache.stats()["entries"] == 0
+
+
+def test_eviction_keeps_newest_entries(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_pipeline_bypass_does_not_leak_into_caller(main_module, fake_gemini, make_parables):
+    import asyncio
+    from services.llm_cache import llm_cache_bypass
+
+    fake_gemini.latency = 0
+    [parable_id] = make_parables(1)
+
+    async def run():
+        # Воркер выполняет задачи одну за другой в одном контексте
+        await main_module.process_parable_pipeline(parable_id, bypass_cache=True)
+        return llm_cache_bypass.get()
+
+    assert asyncio.run(run()) is False
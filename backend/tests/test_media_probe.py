@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from config import settings
+from services import media_probe
+from services.media_probe import probe_media
+
+
+@pytest.fixture
+def slow_ffprobe(tmp_path, monkeypatch):
+    """
+    ffprobe, который зависает дольше таймаута
+    """
+    binary = tmp_path / "ffprobe"
+    binary.write_text("#!/bin/sh\nsleep 10\n")
+    binary.chmod(0o755)
+    monkeypatch.setattr(settings, "ffprobe_binary", str(binary))
+    monkeypatch.setattr(media_probe, "PROBE_TIMEOUT_SECONDS", 0.5)
+
+
+def test_corrupt_file_raises_runtime_error(ffmpeg, tmp_path):
+    path = tmp_path / "voice.mp3"
+    path.write_bytes(b"not a media file" * 64)
+
+    with pytest.raises(RuntimeError, match="ffprobe failed"):
+        probe_media(str(path))
+
+
+def test_slow_probe_raises_runtime_error(slow_ffprobe, tmp_path):
+    with pytest.raises(RuntimeError, match="timed out"):
+        probe_media(str(tmp_path / "voice.mp3"))
+
+
+def test_missing_ffprobe_raises_runtime_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ffprobe_binary", str(tmp_path / "missing-ffprobe"))
+
+    with pytest.raises(RuntimeError, match="Could not run ffprobe"):
+        probe_media(str(tmp_path / "voice.mp3"))
+
+
+def test_upload_with_slow_probe_is_rejected_as_bad_request(main_module, slow_ffprobe, tmp_path):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main_module.probe_upload_duration(tmp_path / "voice.mp3"))
+    assert error.value.status_code == 400
@@ -0,0 +1,92 @@
+import asyncio
+import statistics
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+
+PARABLES = 100_000
+PAGE_SIZE = 20
+REPEATS = 15
+MIGRATION = Path(__file__).resolve().parents[2] / "database" / "migration_add_parables_keyset_index.sql"
+
+
+@pytest.fixture
+def bench_db(database):
+    """
+    Сессия внутри транзакции со 100k притч и индексами keyset-миграции; в конце всё откатывается
+    """
+    connection = database.engine.connect()
+    transaction = connection.begin()
+    sql = MIGRATION.read_text()
+    # Комментарии не передаём: кодировка клиента тестовой БД может быть не UTF-8
+    connection.exec_driver_sql("\n".join(line for line in sql.splitlines() if not line.startswith("--")))
+    connection.execute(text(
+        "INSERT INTO parables (title_original, text_original, status, current_step, created_at) "
+        "SELECT 'Bench ' || n, 'Text', 'draft', 0, TIMESTAMP '2020-01-01' + n * INTERVAL '1 second' "
+        "FROM generate_series(1, :count) AS n"
+    ), {"count": PARABLES})
+    connection.exec_driver_sql("ANALYZE parables")
+    session = sessionmaker(bind=connection, autoflush=False)()
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+    # Откаченная вставка оставляет 100k мёртвых строк: без VACUUM они замедляют следующие тесты
+    with database.engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM parables")
+
+
+def page_time(main_module, db, cursor):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        page = asyncio.run(main_module.get_parables(limit=PAGE_SIZE, cursor=cursor, status=None, db=db))
+        timings.append(time.perf_counter() - started)
+        db.expunge_all()
+    assert len(page.items) == PAGE_SIZE
+    return statistics.median(timings)
+
+
+def offset_time(db, offset):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        db.execute(text(
+            "SELECT id FROM parables ORDER BY created_at DESC, id DESC LIMIT :limit OFFSET :offset"
+        ), {"limit": PAGE_SIZE, "offset": offset}).all()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def test_keyset_page_cost_does_not_depend_on_depth(main_module, bench_db):
+    """
+    Бенчмарк GET /parables на 100k притч: страница в конце списка стоит столько же, сколько первая
+    """
+    # Курсоры на глубину ~50% и ~100% списка
+    rows = bench_db.execute(text(
+        "SELECT created_at, id FROM parables ORDER BY created_at DESC, id DESC "
+        "OFFSET :middle LIMIT 1"
+    ), {"middle": PARABLES // 2}).one(), bench_db.execute(text(
+        "SELECT created_at, id FROM parables ORDER BY created_at DESC, id DESC "
+        "OFFSET :last LIMIT 1"
+    ), {"last": PARABLES - PAGE_SIZE - 1}).one()
+    cursors = [None] + [
+        main_module._encode_cursor(SimpleNamespace(created_at=created_at, id=parable_id))
+        for created_at, parable_id in rows
+    ]
+
+    first, middle, last = (page_time(main_module, bench_db, cursor) for cursor in cursors)
+    deep_offset = offset_time(bench_db, PARABLES - PAGE_SIZE - 1)
+    print(f"\nGET /parables on {PARABLES} rows: first {first * 1000:.2f} ms, "
+          f"middle {middle * 1000:.2f} ms, last {last * 1000:.2f} ms; "
+          f"OFFSET to the last page {deep_offset * 1000:.2f} ms")
+
+    # Константа по глубине: допускаем шум, но не рост, как у OFFSET
+    assert middle < first * 2 + 0.002
+    assert last < first * 2 + 0.002
+    assert last < deep_offset
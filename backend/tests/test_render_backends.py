@@ -0,0 +1,42 @@
+from .media import make_narration, make_video, run_backend_script
+
+
+FRAGMENTS = 3
+FRAGMENT_SECONDS = 8
+SUBTITLES = " ".join(f"слово{index}" for index in range(60))
+
+# Полный рендер через VideoService.create_final_video: его статистика — время и пик памяти
+# процесса вместе с дочерними ffmpeg (MemorySampler)
+RENDER_SCRIPT = """
+import asyncio, json, sys
+from services.video_service import VideoService
+
+video_paths, audio_path, text = json.loads(sys.argv[1])
+path, duration, stats = asyncio.run(VideoService().create_final_video(video_paths, audio_path, text, "bench"))
+print(json.dumps({"duration": duration, **stats}))
+"""
+
+
+def test_ffmpeg_backend_is_faster_and_lighter_than_moviepy(ffmpeg, tmp_path):
+    """
+    Бенчмарк бэкендов рендера на одинаковом входе: время и пиковая память (RSS процесса и ffmpeg)
+    """
+    video_paths = [
+        make_video(ffmpeg, tmp_path / f"scene_{index}.mp4", FRAGMENT_SECONDS) for index in range(FRAGMENTS)
+    ]
+    audio_path = make_narration(ffmpeg, tmp_path / "narration.wav", FRAGMENTS * FRAGMENT_SECONDS)
+    args = [video_paths, audio_path, SUBTITLES]
+
+    results = {
+        backend: run_backend_script(RENDER_SCRIPT, args, tmp_path / backend, render_backend=backend)
+        for backend in ("moviepy", "ffmpeg")
+    }
+    for backend, stats in results.items():
+        print(f"\n{backend}: {stats['render_seconds']:.2f} s, peak {stats['peak_memory_mb']} MB, "
+              f"duration {stats['duration']:.2f} s")
+
+    moviepy, ffmpeg_stats = results["moviepy"], results["ffmpeg"]
+    # Одинаковая временная карта: итог совпадает по длительности
+    assert abs(moviepy["duration"] - ffmpeg_stats["duration"]) < 0.1
+    assert ffmpeg_stats["render_seconds"] < moviepy["render_seconds"]
+    assert ffmpeg_stats["peak_memory_mb"] < moviepy["peak_memory_mb"]
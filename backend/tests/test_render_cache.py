@@ -0,0 +1,117 @@
+import asyncio
+import os
+
+import numpy as np
+
+from config import settings
+from services import audio_mixer, ffmpeg_renderer
+from services.ffmpeg_renderer import FFmpegRenderer
+from services.media_probe import probe_media
+from services.render_cache import RenderCache
+from services.render_profiles import get_encoder_profile
+from .media import make_narration, make_video
+
+
+def put_entry(cache, key, data, mtime=None):
+    tmp_path = cache.tmp_path_for(key, ".mp4")
+    tmp_path.write_bytes(data)
+    path = cache.put(key, ".mp4", tmp_path)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_entries_and_stats_are_shared_between_processes(tmp_path):
+    # Два экземпляра на одном каталоге — как два процесса рендера
+    first, second = RenderCache(tmp_path, 1024), RenderCache(tmp_path, 1024)
+    put_entry(first, "a", b"x" * 10)
+
+    assert second.get("a", ".mp4") is not None
+    assert second.get("b", ".mp4") is None
+
+    stats = first.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["size_bytes"]) == (1, 1, 1, 10)
+
+    second.clear()
+    assert first.get("a", ".mp4") is None
+    assert first.stats()["entries"] == 0
+
+
+def test_eviction_follows_access_time_across_processes(tmp_path):
+    first, second = RenderCache(tmp_path, 25), RenderCache(tmp_path, 25)
+    put_entry(first, "a", b"x" * 10, mtime=1000)
+    put_entry(first, "b", b"x" * 10, mtime=2000)
+
+    # Попадание в другом процессе обновляет mtime: вытесняется b, а не a
+    second.get("a", ".mp4")
+    put_entry(second, "c", b"x" * 10)
+
+    assert first.get("a", ".mp4") is not None
+    assert first.get("b", ".mp4") is None
+    assert first.stats()["evictions"] == 1
+
+
+def test_pinned_entry_survives_eviction(tmp_path):
+    render, neighbour = RenderCache(tmp_path, 15), RenderCache(tmp_path, 15)
+    put_entry(neighbour, "a", b"a" * 10, mtime=1000)
+
+    with render.pinned() as pin_dir:
+        pinned = render.get("a", ".mp4", pin_dir)
+        put_entry(neighbour, "b", b"b" * 10)
+
+        assert not render.path_for("a", ".mp4").exists()
+        assert pinned.read_bytes() == b"a" * 10
+
+    assert not pinned.exists()
+
+
+def test_shared_pcm_stays_readable_after_eviction(tmp_path, monkeypatch):
+    cache, neighbour = RenderCache(tmp_path / "cache", 64), RenderCache(tmp_path / "cache", 64)
+    samples = np.arange(8, dtype=np.float32).reshape(-1, 2)
+    source = tmp_path / "music.mp3"
+    source.write_bytes(b"music")
+    monkeypatch.setattr(audio_mixer, "render_cache", cache)
+    monkeypatch.setattr(audio_mixer, "decode_audio", lambda path: samples)
+
+    shared = audio_mixer.decode_audio_shared(str(source))
+    # Соседний рендер вытесняет запись PCM, пока отображение ещё используется
+    put_entry(neighbour, "other", b"x" * 64)
+
+    assert neighbour.stats()["entries"] == 1
+    assert np.array_equal(shared, samples)
+    assert list((tmp_path / "cache" / ".pins").iterdir()) == []
+
+
+def test_changing_one_fragment_rebuilds_only_its_segment(ffmpeg, tmp_path, monkeypatch):
+    """
+    Замена среднего фрагмента на более длинный меняет общую подгонку под озвучку (fit),
+    но fit применяется при склейке — остальные сегменты берутся из кеша
+    """
+    monkeypatch.setattr(ffmpeg_renderer, "render_cache", RenderCache(tmp_path / "cache", 1024 ** 3))
+    monkeypatch.setattr(settings, "render_cache_enabled", True)
+    fragments = [
+        make_video(ffmpeg, tmp_path / f"scene_{index}.mp4", 4, source=source)
+        for index, source in enumerate(["testsrc2", "mandelbrot", "rgbtestsrc"])
+    ]
+    audio_path = make_narration(ffmpeg, tmp_path / "narration.wav", 10)
+
+    def render(output_name):
+        output_path = tmp_path / output_name
+        duration, stats = asyncio.run(FFmpegRenderer().render(
+            video_paths=fragments,
+            audio_path=audio_path,
+            text_for_subtitles="",
+            output_path=output_path,
+            target_durations=[3, None, 3],
+            profile=get_encoder_profile("preview")
+        ))
+        assert abs(probe_media(str(output_path))["duration"] - duration) < 0.1
+        return stats
+
+    first = render("first.mp4")
+    fragments[1] = make_video(ffmpeg, tmp_path / "scene_1_new.mp4", 5, source="mandelbrot")
+    second = render("second.mp4")
+
+    assert (first["segment_hits"], first["segment_misses"]) == (0, 3)
+    assert (second["segment_hits"], second["segment_misses"]) == (2, 1)
+    assert first["time_scale"] != second["time_scale"]
@@ -0,0 +1,54 @@
+from services.render_metrics import estimate_render, render_features
+
+
+def history_entry(frames: int, fragments: int) -> dict:
+    # Все фрагменты нормализованы к 1080x1920 — мегапиксели одинаковы во всей истории
+    features = render_features(frames, 1080, 1920, fragments)
+    return {
+        **features,
+        "render_seconds": 2.0 + 0.01 * frames * features["megapixels"] + 0.5 * fragments,
+        "peak_memory_mb": 300.0 + 40.0 * features["megapixels"] + 25.0 * fragments,
+    }
+
+
+def test_constant_megapixels_history_gives_fitted_model():
+    history = [history_entry(frames, fragments) for frames, fragments in
+               [(900, 3), (1200, 4), (1500, 6), (1800, 5), (600, 2), (1000, 8)]]
+
+    estimate = estimate_render(render_features(1350, 1080, 1920, 7), history, "ffmpeg")
+
+    assert estimate["time_model"] == "fitted"
+    assert estimate["memory_model"] == "fitted"
+    megapixels = 1080 * 1920 / 1_000_000
+    assert abs(estimate["render_seconds"] - (2.0 + 0.01 * 1350 * megapixels + 3.5)) < 0.2
+    assert abs(estimate["peak_memory_mb"] - (300.0 + 40.0 * megapixels + 175.0)) <= 1
+
+
+def test_too_little_history_uses_defaults():
+    history = [history_entry(900, 3), history_entry(1200, 4)]
+
+    estimate = estimate_render(render_features(1350, 1080, 1920, 7), history, "ffmpeg")
+
+    assert estimate["time_model"] == "default"
+    assert estimate["memory_model"] == "default"
+
+
+def test_cache_hit_renders_do_not_lower_cold_estimate():
+    cold = [history_entry(frames, fragments) for frames, fragments in
+            [(900, 3), (1200, 4), (1500, 6), (1800, 5), (600, 2), (1000, 8)]]
+    for entry in cold:
+        entry["segments_rendered"] = entry["fragments"]
+    # Повторные рендеры: почти все сегменты из кеша, время — доли полного
+    warm = []
+    for frames, fragments in [(900, 3), (1200, 4), (1500, 6), (1800, 5), (1000, 8)] * 3:
+        entry = history_entry(frames, fragments)
+        entry.update(segments_rendered=1, render_seconds=entry["render_seconds"] * 0.2,
+                     peak_memory_mb=entry["peak_memory_mb"] * 0.5)
+        warm.append(entry)
+
+    estimate = estimate_render(render_features(1350, 1080, 1920, 7), warm + cold, "ffmpeg")
+
+    assert estimate["time_samples"] == len(cold)
+    megapixels = 1080 * 1920 / 1_000_000
+    assert abs(estimate["render_seconds"] - (2.0 + 0.01 * 1350 * megapixels + 3.5)) < 0.2
+    assert abs(estimate["peak_memory_mb"] - (300.0 + 40.0 * megapixels + 175.0)) <= 1
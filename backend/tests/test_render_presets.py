@@ -0,0 +1,57 @@
+from .media import make_narration, make_video, run_backend_script
+
+
+FRAGMENTS = 2
+FRAGMENT_SECONDS = 6
+SIZE = (720, 1280)
+# (режим рендера, preset финального режима); превью использует RENDER_PREVIEW_PRESET
+MATRIX = [
+    ("preview", None),
+    ("final", "ultrafast"),
+    ("final", "veryfast"),
+    ("final", "medium"),
+]
+
+RENDER_SCRIPT = """
+import asyncio, json, os, sys
+from services.video_service import VideoService
+
+video_paths, audio_path, mode, target_durations = json.loads(sys.argv[1])
+path, duration, stats = asyncio.run(VideoService().create_final_video(
+    video_paths, audio_path, "", "bench", target_durations=target_durations, render_mode=mode
+))
+print(json.dumps({"size_bytes": os.path.getsize(path), **stats}))
+"""
+
+
+def test_render_time_and_size_per_preset(ffmpeg, tmp_path):
+    """
+    Бенчмарк-матрица: время рендера и размер файла для превью и пресетов финального режима
+    """
+    video_paths = [
+        make_video(ffmpeg, tmp_path / f"scene_{index}.mp4", FRAGMENT_SECONDS, size=SIZE)
+        for index in range(FRAGMENTS)
+    ]
+    # У фрагментов свои target_duration: их нельзя скопировать, видео перекодируется в каждом режиме
+    target_durations = [FRAGMENT_SECONDS * 0.8] * FRAGMENTS
+    audio_path = make_narration(ffmpeg, tmp_path / "narration.wav", sum(target_durations))
+
+    results = {}
+    for mode, preset in MATRIX:
+        env = {"render_backend": "ffmpeg", "render_final_crf": 23}
+        if preset:
+            env["render_final_preset"] = preset
+        results[(mode, preset)] = run_backend_script(
+            RENDER_SCRIPT, [video_paths, audio_path, mode, target_durations], tmp_path / f"{mode}_{preset}", **env
+        )
+
+    print("\nmode     preset     megapixels   time, s   size, KB")
+    for (mode, preset), stats in results.items():
+        print(f"{mode:<8} {preset or 'ultrafast':<10} {stats['megapixels']:>10.3f} "
+              f"{stats['render_seconds']:>9.2f}   {stats['size_bytes'] / 1024:>8.0f}")
+
+    preview, fastest, slowest = results[("preview", None)], results[("final", "ultrafast")], results[("final", "medium")]
+    assert preview["megapixels"] == 540 * 960 / 1_000_000
+    assert preview["render_seconds"] < slowest["render_seconds"]
+    assert preview["size_bytes"] < slowest["size_bytes"]
+    assert fastest["render_seconds"] < slowest["render_seconds"]
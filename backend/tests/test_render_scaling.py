@@ -0,0 +1,57 @@
+import pytest
+
+from services.render_profiles import available_cores
+from .media import make_narration, make_video, run_backend_script
+
+
+FRAGMENTS = 4
+FRAGMENT_SECONDS = 4
+SIZE = (720, 1280)
+
+# Процесс рендера ограничивается первыми cores ядрами (как контейнер с cpuset):
+# available_cores() видит только их, сегменты кодируются RENDER_SEGMENT_WORKERS=cores процессами
+RENDER_SCRIPT = """
+import asyncio, json, os, sys
+
+video_paths, audio_path, target_durations, cores = json.loads(sys.argv[1])
+os.sched_setaffinity(0, sorted(os.sched_getaffinity(0))[:cores])
+
+from services.video_service import VideoService
+path, duration, stats = asyncio.run(VideoService().create_final_video(
+    video_paths, audio_path, "", "bench", target_durations=target_durations
+))
+print(json.dumps(stats))
+"""
+
+
+def test_segmented_render_scales_with_cores(ffmpeg, tmp_path):
+    """
+    Бенчмарк масштабирования: один и тот же рендер на 1, 2, ... N ядрах
+    """
+    cores = available_cores()
+    if cores < 2:
+        pytest.skip("Scaling benchmark needs at least 2 cores")
+
+    video_paths = [
+        make_video(ffmpeg, tmp_path / f"scene_{index}.mp4", FRAGMENT_SECONDS, size=SIZE)
+        for index in range(FRAGMENTS)
+    ]
+    # Свои target_duration у фрагментов: каждый сегмент перекодируется
+    target_durations = [FRAGMENT_SECONDS * 0.8] * FRAGMENTS
+    audio_path = make_narration(ffmpeg, tmp_path / "narration.wav", sum(target_durations))
+
+    counts = sorted({1, *range(2, cores + 1, max(1, cores // 4)), cores})
+    seconds = {}
+    for count in counts:
+        stats = run_backend_script(
+            RENDER_SCRIPT, [video_paths, audio_path, target_durations, count], tmp_path / f"cores_{count}",
+            render_backend="ffmpeg", render_segment_workers=count, render_host_concurrency=1,
+            render_final_preset="veryfast"
+        )
+        assert stats["segment_workers"] == min(count, FRAGMENTS)
+        seconds[count] = stats["render_seconds"]
+
+    print("\ncores   time, s   speedup")
+    for count, value in seconds.items():
+        print(f"{count:>5} {value:>9.2f} {seconds[1] / value:>9.2f}")
+    assert seconds[min(cores, FRAGMENTS)] < seconds[1] / 1.3
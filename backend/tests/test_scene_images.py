@@ -0,0 +1,55 @@
+import asyncio
+from pathlib import Path
+
+from models import Parable, ImagePrompt, GeneratedImage
+
+
+SCENES = {-1: "hook scene", 0: "first scene", 1: "second scene", 2: "third scene"}
+
+
+def scene_calls(client, prompt_text):
+    return sum(1 for prompt in client.calls if f"SCENE DESCRIPTION:\n{prompt_text}\n" in prompt)
+
+
+def test_failed_scene_is_retried_alone_and_keeps_its_place(database, main_module, fake_gemini, make_parables):
+    [parable_id] = make_parables(1, current_step=3, text_for_tts="TTS text")
+    db = database.SessionLocal()
+    db.add_all([
+        ImagePrompt(parable_id=parable_id, prompt_text=text, video_prompt_text="", scene_order=order)
+        for order, text in SCENES.items()
+    ])
+    db.commit()
+    db.close()
+
+    # Первый запрос второй сцены падает, повтор проходит
+    failures = []
+
+    def fail(prompt):
+        if f"SCENE DESCRIPTION:\n{SCENES[1]}\n" in prompt and not failures:
+            failures.append(prompt)
+            return True
+        return False
+
+    fake_gemini.fail = fail
+
+    asyncio.run(main_module.process_parable_pipeline(parable_id))
+
+    assert scene_calls(fake_gemini, SCENES[1]) == 2
+    for order in (-1, 0, 2):
+        assert scene_calls(fake_gemini, SCENES[order]) == 1
+
+    db = database.SessionLocal()
+    try:
+        assert db.query(Parable).filter(Parable.id == parable_id).first().status == "awaiting_audio"
+        images = db.query(GeneratedImage).filter(
+            GeneratedImage.parable_id == parable_id
+        ).order_by(GeneratedImage.scene_order).all()
+        # Промпты идут по scene_order, файл сцены — по индексу промпта: хук -> scene_0
+        assert [(image.scene_order, image.prompt.prompt_text, Path(image.image_path).stem) for image in images] == [
+            (-1, SCENES[-1], "scene_0"),
+            (0, SCENES[0], "scene_1"),
+            (1, SCENES[1], "scene_2"),
+            (2, SCENES[2], "scene_3"),
+        ]
+    finally:
+        db.close()
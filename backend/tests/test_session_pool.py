@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from models import Parable
+
+
+PIPELINES = 50
+POOL_SIZE = 5
+MAX_OVERFLOW = 0
+LLM_LATENCY = 0.2
+
+
+@pytest.fixture
+def small_pool(database, monkeypatch):
+    """
+    session_scope на пуле из 5 соединений без overflow и с коротким таймаутом:
+    пайплайн, который держит сессию во время вызова LLM, исчерпает пул и упадёт
+    """
+    engine = create_engine(
+        settings.database_url,
+        poolclass=database.InstrumentedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=2
+    )
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    yield engine.pool
+    engine.dispose()
+
+
+def test_concurrent_pipelines_do_not_exhaust_pool(database, main_module, fake_gemini, make_parables, small_pool):
+    """
+    50 настоящих пайплайнов притч одновременно при пуле из 5 соединений: сессия берётся
+    только на шаг, между шагами (во время вызовов Gemini) соединение возвращается в пул
+    """
+    fake_gemini.latency = LLM_LATENCY
+    parable_ids = make_parables(PIPELINES)
+
+    async def run():
+        await asyncio.gather(*(main_module.process_parable_pipeline(pid) for pid in parable_ids))
+
+    asyncio.run(run())
+
+    stats = small_pool.stats()
+    print(f"\n{PIPELINES} pipelines on a pool of {POOL_SIZE}: {stats}")
+    assert stats["timeouts"] == 0
+    assert small_pool.checkedout() == 0
+
+    with database.session_scope() as db:
+        statuses = {p.status for p in db.query(Parable).filter(Parable.id.in_(parable_ids)).all()}
+    assert statuses == {"awaiting_audio"}
+
+
+def test_session_released_after_failed_step(database, small_pool):
+    with pytest.raises(RuntimeError):
+        with database.session_scope() as db:
+            db.execute(text("SELECT 1"))
+            raise RuntimeError("step failed")
+
+    assert small_pool.checkedout() == 0
@@ -0,0 +1,96 @@
+from services.audio_mixer import MIX_CHANNELS, MIX_SAMPLE_RATE
+from .media import make_narration, make_video, run_backend_script
+
+
+WIDTH, HEIGHT = 360, 640
+FRAGMENT_SECONDS = 3
+FRAGMENTS = 20
+QUEUE_FRAMES = 16
+# Интерпретатор, numpy и буферы чтения pipe — сверх очереди кадров и звука
+OVERHEAD_MB = 64
+# Сведение звука до потока кадров: голос, микс, дорожка фрагментов и временные массивы записи WAV в float32
+AUDIO_COPIES = 5
+# Самый крупный дочерний ffmpeg (энкодер x264 или декодер одного фрагмента)
+CHILD_LIMIT_MB = 256
+
+
+# Рендер в отдельном процессе: ru_maxrss — пик за всю жизнь процесса, в процессе pytest он уже занят.
+# Popen подменяется счётчиком: сколько декодеров фрагментов (rawvideo в pipe) открыто одновременно
+RENDER_SCRIPT = """
+import asyncio, json, resource, subprocess, sys
+from pathlib import Path
+
+from services.render_profiles import get_encoder_profile
+from services.streaming_renderer import StreamingRenderer
+
+fragments, audio_path, output_path = json.loads(sys.argv[1])
+decoders = {"open": 0, "peak": 0, "total": 0}
+
+
+class CountingPopen(subprocess.Popen):
+    def __init__(self, args, *rest, **kwargs):
+        self._decoder = "rawvideo" in args and args[-1] == "pipe:1"
+        super().__init__(args, *rest, **kwargs)
+        if self._decoder:
+            decoders["open"] += 1
+            decoders["total"] += 1
+            decoders["peak"] = max(decoders["peak"], decoders["open"])
+
+    def wait(self, timeout=None):
+        code = super().wait(timeout)
+        if self._decoder:
+            self._decoder = False
+            decoders["open"] -= 1
+        return code
+
+
+subprocess.Popen = CountingPopen
+
+baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+duration, stats = asyncio.run(StreamingRenderer().render(
+    video_paths=fragments,
+    audio_path=audio_path,
+    text_for_subtitles="",
+    output_path=Path(output_path),
+    profile={**get_encoder_profile("preview"), "height": None},
+))
+print(json.dumps({
+    "growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb) / 1024,
+    "child_peak_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    "decoders_peak": decoders["peak"],
+    "decoders_total": decoders["total"],
+    "duration": duration,
+    **stats,
+}))
+"""
+
+
+def test_streaming_render_keeps_peak_rss_bounded(ffmpeg, tmp_path):
+    """
+    Двадцать коротких фрагментов — больше гигабайта кадров RGB — через StreamingRenderer.render():
+    пик памяти процесса рендера растёт не больше чем на очередь кадров и постоянные расходы,
+    декодер одновременно открыт один, и ни один дочерний ffmpeg не раздувается
+    """
+    fragments = [
+        make_video(ffmpeg, tmp_path / f"scene_{index}.mp4", FRAGMENT_SECONDS, size=(WIDTH, HEIGHT))
+        for index in range(FRAGMENTS)
+    ]
+    audio_path = make_narration(ffmpeg, tmp_path / "narration.wav", FRAGMENT_SECONDS * FRAGMENTS)
+    output_path = tmp_path / "final.mp4"
+
+    measured = run_backend_script(
+        RENDER_SCRIPT, [fragments, audio_path, str(output_path)], tmp_path,
+        render_stream_queue_frames=QUEUE_FRAMES, render_memory_limit_mb=0
+    )
+    print(f"\nStreaming render of {FRAGMENTS} fragments: +{measured['growth_mb']:.0f} MB in process, "
+          f"largest child {measured['child_peak_mb']:.0f} MB, decoders open at once {measured['decoders_peak']}")
+
+    frame_mb = WIDTH * HEIGHT * 3 / 1024 / 1024
+    audio_mb = FRAGMENT_SECONDS * FRAGMENTS * MIX_SAMPLE_RATE * MIX_CHANNELS * 4 / 1024 / 1024
+    assert measured["queue_frames"] == QUEUE_FRAMES
+    assert measured["frames"] * frame_mb > 1000
+    assert measured["decoders_total"] == FRAGMENTS
+    assert measured["decoders_peak"] == 1
+    assert measured["growth_mb"] < QUEUE_FRAMES * frame_mb + AUDIO_COPIES * audio_mb + OVERHEAD_MB
+    assert measured["child_peak_mb"] < CHILD_LIMIT_MB
+    assert output_path.stat().st_size > 0
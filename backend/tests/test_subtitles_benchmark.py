@@ -0,0 +1,66 @@
+import subprocess
+import time
+
+import numpy as np
+
+from services.subtitles import SubtitleTrack, build_subtitle_cues, write_ass_subtitles
+from .media import make_video
+
+
+DURATION = 60
+FPS = 30
+WIDTH, HEIGHT = 540, 960
+
+
+def phrase_text(words: int) -> str:
+    return " ".join(f"слово{index}" for index in range(words))
+
+
+def track_seconds(cues) -> float:
+    """
+    Время наложения дорожки на все кадры 60-секундного видео (картинки фраз уже отрисованы)
+    """
+    track = SubtitleTrack(cues, WIDTH, HEIGHT)
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    for start, _, _ in cues:
+        track.apply(frame, start)
+    started = time.perf_counter()
+    for index in range(DURATION * FPS):
+        track.apply(frame, index / FPS)
+    return time.perf_counter() - started
+
+
+def test_subtitle_frame_cost_does_not_depend_on_phrase_count():
+    """
+    Бенчмарк: 150 фраз на 60 секунд стоят на кадр столько же, сколько 15
+    """
+    many = build_subtitle_cues(phrase_text(440), DURATION)
+    few = build_subtitle_cues(phrase_text(40), DURATION)
+    assert len(many) == 150
+
+    many_seconds, few_seconds = track_seconds(many), track_seconds(few)
+    print(f"\nSubtitleTrack, {DURATION * FPS} frames: {len(many)} phrases {many_seconds:.2f} s, "
+          f"{len(few)} phrases {few_seconds:.2f} s")
+    assert many_seconds < few_seconds * 1.5 + 0.1
+
+
+def test_ass_burn_overhead_on_150_phrases(ffmpeg, tmp_path):
+    """
+    Бенчмарк прожига ASS-дорожки из 150 фраз в 60-секундное видео против кодирования без субтитров
+    """
+    source = make_video(ffmpeg, tmp_path / "source.mp4", DURATION, size=(WIDTH, HEIGHT), fps=FPS)
+    cues = build_subtitle_cues(phrase_text(440), DURATION)
+    ass_path = write_ass_subtitles(cues, tmp_path / "subtitles.ass", WIDTH, HEIGHT)
+
+    def encode(filters: str) -> float:
+        started = time.perf_counter()
+        subprocess.run([
+            ffmpeg, "-hide_banner", "-nostdin", "-y", "-v", "error", "-i", source,
+            "-vf", filters, "-c:v", "libx264", "-preset", "ultrafast", str(tmp_path / "out.mp4")
+        ], check=True)
+        return time.perf_counter() - started
+
+    plain = encode("format=yuv420p")
+    burned = encode(f"ass=filename={ass_path},format=yuv420p")
+    print(f"\n60 s video: plain encode {plain:.2f} s, with {len(cues)} ASS phrases {burned:.2f} s")
+    assert burned < plain * 2
@@ -0,0 +1,30 @@
+import pytest
+
+from services.timeline import MAX_DURATION, plan_timeline
+
+
+def test_zero_narration_is_rejected():
+    with pytest.raises(ValueError, match="Narration duration"):
+        plan_timeline([4.0, 4.0], None, 0.0, 30)
+
+
+def test_empty_video_is_rejected():
+    with pytest.raises(ValueError, match="Video duration"):
+        plan_timeline([0.0], None, 10.0, 30)
+
+
+def test_speed_is_target_times_fit_times_cap():
+    # 8 с -> 4 с по target_duration, 6 с без изменений: склейка 10 с под озвучку 80 с
+    plan = plan_timeline([8.0, 6.0], [4.0, None], 80.0, 30)
+
+    assert plan["fit"] == pytest.approx(10.0 / 80.0)
+    assert plan["cap"] == pytest.approx(80.0 / MAX_DURATION)
+    assert [entry["target_speed"] for entry in plan["fragments"]] == [2.0, 1.0]
+    assert [entry["speed"] for entry in plan["fragments"]] == pytest.approx([
+        2.0 * plan["fit"] * plan["cap"],
+        1.0 * plan["fit"] * plan["cap"],
+    ])
+    # Итог ограничен 60 секундами, кадры покрывают его без пропусков
+    assert plan["final_duration"] == pytest.approx(MAX_DURATION)
+    assert sum(entry["frames"] for entry in plan["fragments"]) == MAX_DURATION * 30
+    assert plan["fragments"][1]["start_frame"] == plan["fragments"][0]["frames"]
@@ -0,0 +1,239 @@
+"""
+Воркер очереди задач
+
+Запуск (можно запускать несколько процессов на нескольких машинах с общей БД):
+    python worker.py
+    python worker.py --queues render --render-concurrency 2
+    python worker.py --queues ingest --ingest-concurrency 4
+
+Рендер (очередь render) выполняется отдельным процессом `worker.py --run-job <id>`
+под надзором воркера: таймаут, лимит памяти, отмена через API (см. services/render_supervisor.py).
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import traceback
+import uuid
+
+from config import settings
+from database import SessionLocal
+import job_queue
+from job_queue import claim_job, finish_job, heartbeat
+from main import (
+    process_parable_pipeline,
+    regenerate_images_task,
+    generate_final_video_task,
+    process_english_parable_pipeline,
+    generate_english_final_video_task,
+    normalize_fragment_task,
+)
+from models import VideoFragment, EnglishVideoFragment, Job
+from services.render_profiles import render_host_concurrency_limit
+from services.render_supervisor import run_isolated, isolate_current_process, cleanup_orphaned_renders
+
+
+# Тип задачи -> корутина обработчика; обработчики сами открывают короткие сессии БД
+JOB_HANDLERS = {
+    "process_parable": lambda job: process_parable_pipeline(
+        job.target_id, job.payload.get("bypass_cache", False)
+    ),
+    "regenerate_images": lambda job: regenerate_images_task(job.target_id),
+    "process_english": lambda job: process_english_parable_pipeline(
+        job.target_id, job.payload["original_parable_id"], job.payload.get("bypass_cache", False)
+    ),
+    "generate_final": lambda job: generate_final_video_task(
+        job.target_id, job.payload.get("render_mode", "final")
+    ),
+    "generate_english_final": lambda job: generate_english_final_video_task(
+        job.target_id, job.payload.get("render_mode", "final")
+    ),
+    "normalize_fragment": lambda job: normalize_fragment_task(VideoFragment, job.target_id),
+    "normalize_english_fragment": lambda job: normalize_fragment_task(EnglishVideoFragment, job.target_id),
+}
+
+
+class Worker:
+    def __init__(self, queues, llm_concurrency: int, render_concurrency: int, ingest_concurrency: int):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.concurrency = {
+            "llm": llm_concurrency,
+            "render": render_concurrency or render_host_concurrency_limit(),
+            "ingest": ingest_concurrency,
+        }
+        self.queues = [q for q in queues if self.concurrency.get(q, 0) > 0]
+        self.stopping = asyncio.Event()
+
+    async def run(self):
+        print(f"[Worker {self.worker_id}] Starting, queues: "
+              + ", ".join(f"{q}={self.concurrency[q]}" for q in self.queues))
+
+        await asyncio.to_thread(self._recover)
+
+        loops = [self._recovery_loop()]
+        for queue in self.queues:
+            for slot in range(self.concurrency[queue]):
+                loops.append(self._queue_loop(queue, slot))
+        await asyncio.gather(*loops)
+
+    def _recover(self):
+        killed = cleanup_orphaned_renders()
+        if killed:
+            print(f"[Worker {self.worker_id}] Killed {killed} orphaned render processes")
+        try:
+            stats = job_queue.recover(self.worker_id)
+            if stats["requeued"] or stats["orphans"]:
+                print(f"[Worker {self.worker_id}] Recovery: {stats}")
+        except Exception as e:
+            print(f"[Worker {self.worker_id}] ⚠️  Recovery failed: {e}")
+
+    async def _recovery_loop(self):
+        while not self.stopping.is_set():
+            await asyncio.sleep(settings.job_stale_seconds / 2)
+            await asyncio.to_thread(self._recover)
+
+    async def _queue_loop(self, queue: str, slot: int):
+        while not self.stopping.is_set():
+            job = await asyncio.to_thread(self._claim, queue)
+            if job is None:
+                await asyncio.sleep(settings.worker_poll_seconds)
+                continue
+
+            print(f"[Worker {self.worker_id}] ▶️  Job {job.id} ({job.job_type}, target {job.target_id}), "
+                  f"attempt {job.attempts}/{job.max_attempts}, {queue} slot {slot}")
+
+            error, retry = None, True
+            if queue == "render" and settings.render_isolation_enabled:
+                error, retry = await self._execute_isolated(job)
+            elif queue == "render":
+                # Рендер синхронно грузит CPU — выполняем в отдельном потоке со своим event loop,
+                # чтобы не блокировать остальные слоты воркера
+                error = await asyncio.to_thread(asyncio.run, self._execute(job))
+            else:
+                error = await self._execute(job)
+
+            await asyncio.to_thread(finish_job, job.id, self.worker_id, error, retry)
+            status = "✅ done" if error is None else f"❌ {error}"
+            print(f"[Worker {self.worker_id}] Job {job.id} {status}")
+
+    def _claim(self, queue: str):
+        db = SessionLocal()
+        try:
+            job = claim_job(db, queue, self.worker_id)
+            if job is not None:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    async def _execute(self, job):
+        handler = JOB_HANDLERS.get(job.job_type)
+        if handler is None:
+            return f"No handler for job type {job.job_type}"
+
+        # Heartbeat в отдельном потоке: продолжает идти, даже если обработчик блокирует event loop
+        stop_heartbeat = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop,
+            args=(job.id, stop_heartbeat),
+            daemon=True
+        )
+        heartbeat_thread.start()
+
+        try:
+            await handler(job)
+            return None
+        except Exception as e:
+            traceback.print_exc()
+            return str(e)
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+    async def _execute_isolated(self, job):
+        """
+        Задача рендера в отдельном процессе: зависание или перерасход памяти
+        не затрагивают остальные слоты воркера
+        """
+        if job.job_type not in JOB_HANDLERS:
+            return f"No handler for job type {job.job_type}", False
+
+        # Потеря задачи (отмена через API или её забрало восстановление) останавливает процесс рендера
+        stop_heartbeat = threading.Event()
+        lost = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop,
+            args=(job.id, stop_heartbeat, lost),
+            daemon=True
+        )
+        heartbeat_thread.start()
+
+        try:
+            return await run_isolated(
+                [sys.executable, os.path.abspath(__file__), "--run-job", str(job.id)],
+                job.id,
+                lost.is_set
+            )
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+    def _heartbeat_loop(self, job_id: int, stop: threading.Event, lost: threading.Event = None):
+        while not stop.wait(settings.job_heartbeat_seconds):
+            try:
+                if not heartbeat(job_id, self.worker_id):
+                    print(f"[Worker {self.worker_id}] ⚠️  Lost ownership of job {job_id}")
+                    if lost is not None:
+                        lost.set()
+                    return
+            except Exception as e:
+                print(f"[Worker {self.worker_id}] ⚠️  Heartbeat failed for job {job_id}: {e}")
+
+
+def run_job(job_id: int) -> int:
+    """
+    Выполняет одну задачу в текущем процессе (процесс рендера, запускается воркером)
+    """
+    isolate_current_process()
+
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job is not None:
+            db.expunge(job)
+    finally:
+        db.close()
+    if job is None:
+        print(f"[Render {job_id}] Job not found")
+        return 1
+
+    asyncio.run(JOB_HANDLERS[job.job_type](job))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content Creator job worker")
+    parser.add_argument("--queues", default="llm,render,ingest",
+                        help="Очереди через запятую (llm, render, ingest)")
+    parser.add_argument("--llm-concurrency", type=int, default=settings.worker_llm_concurrency)
+    parser.add_argument("--render-concurrency", type=int, default=settings.worker_render_concurrency)
+    parser.add_argument("--ingest-concurrency", type=int, default=settings.worker_ingest_concurrency)
+    parser.add_argument("--run-job", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_job is not None:
+        sys.exit(run_job(args.run_job))
+
+    worker = Worker(
+        queues=[q.strip() for q in args.queues.split(",") if q.strip()],
+        llm_concurrency=args.llm_concurrency,
+        render_concurrency=args.render_concurrency,
+        ingest_concurrency=args.ingest_concurrency
+    )
+    asyncio.run(worker.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+-- Миграция: Не больше одной активной задачи одного типа на сущность
+-- Проверка active_job() и INSERT в enqueue_job не атомарны: два одновременных запроса
+-- могли поставить две задачи. Уникальный частичный индекс закрывает гонку на уровне БД.
+
+-- Сначала снимаем уже существующие дубликаты: остаётся выполняющаяся задача, иначе самая ранняя
+UPDATE jobs
+SET status = 'failed',
+    error_message = 'Duplicate active job',
+    finished_at = CURRENT_TIMESTAMP
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY job_type, target_id
+            ORDER BY (status = 'running') DESC, id
+        ) AS position
+        FROM jobs
+        WHERE status IN ('queued', 'running')
+    ) ranked
+    WHERE position > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_target
+ON jobs(job_type, target_id)
+WHERE status IN ('queued', 'running');
@@ -0,0 +1,15 @@
+-- Миграция: Нормализация видеофрагментов при загрузке
+
+ALTER TABLE video_fragments
+ADD COLUMN IF NOT EXISTS normalized_path TEXT,
+ADD COLUMN IF NOT EXISTS normalize_status VARCHAR(20),
+ADD COLUMN IF NOT EXISTS media_info JSON;
+
+ALTER TABLE english_video_fragments
+ADD COLUMN IF NOT EXISTS normalized_path TEXT,
+ADD COLUMN IF NOT EXISTS normalize_status VARCHAR(20),
+ADD COLUMN IF NOT EXISTS media_info JSON;
+
+COMMENT ON COLUMN video_fragments.normalized_path IS 'Фрагмент, перекодированный к 1080x1920, 30 fps, H.264/AAC; используется рендером вместо исходника';
+COMMENT ON COLUMN video_fragments.normalize_status IS 'Статус нормализации: pending, done, error';
+COMMENT ON COLUMN video_fragments.media_info IS 'Метаданные нормализованного файла (длительность, кодеки, размер, fps)';
@@ -0,0 +1,29 @@
+-- Миграция: Персистентная очередь задач (замена FastAPI BackgroundTasks)
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id SERIAL PRIMARY KEY,
+    job_type VARCHAR(50) NOT NULL, -- process_parable, regenerate_images, generate_final, process_english, generate_english_final
+    queue VARCHAR(20) NOT NULL, -- llm, render
+    target_id INTEGER NOT NULL, -- ID притчи или английской версии
+    payload JSON DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'queued', -- queued, running, done, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker_id VARCHAR(255),
+    error_message TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Выборка следующей задачи: SELECT ... WHERE status = 'queued' AND queue = ? ORDER BY id FOR UPDATE SKIP LOCKED
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(queue, status, id);
+-- Поиск зависших задач по heartbeat
+CREATE INDEX IF NOT EXISTS idx_jobs_running_heartbeat ON jobs(status, heartbeat_at);
+-- Поиск активной задачи для сущности
+CREATE INDEX IF NOT EXISTS idx_jobs_target ON jobs(job_type, target_id, status);
+
+COMMENT ON TABLE jobs IS 'Очередь фоновых задач, обрабатывается процессами worker.py';
+COMMENT ON COLUMN jobs.heartbeat_at IS 'Последний сигнал жизни от воркера; задачи без heartbeat дольше JOB_STALE_SECONDS возвращаются в очередь';
@@ -0,0 +1,6 @@
+-- Миграция: Индексы для постраничного списка притч (keyset-пагинация по created_at, id)
+
+-- GET /parables: ORDER BY created_at DESC, id DESC WHERE (created_at, id) < (курсор)
+CREATE INDEX IF NOT EXISTS idx_parables_created_id ON parables(created_at DESC, id DESC);
+-- GET /parables?status=...: тот же порядок внутри статуса
+CREATE INDEX IF NOT EXISTS idx_parables_status_created_id ON parables(status, created_at DESC, id DESC);
@@ -0,0 +1,10 @@
+-- Миграция: Пакетный рендер финальных видео (POST /render-batches)
+
+CREATE TABLE IF NOT EXISTS render_batches (
+    id SERIAL PRIMARY KEY,
+    mode VARCHAR(20) NOT NULL, -- preview, final
+    items JSON NOT NULL DEFAULT '[]', -- [{parable_id, language, job_id, error}]
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE render_batches IS 'Пакеты рендеров: прогресс считается по задачам jobs из items';
@@ -0,0 +1,22 @@
+-- Миграция: История рендеров финального видео для оценки стоимости (GET /parables/{id}/generate-final/plan)
+
+CREATE TABLE IF NOT EXISTS render_metrics (
+    id SERIAL PRIMARY KEY,
+    target_type VARCHAR(20) NOT NULL, -- parable, english_parable
+    target_id INTEGER NOT NULL,
+    backend VARCHAR(20) NOT NULL, -- moviepy, ffmpeg
+    mode VARCHAR(20) NOT NULL, -- preview, final
+    frames INTEGER NOT NULL,
+    megapixels REAL NOT NULL,
+    fragments INTEGER NOT NULL,
+    segments_rendered INTEGER,
+    render_seconds REAL NOT NULL,
+    peak_memory_mb REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Выборка последних рендеров для подгонки модели: WHERE backend = ? AND mode = ? ORDER BY id DESC
+CREATE INDEX IF NOT EXISTS idx_render_metrics_model ON render_metrics(backend, mode, id);
+
+COMMENT ON TABLE render_metrics IS 'Замеры рендеров: признаки (кадры, мегапиксели, фрагменты), время и пиковая память';
+COMMENT ON COLUMN render_metrics.peak_memory_mb IS 'Пиковая память процесса воркера вместе с дочерними ffmpeg';
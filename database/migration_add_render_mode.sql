@@ -0,0 +1,10 @@
+-- Миграция: Режим рендера финального видео (preview / final)
+
+ALTER TABLE parables
+ADD COLUMN IF NOT EXISTS render_mode VARCHAR(20);
+
+ALTER TABLE english_parables
+ADD COLUMN IF NOT EXISTS render_mode VARCHAR(20);
+
+COMMENT ON COLUMN parables.render_mode IS 'Режим последнего рендера: preview - быстрый черновой, final - итоговое качество';
+COMMENT ON COLUMN english_parables.render_mode IS 'Режим последнего рендера: preview - быстрый черновой, final - итоговое качество';
@@ -0,0 +1,10 @@
+-- Миграция: Статистика последнего рендера (время, попадания в кеш сегментов)
+
+ALTER TABLE parables
+ADD COLUMN IF NOT EXISTS render_stats JSON;
+
+ALTER TABLE english_parables
+ADD COLUMN IF NOT EXISTS render_stats JSON;
+
+COMMENT ON COLUMN parables.render_stats IS 'Статистика последнего рендера: бэкенд, время, сегменты из кеша / пересобранные';
+COMMENT ON COLUMN english_parables.render_stats IS 'Статистика последнего рендера: бэкенд, время, сегменты из кеша / пересобранные';
@@ -10,8 +10,12 @@ const api = axios.create({
   baseURL: API_BASE_URL,
 })
 
-export const getParables = async () => {
-  const response = await api.get('/parables')
+// Страница списка притч: { items, next_cursor }; next_cursor передаётся для следующей страницы
+export const getParables = async ({ cursor = null, status = null, limit = 20 } = {}) => {
+  const params = { limit }
+  if (cursor) params.cursor = cursor
+  if (status) params.status = status
+  const response = await api.get('/parables', { params })
   return response.data
 }
 
@@ -67,8 +71,9 @@ export const regenerateImages = async (id) => {
   return response.data
 }
 
-export const generateFinalVideo = async (id) => {
-  const response = await api.post(`/parables/${id}/generate-final`)
+// mode: 'final' — итоговое качество, 'preview' — быстрый черновой рендер
+export const generateFinalVideo = async (id, mode = 'final') => {
+  const response = await api.post(`/parables/${id}/generate-final`, null, { params: { mode } })
   return response.data
 }
 
@@ -151,8 +156,8 @@ export const uploadEnglishVideoFragment = async (id, sceneOrder, file) => {
   return response.data
 }
 
-export const generateEnglishFinalVideo = async (id) => {
-  const response = await api.post(`/parables/${id}/english/generate-final`)
+export const generateEnglishFinalVideo = async (id, mode = 'final') => {
+  const response = await api.post(`/parables/${id}/english/generate-final`, null, { params: { mode } })
   return response.data
 }
 
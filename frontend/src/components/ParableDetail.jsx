@@ -161,12 +161,12 @@ function ParableDetail() {
     }
   }
 
-  const handleGenerateFinal = async () => {
+  const handleGenerateFinal = async (mode = 'final') => {
     try {
       setGeneratingFinal(true)
       setError(null)
-      await generateFinalVideo(id)
-      setSuccess('Генерация финального видео запущена!')
+      await generateFinalVideo(id, mode)
+      setSuccess(mode === 'preview' ? 'Генерация превью запущена!' : 'Генерация финального видео запущена!')
       setTimeout(() => loadParable(), 2000)
     } catch (err) {
       setError('Ошибка генерации финального видео')
@@ -757,9 +757,16 @@ function ParableDetail() {
 
           {parable.video_fragments?.length === parable.generated_images.length && (
             <div className="actions">
+              <button
+                className="btn btn-primary"
+                onClick={() => handleGenerateFinal('preview')}
+                disabled={generatingFinal}
+              >
+                {generatingFinal ? '⏳ Генерация...' : '👁️ Быстрое превью'}
+              </button>
               <button
                 className="btn btn-success"
-                onClick={handleGenerateFinal}
+                onClick={() => handleGenerateFinal('final')}
                 disabled={generatingFinal}
               >
                 {generatingFinal ? '⏳ Генерация...' : '🎬 Сгенерировать финальное видео'}
@@ -771,9 +778,9 @@ function ParableDetail() {
 
       {parable.final_video_path && (
         <div className="card">
-          <h3>Финальное видео</h3>
+          <h3>{parable.render_mode === 'preview' ? 'Превью видео' : 'Финальное видео'}</h3>
           <div className="video-player">
-            <video controls>
+            <video controls key={parable.final_video_path}>
               <source src={`${STATIC_BASE_URL}/${parable.final_video_path}`} type="video/mp4" />
               Ваш браузер не поддерживает видео.
             </video>
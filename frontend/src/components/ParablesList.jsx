@@ -2,21 +2,27 @@ import { useState, useEffect } from 'react'
 import { useNavigate } from 'react-router-dom'
 import { getParables } from '../api'
 
+const STATUSES = ['draft', 'processing', 'awaiting_videos', 'generating_final', 'completed', 'error']
+
 function ParablesList() {
   const [parables, setParables] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [statusFilter, setStatusFilter] = useState('')
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState(null)
   const navigate = useNavigate()
 
   useEffect(() => {
     loadParables()
-  }, [])
+  }, [statusFilter])
 
   const loadParables = async () => {
     try {
       setLoading(true)
-      const data = await getParables()
-      setParables(data)
+      const data = await getParables({ status: statusFilter || null })
+      setParables(data.items)
+      setNextCursor(data.next_cursor)
     } catch (err) {
       setError('Ошибка загрузки притч')
       console.error(err)
@@ -25,6 +31,20 @@ function ParablesList() {
     }
   }
 
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true)
+      const data = await getParables({ cursor: nextCursor, status: statusFilter || null })
+      setParables((prev) => [...prev, ...data.items])
+      setNextCursor(data.next_cursor)
+    } catch (err) {
+      setError('Ошибка загрузки притч')
+      console.error(err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const getStatusText = (status) => {
     const statusMap = {
       draft: 'Черновик',
@@ -37,7 +57,7 @@ function ParablesList() {
     return statusMap[status] || status
   }
 
-  if (loading) {
+  if (loading && parables.length === 0) {
     return <div className="loading">Загрузка...</div>
   }
 
@@ -46,9 +66,17 @@ function ParablesList() {
       <div className="card">
         <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
           <h2>Мои притчи</h2>
-          <button className="btn btn-primary" onClick={() => navigate('/create')}>
-            ➕ Создать новую притчу
-          </button>
+          <div style={{ display: 'flex', gap: '0.5rem', alignItems: 'center' }}>
+            <select value={statusFilter} onChange={(e) => setStatusFilter(e.target.value)}>
+              <option value="">Все статусы</option>
+              {STATUSES.map((status) => (
+                <option key={status} value={status}>{getStatusText(status)}</option>
+              ))}
+            </select>
+            <button className="btn btn-primary" onClick={() => navigate('/create')}>
+              ➕ Создать новую притчу
+            </button>
+          </div>
         </div>
       </div>
 
@@ -88,6 +116,14 @@ function ParablesList() {
           ))}
         </div>
       )}
+
+      {nextCursor && (
+        <div style={{ textAlign: 'center', marginTop: '1.5rem' }}>
+          <button className="btn btn-primary" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
@@ -37,6 +37,11 @@ pip install -r requirements.txt > /dev/null 2>&1
 
 python main.py &
 BACKEND_PID=$!
+
+# Воркер очереди задач (обработка притч и рендер видео)
+echo "⚙️  Starting Worker..."
+python worker.py &
+WORKER_PID=$!
 cd ..
 
 # Запуск Frontend
@@ -61,5 +66,5 @@ echo ""
 echo "Для остановки нажмите Ctrl+C"
 
 # Ожидание завершения
-wait $BACKEND_PID $FRONTEND_PID
+wait $BACKEND_PID $WORKER_PID $FRONTEND_PID
 
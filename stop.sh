@@ -4,6 +4,7 @@ echo "🛑 Stopping Content Creator..."
 
 # Остановка процессов
 pkill -f "python main.py"
+pkill -f "python worker.py"
 pkill -f "vite"
 
 # Остановка Docker